@@ -0,0 +1,152 @@
+import click
+import click_log
+import logging
+import os
+import statistics
+import tempfile
+import time
+from blocklog import get_index_file
+import board_simulator
+from board_simulator import BoardSimulator, read_segments
+import run_experiments
+from run_experiments import LogProcessor, Resetter, wait_for_next_experiment
+import watchdog
+from watchdog import Watchdog
+
+logger = logging.getLogger(__name__)
+click_log.basic_config(logger)
+
+
+def log_latencies(name, latencies):
+    if len(latencies) == 0:
+        logger.info('{}: no samples.'.format(name))
+        return
+    mean = statistics.mean(latencies) * 1000
+    median = statistics.median(latencies) * 1000
+    logger.info('{}: mean {:.2f} ms, '.format(name, mean) +
+                'median {:.2f} ms, '.format(median) +
+                'max {:.2f} ms '.format(max(latencies) * 1000) +
+                '({} samples).'.format(len(latencies)))
+
+
+@click.command()
+@click.option('--log-file',
+              multiple=True,
+              required=True,
+              help='Recorded log file to replay, can be given more ' +
+                   'than once.')
+@click.option('--experiments',
+              default=10,
+              show_default=True,
+              help='Number of experiments to run.')
+@click.option('--min-observations',
+              default=100,
+              show_default=True,
+              help='Number of observations per experiment.')
+@click.option('--baud',
+              default=115200,
+              show_default=True,
+              help='Baud rate of the simulated UART.')
+@click.option('--boot-time',
+              default=2.0,
+              show_default=True,
+              help='Seconds between a reset and the first output.')
+@click.option('--timeout',
+              default=60.0,
+              show_default=True,
+              help='Seconds without progress before the Resetter resets.')
+@click.option('--hang-rate',
+              default=0.0,
+              show_default=True,
+              help='Probability that the Pi hangs during an experiment.')
+@click.option('--boot-failure-rate',
+              default=0.0,
+              show_default=True,
+              help='Probability that the Pi does not boot after a reset.')
+@click.option('--garbage-rate',
+              default=0.0,
+              show_default=True,
+              help='Probability per line of writing garbage bytes.')
+@click.option('--adaptive-watchdog',
+              is_flag=True,
+              default=False,
+              help='Use the adaptive watchdog of run_experiments.py, ' +
+                   'with --timeout as the fixed timeout.')
+@click.option('--block-log',
+              is_flag=True,
+              default=False,
+              help='Write a block-compressed log (see blocklog.py).')
+@click.option('--seed',
+              default=None,
+              type=int,
+              help='Seed of the fault injection.')
+@click_log.simple_verbosity_option(logger)
+def main(log_file, experiments, min_observations, baud, boot_time, timeout,
+         hang_rate, boot_failure_rate, garbage_rate, adaptive_watchdog,
+         block_log, seed):
+    board_simulator.logger.setLevel(logger.level)
+    run_experiments.logger.setLevel(logger.level)
+    watchdog.logger.setLevel(logger.level)
+
+    segments = read_segments(log_file)
+    logger.info('Replaying {} experiments '.format(len(segments)) +
+                'from {} log files.'.format(len(log_file)))
+    simulator = BoardSimulator(segments, baud, boot_time,
+                               hang_rate=hang_rate,
+                               boot_failure_rate=boot_failure_rate,
+                               garbage_rate=garbage_rate, seed=seed)
+    outfd, outfile = tempfile.mkstemp(suffix='.log.gz' if block_log
+                                      else '.log')
+    os.close(outfd)
+
+    # The same setup as do_experiments(), without compilation
+    starttime = time.monotonic()
+    simulator.start()
+    log_processor = LogProcessor(simulator.tty_logging, outfile)
+    if adaptive_watchdog:
+        # The recorded logs have no WCET baseline, the timeouts follow
+        # from the observed gaps between iterations only
+        experiment_watchdog = Watchdog(timeout)
+        log_processor.add_record_handler(experiment_watchdog.handle_record)
+    else:
+        experiment_watchdog = None
+    log_processor.start_thread()
+    resetter = Resetter(simulator.tty_reset, log_processor, min_observations)
+    resetter.timeout = timeout
+    resetter.watchdog = experiment_watchdog
+    resetter.start_thread()
+    for number in range(experiments):
+        wait_for_next_experiment(resetter)
+        logger.info('Experiment {} done.'.format(number + 1))
+    elapsed = time.monotonic() - starttime
+
+    lines_per_second = log_processor.get_lines_per_second()
+    resetter.stop_thread()
+    log_processor.stop_thread()
+    simulator.shutdown()
+    log_bytes = os.path.getsize(outfile)
+    os.remove(outfile)
+    if block_log:
+        os.remove(get_index_file(outfile))
+
+    simulator.log_statistics()
+    logger.info('{} experiments in {:.1f} secs: '.format(experiments,
+                                                         elapsed) +
+                '{:.1f} experiments/hour.'.format(experiments / elapsed *
+                                                  3600))
+    logger.info('Ingestion: {:.1f} lines/sec, '.format(lines_per_second) +
+                '{} lines discarded, '.format(log_processor.lines -
+                                              log_processor.records) +
+                '{} timeout resets, '.format(resetter.timeout_resets) +
+                '{} bytes of log written.'.format(log_bytes))
+    if experiment_watchdog is not None:
+        experiment_watchdog.log_statistics()
+    # From the last line written by the Pi to the reset byte arriving at
+    # the Arduino, and the handoffs inside the orchestrator
+    log_latencies('Reset latency', simulator.reset_latencies)
+    log_latencies('Reaction latency', resetter.reaction_latencies)
+    log_latencies('Detection latency', resetter.detection_latencies)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+import click
+import click_log
+import logging
+import gzip
+import json
+import os
+from os.path import getsize, isfile
+import shutil
+import time
+import zlib
+from logrecord import parse_record
+
+logger = logging.getLogger(__name__)
+click_log.basic_config(logger)
+
+
+# Block-compressed raw logs. A log x.log.gz is a series of gzip members,
+# each member (block) holds complete lines of one experiment label. The
+# file is a valid gzip file (zcat and gzip.open read all blocks in order),
+# and the side index x.log.gz.idx tells per block its label, byte offset
+# and size in the compressed file, and the number of lines, e.g.
+#   {"label": "XRTOS_PI3_BENCH_...", "offset": 0, "size": 6338,
+#    "lines": 1530}
+# (one JSON object per line). With the index the blocks of a label can be
+# decompressed without reading the rest of the log.
+#
+# A block is written when the label changes, when it holds block_size
+# bytes and when it is older than flush_interval seconds, so a crash only
+# loses the lines of the last few seconds. Blocks are appended, so a log
+# can be continued when a campaign is resumed.
+block_size = 256 * 1024
+flush_interval = 10.0
+
+
+def is_block_log(filename):
+    return filename.endswith('.log.gz')
+
+
+def get_index_file(filename):
+    return filename + '.idx'
+
+
+def get_block_log(logfile):
+    # The block-compressed log of x.log is x.log.gz
+    return logfile + '.gz'
+
+
+def strip_log_suffix(filename):
+    # x.log.gz and x.log => x
+    for suffix in ['.log.gz', '.log']:
+        if filename.endswith(suffix):
+            return filename[:-len(suffix)]
+    return filename
+
+
+class BlockLogWriter:
+    def __init__(self, filename, append=False, compresslevel=6,
+                 block_size=block_size, flush_interval=flush_interval):
+        self.filename = filename
+        self.compresslevel = compresslevel
+        self.block_size = block_size
+        self.flush_interval = flush_interval
+        mode = 'ab' if append else 'wb'
+        self.filehandle = open(filename, mode)
+        self.indexhandle = open(get_index_file(filename),
+                                'a' if append else 'w')
+        self.offset = self.filehandle.tell()
+        self.block = bytearray()
+        self.label = None
+        self.lines = 0
+        self.block_time = None
+
+    def write(self, data, label):
+        # data is one line (any bytes-like object, it is copied), label is
+        # the experiment label of its record (bytes)
+        if label != self.label or len(self.block) >= self.block_size:
+            self.flush()
+            self.label = label
+        if self.block_time is None:
+            self.block_time = time.monotonic()
+        self.block += data
+        self.lines += 1
+        if time.monotonic() - self.block_time > self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        # Write the block as one gzip member, and its index entry
+        if not self.block:
+            return
+        compressor = zlib.compressobj(self.compresslevel, zlib.DEFLATED, 31)
+        member = compressor.compress(self.block) + compressor.flush()
+        self.filehandle.write(member)
+        self.filehandle.flush()
+        entry = {'label': self.label.decode('utf-8'),
+                 'offset': self.offset,
+                 'size': len(member),
+                 'lines': self.lines}
+        self.indexhandle.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.indexhandle.flush()
+        self.offset += len(member)
+        self.block = bytearray()
+        self.lines = 0
+        self.block_time = None
+
+    def close(self):
+        self.flush()
+        self.filehandle.close()
+        self.indexhandle.close()
+
+
+def read_index_entries(index_file):
+    # The complete lines of an index file
+    with open(index_file, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.endswith('\n')]
+
+
+def get_end(entries):
+    return entries[-1]['offset'] + entries[-1]['size'] if entries else 0
+
+
+def read_index(filename):
+    # The index entries of a block log, None if there is no index or if it
+    # does not cover the whole log (e.g. the writer crashed in between).
+    index_file = get_index_file(filename)
+    if not isfile(index_file):
+        return None
+    entries = read_index_entries(index_file)
+    end = get_end(entries)
+    if end != getsize(filename):
+        logger.warning('Index of {} is incomplete, '.format(filename) +
+                       'reading all blocks.')
+        return None
+    return entries
+
+
+def get_labels(filename):
+    # The experiment labels in a block log, None without (valid) index
+    entries = read_index(filename)
+    if entries is None:
+        return None
+    labels = []
+    for entry in entries:
+        if entry['label'] not in labels:
+            labels.append(entry['label'])
+    return labels
+
+
+def read_blocks(filename, labels=None):
+    # Yields the decompressed blocks of a block log in order, only those of
+    # labels (if given and the log has an index). Without index all blocks
+    # are yielded (the caller filters the records anyway).
+    entries = read_index(filename) if labels is not None else None
+    if entries is None:
+        with gzip.open(filename, 'rb') as f:
+            while True:
+                data = f.read(block_size)
+                if not data:
+                    break
+                yield data
+        return
+    with open(filename, 'rb') as f:
+        for entry in entries:
+            if entry['label'] not in labels:
+                continue
+            f.seek(entry['offset'])
+            yield zlib.decompress(f.read(entry['size']), 31)
+
+
+def open_log(filename):
+    # A binary file object with the lines of a raw or block log
+    if is_block_log(filename):
+        return gzip.open(filename, 'rb')
+    return open(filename, 'rb')
+
+
+def read_lines(filename, labels=None):
+    # Yields the lines (bytes) of a raw or block log, of a block log with
+    # index only those of the blocks of labels (if given)
+    if not is_block_log(filename):
+        with open(filename, 'rb') as f:
+            yield from f
+        return
+    rest = b''
+    for data in read_blocks(filename, labels):
+        lines = (rest + data).split(b'\n')
+        rest = lines.pop()
+        for line in lines:
+            yield line + b'\n'
+    if rest:
+        yield rest
+
+
+def concatenate(input_files, output_file):
+    # Concatenate block logs and their indexes, e.g. the per board logs of
+    # a campaign. The blocks are copied as they are.
+    offset = 0
+    with open(output_file, 'wb') as outf, \
+            open(get_index_file(output_file), 'w') as indexf:
+        for input_file in input_files:
+            entries = read_index(input_file)
+            if entries is None:
+                entries = index_blocks(input_file)
+            with open(input_file, 'rb') as inf:
+                shutil.copyfileobj(inf, outf)
+            for entry in entries:
+                entry = dict(entry, offset=entry['offset'] + offset)
+                indexf.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            offset += getsize(input_file)
+
+
+def index_blocks(filename):
+    # Rebuild the index entries of a block log by decompressing it member
+    # by member
+    entries = []
+    with open(filename, 'rb') as f:
+        data = f.read()
+    offset = 0
+    while offset < len(data):
+        decompressor = zlib.decompressobj(31)
+        block = decompressor.decompress(data[offset:])
+        size = len(data) - offset - len(decompressor.unused_data)
+        record = parse_record(block)
+        label = record.label.decode('utf-8') if record is not None else ''
+        entries.append({'label': label, 'offset': offset, 'size': size,
+                        'lines': block.count(b'\n')})
+        offset += size
+    return entries
+
+
+def truncate_log(filename, offset):
+    # Cut a raw or block log back to its first offset bytes, e.g. to drop
+    # the lines of an experiment that was interrupted. The offset of a
+    # block log is a block boundary, the blocks after it are also removed
+    # from the index.
+    if getsize(filename) > offset:
+        os.truncate(filename, offset)
+    if not is_block_log(filename):
+        return
+    index_file = get_index_file(filename)
+    entries = []
+    if isfile(index_file):
+        entries = [entry for entry in read_index_entries(index_file)
+                   if entry['offset'] + entry['size'] <= offset]
+    if get_end(entries) != getsize(filename):
+        entries = index_blocks(filename)
+    with open(index_file + '.tmp', 'w', encoding='utf-8') as f:
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    os.replace(index_file + '.tmp', index_file)
+
+
+def compress_log(logfile, compresslevel=6):
+    # Write the raw log x.log as block log x.log.gz, returns its name. The
+    # lines without record go into the block of the record before them.
+    block_log = get_block_log(logfile)
+    tmpfile = block_log + '.tmp'
+    writer = BlockLogWriter(tmpfile, compresslevel=compresslevel,
+                            flush_interval=float('inf'))
+    label = b''
+    with open(logfile, 'rb') as f:
+        for line in f:
+            record = parse_record(line)
+            if record is not None:
+                label = record.label
+            writer.write(line, label)
+    writer.close()
+    os.replace(get_index_file(tmpfile), get_index_file(block_log))
+    os.replace(tmpfile, block_log)
+    return block_log
+
+
+@click.command()
+@click.option('--input-file',
+              required=True,
+              multiple=True,
+              help='Path and filename of a raw log file (.log), can be ' +
+                   'given more than once.')
+@click.option('--keep',
+              is_flag=True,
+              default=False,
+              help='Keep the raw log files.')
+@click_log.simple_verbosity_option(logger)
+def main(input_file, keep):
+    # Compress each raw log x.log into the block log x.log.gz
+    for logfile in input_file:
+        if not isfile(logfile):
+            logger.error('Error: input file {} '.format(logfile) +
+                         'does not exist!')
+            exit(1)
+        block_log = compress_log(logfile)
+        logger.info('Compressed {} ({} bytes) '.format(logfile,
+                                                       getsize(logfile)) +
+                    'into {} '.format(block_log) +
+                    '({} bytes).'.format(getsize(block_log)))
+        if not keep:
+            os.remove(logfile)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+import click
+import click_log
+import logging
+import os
+import random
+import re
+import select
+from threading import Condition, Event, Thread
+import time
+import tty
+from blocklog import open_log
+
+logger = logging.getLogger(__name__)
+click_log.basic_config(logger)
+
+
+label_regex = re.compile(rb' label: (\S+) ')
+iteration_regex = re.compile(rb' iteration: ([0-9]+) ')
+
+
+def read_segments(logfiles):
+    # Split the recorded logs into experiments: a segment is a run of lines
+    # with the same label, lines without a label belong to the segment they
+    # are in. Each reset of the simulated Pi starts the next segment, just
+    # like run_experiments.py installs the next experiment before resetting.
+    segments = []
+    label = None
+    for logfile in logfiles:
+        with open_log(logfile) as f:
+            for line in f:
+                m = label_regex.search(line)
+                if m is not None and m.group(1) != label:
+                    label = m.group(1)
+                    segments.append([])
+                if len(segments) == 0:
+                    segments.append([])
+                segments[-1].append(line)
+    return segments
+
+
+def renumber(line, offset):
+    # Shift the iteration number, used when a segment is replayed again
+    # because the orchestrator wants more observations than recorded.
+    if offset == 0:
+        return line
+    return iteration_regex.sub(
+        lambda m: b' iteration: ' +
+        str(int(m.group(1)) + offset).encode('ascii') + b' ', line)
+
+
+def get_last_iteration(segment):
+    last = 0
+    for line in segment:
+        m = iteration_regex.search(line)
+        if m is not None:
+            last = max(last, int(m.group(1)))
+    return last
+
+
+def open_pty():
+    # Returns the master fd and the name of the slave device, the slave is
+    # put in raw mode so the bytes pass unaltered (e.g. no CR/LF mapping).
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    return master, slave, os.ttyname(slave)
+
+
+class BoardSimulator:
+    # Simulates a Raspberry Pi with the Arduino that resets it, using two
+    # pseudo-terminals: the logging tty on which the Pi writes its UART
+    # output, and the reset tty on which the Arduino listens for the 'r'
+    # byte. Recorded log segments are replayed at the given baud rate (10
+    # bits per byte). On reset, the output stops, the RUN pin is held low
+    # for 500 ms (see arduino/arduino_reset_pi.ino), then the Pi boots for
+    # boot_time seconds and replays the next segment.
+    #
+    # Faults are injected randomly (see the rates):
+    #  - hang: the Pi stops writing halfway the segment,
+    #  - boot failure: the Pi writes nothing after the reset,
+    #  - garbage: a line of random bytes is written before a line.
+    def __init__(self, segments, baud=115200, boot_time=2.0,
+                 reset_hold=0.5, hang_rate=0.0, boot_failure_rate=0.0,
+                 garbage_rate=0.0, hang_window=200, seed=None):
+        self.segments = segments
+        self.baud = baud
+        self.boot_time = boot_time
+        self.reset_hold = reset_hold
+        self.hang_rate = hang_rate
+        self.boot_failure_rate = boot_failure_rate
+        self.garbage_rate = garbage_rate
+        # a hang happens within the first hang_window lines
+        self.hang_window = hang_window
+        self.random = random.Random(seed)
+        self.log_master, self.log_slave, self.tty_logging = open_pty()
+        # The writes wait for room in the pty, but not after shutdown()
+        os.set_blocking(self.log_master, False)
+        self.reset_master, self.reset_slave, self.tty_reset = open_pty()
+        self.condition = Condition()
+        self.stop = Event()
+        self.reset_pending = False
+        self.segment = -1
+        # statistics
+        self.resets = 0
+        self.hangs = 0
+        self.boot_failures = 0
+        self.garbage_lines = 0
+        self.bytes = 0
+        self.lines = 0
+        # time between the last line written and the reset byte received
+        self.reset_latencies = []
+        self.last_write = None
+        self.threads = [Thread(target=self.listen_reset),
+                        Thread(target=self.replay)]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+
+    def shutdown(self):
+        self.stop.set()
+        with self.condition:
+            self.condition.notify_all()
+        for thread in self.threads:
+            thread.join()
+        for fd in [self.log_master, self.log_slave,
+                   self.reset_master, self.reset_slave]:
+            os.close(fd)
+
+    def listen_reset(self):
+        while not self.stop.is_set():
+            readable, _, _ = select.select([self.reset_master], [], [], 0.2)
+            if len(readable) == 0:
+                continue
+            for byte in os.read(self.reset_master, 64):
+                if byte == ord('r'):
+                    now = time.monotonic()
+                    with self.condition:
+                        if self.last_write is not None:
+                            self.reset_latencies.append(now -
+                                                        self.last_write)
+                        self.resets += 1
+                        self.reset_pending = True
+                        self.condition.notify_all()
+                    logger.debug('Reset received.')
+
+    def sleep(self, seconds=None):
+        # Sleep, unless a reset or shutdown happens first. Returns True if
+        # the sleep was interrupted. Without seconds, sleep until then.
+        if seconds is not None:
+            deadline = time.monotonic() + seconds
+        with self.condition:
+            while not (self.reset_pending or self.stop.is_set()):
+                if seconds is None:
+                    self.condition.wait()
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+            return True
+
+    def write(self, data):
+        view = memoryview(data)
+        while len(view) > 0 and not self.stop.is_set():
+            _, writable, _ = select.select([], [self.log_master], [], 0.2)
+            if len(writable) == 0:
+                continue
+            try:
+                view = view[os.write(self.log_master, view):]
+            except BlockingIOError:
+                pass
+        self.bytes += len(data)
+        self.last_write = time.monotonic()
+
+    def replay(self):
+        # The Pi boots at power on, as it does after a reset
+        power_on = True
+        while not self.stop.is_set():
+            with self.condition:
+                self.reset_pending = False
+            # The Arduino holds the RUN pin low before releasing it
+            if not power_on and self.sleep(self.reset_hold):
+                continue
+            power_on = False
+            if self.sleep(self.boot_time):
+                continue
+            self.segment = (self.segment + 1) % len(self.segments)
+            # Returns on a reset or shutdown
+            self.run_segment(self.segments[self.segment])
+
+    def run_segment(self, segment):
+        if self.random.random() < self.boot_failure_rate:
+            logger.info('Injecting boot failure.')
+            self.boot_failures += 1
+            self.sleep()
+            return
+        if self.random.random() < self.hang_rate:
+            hang_at = self.random.randrange(min(len(segment),
+                                                self.hang_window))
+        else:
+            hang_at = None
+        byte_time = 10.0 / self.baud
+        last_iteration = get_last_iteration(segment)
+        offset = 0
+        due = time.monotonic()
+        # Keep replaying the segment (like the Pi keeps running the
+        # benchmark) until the orchestrator resets
+        while True:
+            for idx, line in enumerate(segment):
+                if hang_at is not None and idx == hang_at:
+                    logger.info('Injecting hang.')
+                    self.hangs += 1
+                    self.sleep()
+                    return
+                if self.random.random() < self.garbage_rate:
+                    garbage = bytes(self.random.randrange(256)
+                                    for i in range(self.random.randrange(80)))
+                    line = garbage + b'\r\n' + line
+                    self.garbage_lines += 1
+                line = renumber(line, offset)
+                # Pace the output on the time the line is on the wire
+                due += len(line) * byte_time
+                if self.sleep(max(0.0, due - time.monotonic())):
+                    return
+                self.write(line)
+                self.lines += 1
+            hang_at = None
+            if last_iteration == 0:
+                # Nothing that makes progress, wait for a reset
+                self.sleep()
+                return
+            offset += last_iteration
+
+    def log_statistics(self):
+        logger.info('Simulator: {} lines, '.format(self.lines) +
+                    '{} bytes written, '.format(self.bytes) +
+                    '{} resets, {} hangs, '.format(self.resets, self.hangs) +
+                    '{} boot failures, '.format(self.boot_failures) +
+                    '{} garbage lines.'.format(self.garbage_lines))
+
+
+@click.command()
+@click.option('--log-file',
+              multiple=True,
+              required=True,
+              help='Recorded log file to replay, can be given more ' +
+                   'than once.')
+@click.option('--baud',
+              default=115200,
+              show_default=True,
+              help='Baud rate of the simulated UART.')
+@click.option('--boot-time',
+              default=2.0,
+              show_default=True,
+              help='Seconds between a reset and the first output.')
+@click.option('--hang-rate',
+              default=0.0,
+              show_default=True,
+              help='Probability that the Pi hangs during an experiment.')
+@click.option('--boot-failure-rate',
+              default=0.0,
+              show_default=True,
+              help='Probability that the Pi does not boot after a reset.')
+@click.option('--garbage-rate',
+              default=0.0,
+              show_default=True,
+              help='Probability per line of writing garbage bytes.')
+@click.option('--seed',
+              default=None,
+              type=int,
+              help='Seed of the fault injection.')
+@click_log.simple_verbosity_option(logger)
+def main(log_file, baud, boot_time, hang_rate, boot_failure_rate,
+         garbage_rate, seed):
+    segments = read_segments(log_file)
+    simulator = BoardSimulator(segments, baud, boot_time,
+                               hang_rate=hang_rate,
+                               boot_failure_rate=boot_failure_rate,
+                               garbage_rate=garbage_rate, seed=seed)
+    print('Logging tty: {}'.format(simulator.tty_logging))
+    print('Reset tty: {}'.format(simulator.tty_reset))
+    simulator.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    simulator.shutdown()
+    simulator.log_statistics()
+
+
+if __name__ == "__main__":
+    main()
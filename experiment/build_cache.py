@@ -0,0 +1,185 @@
+import click_log
+import logging
+import glob
+import hashlib
+import json
+import os
+from os.path import basename, getsize, isdir, isfile, join
+import shutil
+from threading import Lock
+import time
+
+logger = logging.getLogger(__name__)
+click_log.basic_config(logger)
+
+
+# Environment variables that determine the outcome of a build, these are
+# part of the cache key. BENCHMARK_CONFIG and RASPPI are set by
+# Compile.set_environment(), the others select the toolchain.
+toolchain_env = ['BENCHMARK_CONFIG', 'RASPPI', 'PATH',
+                 'PREFIX', 'PREFIX64', 'CROSS_COMPILE', 'CC', 'CXX']
+
+
+def get_build_key(benchmark_config, platform, raspberrypi, env):
+    # Hash that identifies a build, benchmark_config is the content of the
+    # generated benchmark_config.h and env the environment of the build.
+    h = hashlib.sha256()
+    h.update(benchmark_config.encode('utf-8'))
+    h.update('platform={}\n'.format(platform).encode('utf-8'))
+    h.update('raspberrypi={}\n'.format(raspberrypi).encode('utf-8'))
+    for var in toolchain_env:
+        h.update('{}={}\n'.format(var, env.get(var, '')).encode('utf-8'))
+    return h.hexdigest()
+
+
+class BuildCache:
+    # Content addressed cache of runtime binaries (kernel images). The key
+    # is a hash of the generated benchmark_config.h, the platform, the
+    # Raspberry Pi version and the toolchain environment. Each entry is a
+    # directory named after its key, containing the kernel image(s). The
+    # index file keeps the size and time of last use of each entry, which
+    # is used for LRU eviction when the cache grows beyond max_size bytes.
+    # An entry found by lookup() is pinned until it is installed, so that
+    # a store in between (e.g. of the next build in pipelined mode) does
+    # not evict it.
+    def __init__(self, cache_dir, tftp_dir, max_size,
+                 image_pattern='kernel*.img'):
+        self.cache_dir = cache_dir
+        self.tftp_dir = tftp_dir
+        self.max_size = max_size
+        self.image_pattern = image_pattern
+        self.index_file = join(cache_dir, 'index.json')
+        # statistics of this campaign
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # The cache is shared by the boards of a farm, which build at the
+        # same time
+        self.lock = Lock()
+        # key => number of lookups of the entry that are not installed yet
+        self.pinned = {}
+        if not isdir(cache_dir):
+            os.makedirs(cache_dir)
+        self.index = self.read_index()
+
+    def read_index(self):
+        index = {}
+        if isfile(self.index_file):
+            try:
+                with open(self.index_file) as f:
+                    index = json.load(f)
+            except (OSError, ValueError):
+                logger.warning('Could not read build cache index ' +
+                               '{}, starting empty.'.format(self.index_file))
+        # Forget entries whose directory has disappeared
+        return {key: entry for key, entry in index.items()
+                if isdir(join(self.cache_dir, key))}
+
+    def write_index(self):
+        tmpfile = self.index_file + '.tmp'
+        with open(tmpfile, 'w') as f:
+            json.dump(self.index, f, indent=1)
+        os.replace(tmpfile, self.index_file)
+
+    def lookup(self, key):
+        with self.lock:
+            if key in self.index:
+                self.hits += 1
+                self.index[key]['last_used'] = time.time()
+                self.pinned[key] = self.pinned.get(key, 0) + 1
+                self.write_index()
+                logger.info('Build cache hit for {}.'.format(key[:12]))
+                return True
+            else:
+                self.misses += 1
+                logger.info('Build cache miss for {}.'.format(key[:12]))
+                return False
+
+    def store(self, key, working_dir, label=None):
+        with self.lock:
+            self.store_entry(key, working_dir, label)
+
+    def store_entry(self, key, working_dir, label):
+        images = glob.glob(join(working_dir, self.image_pattern))
+        if len(images) == 0:
+            logger.warning('No kernel image matching ' +
+                           '{} found in {}, '.format(self.image_pattern,
+                                                     working_dir) +
+                           'not caching the build.')
+            return
+        entry_dir = join(self.cache_dir, key)
+        tmp_dir = entry_dir + '.tmp'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        size = 0
+        for image in images:
+            shutil.copy2(image, tmp_dir)
+            size += getsize(image)
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(tmp_dir, entry_dir)
+        self.index[key] = {'size': size,
+                           'label': label,
+                           'created': time.time(),
+                           'last_used': time.time()}
+        self.evict()
+        self.write_index()
+
+    def install(self, key, tftp_dir=None):
+        # Copy the cached kernel image(s) of a lookup() hit to the TFTP
+        # location, this replaces the 'make install' of a fresh build.
+        # Raises FileNotFoundError if the entry has no image, the board
+        # would boot the image of the previous experiment otherwise.
+        if tftp_dir is None:
+            tftp_dir = self.tftp_dir
+        entry_dir = join(self.cache_dir, key)
+        with self.lock:
+            try:
+                images = glob.glob(join(entry_dir, self.image_pattern))
+                if len(images) == 0:
+                    raise FileNotFoundError(
+                        'No kernel image matching ' +
+                        '{} in build cache entry '.format(self.image_pattern) +
+                        '{}'.format(entry_dir))
+                for image in images:
+                    logger.info('Installing cached ' +
+                                '{} to {}.'.format(basename(image),
+                                                   tftp_dir))
+                    shutil.copy2(image, tftp_dir)
+            finally:
+                self.unpin(key)
+
+    def unpin(self, key):
+        if self.pinned.get(key, 0) > 1:
+            self.pinned[key] -= 1
+        else:
+            self.pinned.pop(key, None)
+
+    def get_size(self):
+        return sum(entry['size'] for entry in self.index.values())
+
+    def evict(self):
+        # Remove least recently used entries until the cache fits, the
+        # pinned entries are kept
+        lru = sorted(self.index.items(), key=lambda item: item[1]['last_used'])
+        size = self.get_size()
+        for key, entry in lru:
+            if size <= self.max_size:
+                break
+            if key in self.pinned:
+                continue
+            logger.info('Evicting {} from the build cache.'.format(key[:12]))
+            shutil.rmtree(join(self.cache_dir, key), ignore_errors=True)
+            del self.index[key]
+            size -= entry['size']
+            self.evictions += 1
+
+    def log_statistics(self):
+        lookups = self.hits + self.misses
+        ratio = self.hits / lookups if lookups > 0 else 0.0
+        logger.info('Build cache: {} hits, {} misses '.format(self.hits,
+                                                              self.misses) +
+                    '(hit ratio {:.2f}), '.format(ratio) +
+                    '{} evictions, '.format(self.evictions) +
+                    '{} entries, '.format(len(self.index)) +
+                    '{:.1f} of '.format(self.get_size() / 2**20) +
+                    '{:.1f} MB used.'.format(self.max_size / 2**20))
@@ -0,0 +1,200 @@
+import click_log
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+from threading import Event, Lock, Thread
+import time
+
+logger = logging.getLogger(__name__)
+click_log.basic_config(logger)
+
+
+# The phases of a board: waiting for the build of the next experiment,
+# booting after a reset (until the first record) and measuring
+phases = ['build', 'boot', 'measurement']
+
+
+class BoardStatus:
+    # Progress of one board, see CampaignStatus. The phase follows from
+    # the calls of the main thread (build), the Resetter (reset, boot) and
+    # the LogProcessor (handle_record, measurement).
+    def __init__(self, campaign, name, log_processor, resetter,
+                 get_build_times=None):
+        self.campaign = campaign
+        self.name = name
+        self.log_processor = log_processor
+        self.resetter = resetter
+        # Callable that returns the build times (seconds) so far
+        self.get_build_times = get_build_times
+        self.lock = Lock()
+        self.phase = 'boot'
+        self.phase_start = time.monotonic()
+        self.phase_times = {phase: 0.0 for phase in phases}
+        self.number = None
+        self.label = None
+        # experiment number => timeout resets
+        self.resets = {}
+        self.start_resets = 0
+        # new iterations read in the measurement phase
+        self.iteration = None
+        self.observations = 0
+
+    def set_phase(self, phase):
+        with self.lock:
+            now = time.monotonic()
+            self.phase_times[self.phase] += now - self.phase_start
+            self.phase = phase
+            self.phase_start = now
+
+    def start_experiment(self, number, label):
+        with self.lock:
+            self.number = number
+            self.label = label
+            self.start_resets = self.resetter.timeout_resets
+
+    def finish_experiment(self, number):
+        with self.lock:
+            self.resets[number] = (self.resetter.timeout_resets -
+                                   self.start_resets)
+        self.campaign.experiment_done()
+
+    def reset(self):
+        # Reset handler of the Resetter
+        self.set_phase('boot')
+
+    def handle_record(self, record):
+        if self.phase == 'boot':
+            self.set_phase('measurement')
+        if record.iteration != self.iteration:
+            self.iteration = record.iteration
+            self.observations += 1
+
+    def get_status(self):
+        with self.lock:
+            phase_times = dict(self.phase_times)
+            phase_times[self.phase] += time.monotonic() - self.phase_start
+            resets = dict(self.resets)
+            if self.number is not None:
+                resets[self.number] = (self.resetter.timeout_resets -
+                                       self.start_resets)
+            status = {'name': self.name,
+                      'experiment': self.number,
+                      'label': self.label,
+                      'phase': self.phase,
+                      'phase_secs': phase_times}
+        log_processor = self.log_processor
+        measurement = phase_times['measurement']
+        status.update({
+            'observations': log_processor.get_iteration(),
+            'observations_per_sec': (self.observations / measurement
+                                     if measurement > 0 else 0.0),
+            'build_secs': (sum(self.get_build_times())
+                           if self.get_build_times is not None else None),
+            'timeout_resets': self.resetter.timeout_resets,
+            'resets_per_experiment': {str(number): count
+                                      for number, count in resets.items()},
+            'lines': log_processor.lines,
+            'records': log_processor.records,
+            'discarded': log_processor.discarded,
+            'no_match': log_processor.no_matches})
+        return status
+
+
+class CampaignStatus(Thread):
+    # Status of a campaign as JSON: the progress and ETA of the campaign,
+    # and per board the running experiment, its phase, the time spent per
+    # phase, observations per second, timeout resets per experiment and
+    # the lines discarded by the LogProcessor. Every interval seconds it
+    # is written to status_file (if given), and it is served on
+    # http://localhost:port/ (if port is given).
+    def __init__(self, status_file=None, port=None, interval=5.0):
+        super(CampaignStatus, self).__init__(daemon=True)
+        self.status_file = status_file
+        self.interval = interval
+        self.boards = []
+        self.lock = Lock()
+        self.total = 0
+        self.done = 0
+        self.starttime = time.monotonic()
+        self.stopped = Event()
+        self.server = None
+        if port is not None:
+            self.server = ThreadingHTTPServer(('127.0.0.1', port),
+                                              self.get_handler())
+            Thread(target=self.server.serve_forever, daemon=True).start()
+            logger.info('Serving the campaign status on ' +
+                        'http://127.0.0.1:{}/.'.format(port))
+
+    def get_handler(self):
+        campaign = self
+
+        class StatusHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = json.dumps(campaign.get_status(), indent=1).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug('Status request: ' + format % args)
+
+        return StatusHandler
+
+    def add_board(self, name, log_processor, resetter,
+                  get_build_times=None):
+        board = BoardStatus(self, name, log_processor, resetter,
+                            get_build_times)
+        with self.lock:
+            self.boards.append(board)
+        return board
+
+    def set_total(self, total):
+        with self.lock:
+            self.total = total
+
+    def experiment_done(self):
+        with self.lock:
+            self.done += 1
+
+    def get_status(self):
+        with self.lock:
+            elapsed = time.monotonic() - self.starttime
+            total = self.total
+            done = self.done
+            boards = list(self.boards)
+        if done > 0:
+            eta = elapsed / done * (total - done)
+        else:
+            eta = None
+        return {'time': time.time(),
+                'elapsed_secs': elapsed,
+                'experiments': total,
+                'done': done,
+                'eta_secs': eta,
+                'boards': [board.get_status() for board in boards]}
+
+    def write(self):
+        if self.status_file is None:
+            return
+        tmpfile = self.status_file + '.tmp'
+        with open(tmpfile, 'w') as f:
+            json.dump(self.get_status(), f, indent=1)
+            f.write('\n')
+        os.replace(tmpfile, self.status_file)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.write()
+
+    def close(self):
+        # Write the final status and stop serving
+        self.stopped.set()
+        if self.is_alive():
+            self.join()
+        self.write()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
@@ -0,0 +1,164 @@
+import click_log
+import logging
+import glob
+import os
+from os.path import basename, isdir, join
+from threading import Lock
+import numpy as np
+from blocklog import strip_log_suffix
+from logrecord import CYCLECOUNT, cycle_columns, event_columns, \
+    string_columns
+
+logger = logging.getLogger(__name__)
+click_log.basic_config(logger)
+
+
+def get_columnar_dir(logfile):
+    # The columnar store of output file x.log (or x.log.gz) is the
+    # directory x.columnar
+    return strip_log_suffix(logfile) + '.columnar'
+
+
+def get_chunk_pattern(prefix, table):
+    # Only complete chunk files, e.g. cycles-000000.npz
+    return '{}{}-{}.npz'.format(prefix, table, '[0-9]' * 6)
+
+
+def get_chunk_number(filename):
+    return int(filename[-len('000000.npz'):-len('.npz')])
+
+
+def truncate_store(directory, prefix, chunks):
+    # Remove the chunks of prefix from chunks[table] on, chunks is the
+    # number of chunks of each table at some moment (see
+    # ColumnarWriter.get_position)
+    for table in ['cycles', 'events']:
+        for filename in glob.glob(join(directory,
+                                       get_chunk_pattern(prefix, table))):
+            if get_chunk_number(filename) >= chunks[table]:
+                os.remove(filename)
+
+
+class ColumnarWriter:
+    # Record handler for the LogProcessor that writes the observations as
+    # typed columns, in chunk files of chunk_size records per table:
+    #   <directory>/<prefix>cycles-000000.npz
+    #   <directory>/<prefix>events-000000.npz
+    # The string columns are stored as unicode arrays, the other columns
+    # as int64 (eventtype is the event number). Each chunk file is written
+    # under a temporary name and then renamed, so the store only contains
+    # complete chunks and can be read at any moment. The records are
+    # handled by the LogProcessor thread, get_position() and flush() are
+    # called by the campaign at the start and the end of an experiment.
+    def __init__(self, directory, prefix='', chunk_size=10000):
+        self.directory = directory
+        self.prefix = prefix
+        self.chunk_size = chunk_size
+        self.lock = Lock()
+        if not isdir(directory):
+            os.makedirs(directory)
+        self.cycles = {column: [] for column in cycle_columns}
+        self.events = {column: [] for column in event_columns}
+        # Continue numbering after the chunks already in the directory (when
+        # resuming a campaign)
+        self.chunks = {}
+        for table in ['cycles', 'events']:
+            self.chunks[table] = len(glob.glob(
+                join(directory, get_chunk_pattern(prefix, table))))
+
+    def handle_record(self, record):
+        with self.lock:
+            self.add_record(record)
+
+    def add_record(self, record):
+        if record.kind == CYCLECOUNT:
+            columns = self.cycles
+            columns['benchmark'].append(record.benchmark)
+            columns['cycles'].append(record.cycles)
+        else:
+            columns = self.events
+            columns['pmu'].append(record.pmu)
+            columns['eventtype'].append(record.event_number)
+            columns['eventcount'].append(record.event_count)
+        columns['label'].append(record.label)
+        columns['config_series'].append(record.config_series)
+        columns['config_benchmarks'].append(record.config_benchmarks)
+        columns['cores'].append(record.cores)
+        columns['core'].append(record.core)
+        columns['iteration'].append(record.iteration)
+        columns['offset'].append(record.offset)
+        if len(columns['label']) >= self.chunk_size:
+            self.write_chunk(columns, 'cycles' if columns is self.cycles
+                             else 'events')
+
+    def write_chunk(self, columns, table):
+        if len(columns['label']) == 0:
+            return
+        arrays = {}
+        for column, values in columns.items():
+            if column in string_columns:
+                array = np.array(values, dtype=np.bytes_)
+                if column == 'benchmark':
+                    # as log2csv.py, underscores hurt LaTeX
+                    array = np.char.replace(array, b'_', b'')
+                arrays[column] = np.char.decode(array, 'utf-8')
+            else:
+                arrays[column] = np.array(values, dtype=np.int64)
+            values.clear()
+        filename = join(self.directory,
+                        '{}{}-{:06d}.npz'.format(self.prefix, table,
+                                                 self.chunks[table]))
+        # Written through a file object, np.savez would append .npz to the
+        # name, and the temporary file must not look like a chunk
+        tmpfile = filename + '.tmp'
+        with open(tmpfile, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmpfile, filename)
+        self.chunks[table] += 1
+        logger.debug('Wrote chunk {}.'.format(basename(filename)))
+
+    def write_chunks(self):
+        # Write the buffered records as (partial) chunks
+        self.write_chunk(self.cycles, 'cycles')
+        self.write_chunk(self.events, 'events')
+
+    def flush(self):
+        with self.lock:
+            self.write_chunks()
+
+    def get_position(self):
+        # (directory, prefix, number of chunks of each table) with the
+        # records read so far, the store is cut back to it by
+        # truncate_store() when the experiment that starts now is
+        # interrupted
+        with self.lock:
+            self.write_chunks()
+            return self.directory, self.prefix, dict(self.chunks)
+
+    def close(self):
+        # Write the last, partial, chunks. Call this after the LogProcessor
+        # thread has stopped.
+        self.flush()
+
+
+def read_table(directory, table, csv_compatible=False):
+    # Read all chunks of table ('cycles' or 'events') of a columnar store
+    # into one dataframe. With csv_compatible, eventtype is formatted as in
+    # the CSV files (e.g. 0x16).
+    # pandas is only imported to read a store, not by the writer (which
+    # runs in run_experiments.py)
+    import pandas as pd
+    columns = cycle_columns if table == 'cycles' else event_columns
+    chunks = []
+    for filename in sorted(glob.glob(join(directory,
+                                          get_chunk_pattern('*', table)))):
+        with np.load(filename) as chunk:
+            chunks.append(pd.DataFrame({column: chunk[column]
+                                        for column in columns}))
+    if len(chunks) == 0:
+        df = pd.DataFrame(columns=columns)
+    else:
+        df = pd.concat(chunks, ignore_index=True)
+    if csv_compatible and table == 'events':
+        df['eventtype'] = df['eventtype'].map('0x{:x}'.format)
+    return df
@@ -0,0 +1,143 @@
+import click_log
+import logging
+import numpy as np
+from logrecord import CYCLECOUNT
+
+logger = logging.getLogger(__name__)
+click_log.basic_config(logger)
+
+
+class ConvergenceMonitor:
+    # Adaptive stopping of an experiment. The monitor is added as a record
+    # handler to the LogProcessor and keeps the cycle counts of the running
+    # experiment per core. is_converged() is used by the LogProcessor as
+    # stop criterion instead of the fixed number of observations:
+    #  - criterion 'ci': the half-width of the 95% bootstrap confidence
+    #    interval of the mean, relative to the mean, is below tolerance.
+    #    The bootstrap only runs once the normal approximation of the
+    #    interval (from the running mean and variance) is below tolerance,
+    #    the checks before that take constant time,
+    #  - criterion 'max': the observed maximum (WCET) has not grown since
+    #    the previous check and lies within tolerance of the high quantile.
+    # This must hold for all cores of the experiment. An experiment always
+    # gets at least min_observations and at most max_observations, these
+    # limits can be set per experiment label.
+    def __init__(self, criterion='ci', tolerance=0.01, min_observations=100,
+                 max_observations=1000, check_interval=10, quantile=0.95,
+                 resamples=500):
+        if criterion not in ['ci', 'max']:
+            raise ValueError('Unknown criterion {}'.format(criterion))
+        self.criterion = criterion
+        self.tolerance = tolerance
+        self.min_observations = min_observations
+        self.max_observations = max_observations
+        self.check_interval = check_interval
+        self.quantile = quantile
+        self.resamples = resamples
+        self.rng = np.random.default_rng()
+        # label (bytes) => (min_observations, max_observations)
+        self.limits = {}
+        self.label = None
+        # core => list of cycle counts of the running experiment
+        self.cycles = {}
+        # core => [count, mean, sum of squared deviations] of the cycle
+        # counts (Welford's algorithm)
+        self.moments = {}
+        self.last_iteration = {}
+        self.last_max = {}
+        self.last_check = 0
+        self.converged = False
+
+    def set_limits(self, label, min_observations=None, max_observations=None):
+        if min_observations is None:
+            min_observations = self.min_observations
+        if max_observations is None:
+            max_observations = self.max_observations
+        self.limits[label.encode('utf-8')] = (min_observations,
+                                              max_observations)
+
+    def get_limits(self):
+        return self.limits.get(self.label, (self.min_observations,
+                                            self.max_observations))
+
+    def reset(self, label=None):
+        self.label = label
+        self.cycles = {}
+        self.moments = {}
+        self.last_iteration = {}
+        self.last_max = {}
+        self.last_check = 0
+        self.converged = False
+
+    def handle_record(self, record):
+        if record.kind != CYCLECOUNT:
+            return
+        if record.label != self.label:
+            # A new experiment has started
+            self.reset(record.label)
+        elif record.iteration < self.last_iteration.get(record.core, 0):
+            # The same experiment restarted, e.g. after a timeout reset
+            self.reset(record.label)
+        self.last_iteration[record.core] = record.iteration
+        self.cycles.setdefault(record.core, []).append(record.cycles)
+        moments = self.moments.setdefault(record.core, [0, 0.0, 0.0])
+        moments[0] += 1
+        delta = record.cycles - moments[1]
+        moments[1] += delta / moments[0]
+        moments[2] += delta * (record.cycles - moments[1])
+
+    def is_converged(self, iteration):
+        min_observations, max_observations = self.get_limits()
+        if iteration <= min_observations:
+            return False
+        if iteration >= max_observations:
+            logger.info('Maximum number of observations reached ' +
+                        'without convergence.')
+            return True
+        if iteration - self.last_check < self.check_interval:
+            return self.converged
+        self.last_check = iteration
+        if len(self.cycles) == 0:
+            return False
+        self.converged = all(self.is_core_converged(core)
+                             for core in self.cycles)
+        if self.converged:
+            logger.info('Statistics converged after ' +
+                        '{} observations.'.format(iteration))
+        return self.converged
+
+    def get_normal_halfwidth(self, core):
+        # Half-width of the 95% confidence interval of the mean by the
+        # normal approximation
+        count, mean, m2 = self.moments[core]
+        if count < 2:
+            return float('inf')
+        return 1.96 * np.sqrt(m2 / (count - 1) / count)
+
+    def is_core_converged(self, core):
+        if self.criterion == 'ci':
+            mean = self.moments[core][1]
+            if mean == 0:
+                return True
+            if self.get_normal_halfwidth(core) / mean >= self.tolerance:
+                return False
+            data = np.asarray(self.cycles[core], dtype=np.float64)
+            mean = data.mean()
+            samples = self.rng.choice(data, (self.resamples, len(data)))
+            means = samples.mean(axis=1)
+            lo, hi = np.quantile(means, [0.025, 0.975])
+            halfwidth = (hi - lo) / 2
+            logger.debug('core {}: mean={:.1f} '.format(core, mean) +
+                         'ci half-width={:.1f}'.format(halfwidth))
+            return halfwidth / mean < self.tolerance
+        else:
+            data = np.asarray(self.cycles[core], dtype=np.float64)
+            maximum = data.max()
+            high = np.quantile(data, self.quantile)
+            stable = maximum <= self.last_max.get(core, 0)
+            self.last_max[core] = maximum
+            logger.debug('core {}: max={:.0f} '.format(core, maximum) +
+                         'q{}={:.0f}'.format(self.quantile, high))
+            if high == 0:
+                return stable
+            return stable and (maximum - high) / high < self.tolerance
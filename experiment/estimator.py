@@ -0,0 +1,341 @@
+import click_log
+import logging
+import glob
+import io
+import math
+from os.path import join
+import re
+from blocklog import get_labels, is_block_log, read_lines
+from logrecord import parse_record
+from planner import build_times, clock_rates, format_duration, \
+    get_build_kind, get_measurement_time, reboot_time, uart_bytes_per_second
+
+logger = logging.getLogger(__name__)
+click_log.basic_config(logger)
+
+
+# The estimate of a campaign combines the costs of planner.py with what
+# previous campaigns logged in experiment/output/ (raw or block-compressed
+# logs). Per experiment label the logs tell the number of iterations, the
+# bytes reported per iteration and the cycle counts per core. Circle also
+# prefixes every line with the time since boot, which gives the time of an
+# iteration and of the boot (until the first record) directly.
+#
+# Each estimate comes with a lower and an upper bound. Estimates based on
+# the constants of planner.py (build, reboot and the WCET baseline model)
+# get the bounds model_bounds times the estimate. Measurements based on
+# the logs get z standard deviations of the sum of the iterations, and
+# the range of the number of observations with adaptive stopping.
+model_bounds = (0.5, 2.0)
+z = 1.96
+
+# e.g. '00:03:51.50 CoRunners: CYCLECOUNT ...', some lines start with '\r'
+timestamp_regex = re.compile(rb'\s*([0-9]+):([0-9]{2}):([0-9]{2}\.[0-9]+) ')
+
+
+def get_timestamp(line):
+    m = timestamp_regex.match(line)
+    if m is None:
+        return None
+    hours, minutes, seconds = m.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+class History:
+    # What the logs tell about the experiments with one label. When a
+    # label occurs in several logs (or several times in one), all runs are
+    # combined: the iteration times are pooled, the counts are averaged.
+    def __init__(self, label):
+        self.label = label
+        self.runs = 0
+        self.iterations = 0
+        self.bytes = 0
+        # iteration => largest cycle count over the cores, of the current
+        # run
+        self.cycles = {}
+        self.max_cycles = []
+        # time since boot of the first record and of each new iteration
+        self.first_times = []
+        self.gaps = []
+        self.iteration = None
+        self.iteration_time = None
+
+    def start_run(self):
+        self.flush()
+        self.runs += 1
+        self.iteration = None
+        self.iteration_time = None
+
+    def add(self, record, line, timestamp):
+        if self.iteration is not None and (
+                record.iteration < self.iteration or
+                (timestamp is not None and self.iteration_time is not None
+                 and timestamp < self.iteration_time)):
+            # The Pi was reset and runs the experiment again
+            self.start_run()
+        self.bytes += len(line)
+        if record.cycles is not None:
+            self.cycles[record.iteration] = max(
+                self.cycles.get(record.iteration, 0), record.cycles)
+        if record.iteration != self.iteration:
+            self.iterations += 1
+            self.iteration = record.iteration
+            if timestamp is not None:
+                if self.iteration_time is None:
+                    self.first_times.append(timestamp)
+                else:
+                    self.gaps.append(timestamp - self.iteration_time)
+                self.iteration_time = timestamp
+
+    def flush(self):
+        self.max_cycles.extend(self.cycles.values())
+        self.cycles = {}
+
+    def get_iteration_times(self, raspberrypi):
+        # Seconds per iteration: the time between iterations if the log
+        # has timestamps, otherwise the cycles of the slowest core plus the
+        # time to report the records of an iteration.
+        self.flush()
+        if len(self.gaps) > 1:
+            return self.gaps, 'timestamps'
+        if not self.max_cycles or self.iterations == 0:
+            return None, None
+        clock = clock_rates.get(int(raspberrypi), 1.2e9)
+        report = self.bytes / self.iterations / uart_bytes_per_second
+        return [cycles / clock + report for cycles in self.max_cycles], \
+            'cycles'
+
+    def get_boot_time(self, iteration_time):
+        # Time from boot to the first record, minus the first iteration
+        if not self.first_times:
+            return None
+        first = sum(self.first_times) / len(self.first_times)
+        return max(0.0, first - iteration_time)
+
+    def get_observations(self):
+        return self.iterations / self.runs if self.runs > 0 else None
+
+
+def get_log_lines(log_file, labels):
+    # The lines of log_file that may hold records of labels, None if it
+    # has none of them. Only the blocks of labels of a block log with
+    # index are decompressed (see blocklog.py).
+    if is_block_log(log_file):
+        found = get_labels(log_file)
+        if found is not None and not set(found) & set(labels):
+            return None
+        return read_lines(log_file, labels)
+    with open(log_file, 'rb') as f:
+        data = f.read()
+    if not any(b'label: ' + label.encode('utf-8') + b' ' in data
+               for label in labels):
+        return None
+    return io.BytesIO(data)
+
+
+def read_history(log_dir, labels):
+    # label => History of the given labels (str) found in the logs
+    # (*.log and *.log.gz) in log_dir. Files that mention none of them are
+    # not parsed.
+    histories = {}
+    keys = {label.encode('utf-8'): label for label in labels}
+    log_files = (glob.glob(join(log_dir, '*.log')) +
+                 glob.glob(join(log_dir, '*.log.gz')))
+    for log_file in sorted(log_files):
+        lines = get_log_lines(log_file, set(labels))
+        if lines is None:
+            continue
+        logger.debug('Reading history from {}.'.format(log_file))
+        previous = None
+        for line in lines:
+            record = parse_record(line)
+            if record is None or record.label not in keys:
+                continue
+            label = keys[record.label]
+            history = histories.get(label)
+            if history is None:
+                history = histories[label] = History(label)
+            if record.label != previous:
+                history.start_run()
+                previous = record.label
+            history.add(record, line, get_timestamp(line))
+    logger.info('Found the history of {} '.format(len(histories)) +
+                'of {} experiment labels '.format(len(keys)) +
+                'in {}.'.format(log_dir))
+    return histories
+
+
+def get_mean_sd(values):
+    mean = sum(values) / len(values)
+    if len(values) < 2:
+        return mean, 0.0
+    var = sum((value - mean) ** 2 for value in values) / (len(values) - 1)
+    return mean, math.sqrt(var)
+
+
+def get_model_estimate(seconds):
+    return (seconds, model_bounds[0] * seconds, model_bounds[1] * seconds)
+
+
+class RowEstimate:
+    # Estimate of build, boot and measurement of one experiment, each a
+    # tuple (estimate, lower bound, upper bound) in seconds
+    def __init__(self, row, label, build_kind, build, boot, measurement,
+                 observations, source):
+        self.row = row
+        self.label = label
+        self.build_kind = build_kind
+        self.build = build
+        self.boot = boot
+        self.measurement = measurement
+        self.observations = observations
+        self.source = source
+
+    def get_duration(self, pipelined=False, first=True):
+        # The duration with its bounds, pipelined the build overlaps the
+        # measurement of the previous experiment
+        if pipelined and not first:
+            return tuple(boot + max(build, measurement)
+                         for build, boot, measurement in zip(
+                             self.build, self.boot, self.measurement))
+        return tuple(build + boot + measurement
+                     for build, boot, measurement in zip(
+                         self.build, self.boot, self.measurement))
+
+
+def get_observation_range(row, min_observations, max_observations,
+                          adaptive_stop):
+    # Without adaptive stopping the Resetter stops after min_observations,
+    # with adaptive stopping anywhere between the row's limits
+    if adaptive_stop is None:
+        return min_observations, min_observations
+    low = row.get('min observations')
+    high = row.get('max observations')
+    return (low if low is not None else min_observations,
+            high if high is not None else max_observations)
+
+
+def estimate_row(row, label, previous, history, min_observations,
+                 max_observations=None, adaptive_stop=None):
+    build_kind = get_build_kind(previous, row)
+    build = get_model_estimate(build_times[build_kind])
+    low, high = get_observation_range(row, min_observations,
+                                      max_observations, adaptive_stop)
+    observations = low
+    if history is not None and high > low:
+        # Adaptive stopping, expect as many observations as last time
+        observations = min(high, max(low, round(history.get_observations())))
+    times, source = (None, None)
+    if history is not None:
+        times, source = history.get_iteration_times(row['raspberrypi'])
+    if times is None:
+        measurement = get_model_estimate(get_measurement_time(row,
+                                                              observations))
+        measurement = (measurement[0],
+                       model_bounds[0] * get_measurement_time(row, low),
+                       model_bounds[1] * get_measurement_time(row, high))
+        boot = get_model_estimate(reboot_time)
+        source = 'model'
+    else:
+        mean, sd = get_mean_sd(times)
+        measurement = (observations * mean,
+                       max(0.0, low * mean - z * math.sqrt(low) * sd),
+                       high * mean + z * math.sqrt(high) * sd)
+        boot = get_model_estimate(reboot_time)
+        first = history.get_boot_time(mean)
+        if first is not None:
+            boot = tuple(value + first for value in boot)
+    return RowEstimate(row, label, build_kind, build, boot, measurement,
+                       observations, source)
+
+
+def estimate_rows(rows, labels, histories, min_observations,
+                  max_observations=None, adaptive_stop=None):
+    # The estimates of running rows (with labels) in order on one board
+    estimates = []
+    previous = None
+    for row, label in zip(rows, labels):
+        estimates.append(estimate_row(row, label, previous,
+                                      histories.get(label),
+                                      min_observations, max_observations,
+                                      adaptive_stop))
+        previous = row
+    return estimates
+
+
+def format_bounds(seconds):
+    return '{} [{} - {}]'.format(*[format_duration(value)
+                                   for value in seconds])
+
+
+def log_estimates(estimates, pipelined=False):
+    total = (0.0, 0.0, 0.0)
+    for position, estimate in enumerate(estimates):
+        duration = estimate.get_duration(pipelined, position == 0)
+        total = tuple(a + b for a, b in zip(total, duration))
+        logger.info('{:3d}. experiment '.format(position + 1) +
+                    '{} '.format(estimate.row['experiment number']) +
+                    '{}: '.format(estimate.label) +
+                    'build {} '.format(format_duration(estimate.build[0])) +
+                    '({}), '.format(estimate.build_kind) +
+                    'boot {}, '.format(format_duration(estimate.boot[0])) +
+                    'measurement ' +
+                    '{} '.format(format_bounds(estimate.measurement)) +
+                    'of {} observations '.format(estimate.observations) +
+                    '({}), '.format(estimate.source) +
+                    'done after {}'.format(format_duration(total[0])))
+    return total
+
+
+def estimate_boards(rows, labels, boards, histories, is_compatible,
+                    min_observations, max_observations=None,
+                    adaptive_stop=None):
+    # Simulate the farm: like the ExperimentQueue of run_experiments.py, the
+    # board that is free first takes the first pending row it can run.
+    # Returns board name => list of estimates.
+    pending = list(zip(rows, labels))
+    free = {board['name']: 0.0 for board in boards}
+    previous = {board['name']: None for board in boards}
+    estimates = {board['name']: [] for board in boards}
+    idle = set()
+    while pending and len(idle) < len(boards):
+        board = min((board for board in boards if board['name'] not in idle),
+                    key=lambda board: free[board['name']])
+        name = board['name']
+        for i, (row, label) in enumerate(pending):
+            if is_compatible(row, board):
+                break
+        else:
+            idle.add(name)
+            continue
+        row, label = pending.pop(i)
+        estimate = estimate_row(row, label, previous[name],
+                                histories.get(label), min_observations,
+                                max_observations, adaptive_stop)
+        estimates[name].append(estimate)
+        free[name] += estimate.get_duration()[0]
+        previous[name] = row
+    return estimates
+
+
+def log_campaign_estimate(estimates, pipelined=False):
+    total = log_estimates(estimates, pipelined)
+    sources = [estimate.source for estimate in estimates]
+    logger.info('Estimated duration of {} '.format(len(estimates)) +
+                'experiments: {} '.format(format_bounds(total)) +
+                '({} from timestamps, '.format(sources.count('timestamps')) +
+                '{} from cycle counts and '.format(sources.count('cycles')) +
+                '{} from the model).'.format(sources.count('model')))
+    return total
+
+
+def log_boards_estimate(board_estimates):
+    campaign = (0.0, 0.0, 0.0)
+    for name, estimates in board_estimates.items():
+        logger.info('Board {}:'.format(name))
+        total = log_campaign_estimate(estimates)
+        campaign = tuple(max(a, b) for a, b in zip(campaign, total))
+    logger.info('Estimated duration of the campaign on ' +
+                '{} boards: '.format(len(board_estimates)) +
+                '{}.'.format(format_bounds(campaign)))
+    return campaign
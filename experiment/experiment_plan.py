@@ -0,0 +1,341 @@
+import click
+import click_log
+import logging
+import hashlib
+import json
+import os
+from os.path import basename, isfile
+
+logger = logging.getLogger(__name__)
+click_log.basic_config(logger)
+
+
+# The benchmarks per benchmark series, the digits of the benchmark series
+# and benchmark configuration strings index these lists (starting at 1)
+benchmark_list = [
+    ['linear array access',
+     'linear array write',
+     'random array access',
+     'random array write'],
+    ['malardalen bsort100',
+     'malardalen ns',
+     'malardalen matmult',
+     'fir'],
+    ['sd-vbs disparity',
+     'sd-vbs mser',
+     'sd-vbs svm',
+     'sd-vbs stitch']]
+max_cores = 4
+# The maximum number of PMU events per core
+max_pmu_events = 4
+platforms = ['xrtos', 'circle']
+raspberrypis = [3, 4]
+
+# Version of the plan file format, a plan of another version is not loaded
+# (compile the spreadsheet again).
+plan_version = 1
+
+# The columns of an experiment spreadsheet and their types in the plan:
+#   int, bool  -- converted from the numbers in the spreadsheet,
+#   str        -- with the quotes that keep Excel from turning strings like
+#                 '12' into numbers removed,
+#   number     -- int if the value is integral, otherwise float.
+# Optional columns may be left out of the spreadsheet, optional values
+# may be empty. Missing values are None in the plan.
+plan_columns = [
+    # (column, type, required)
+    ('experiment number', 'int', True),
+    ('platform', 'str', True),
+    ('raspberrypi', 'int', True),
+    ('benchmark series', 'str', True),
+    ('benchmark configuration', 'str', True),
+    ('enable mmu', 'bool', True),
+    ('enable screen', 'bool', True),
+    ('no cache management', 'bool', True),
+    ('experiment label', 'str', True),
+    ('pmu core 0', 'str', False),
+    ('pmu core 1', 'str', False),
+    ('pmu core 2', 'str', False),
+    ('pmu core 3', 'str', False),
+    ('input size core0', 'int', True),
+    ('input size core1', 'int', True),
+    ('input size core2', 'int', True),
+    ('input size core3', 'int', True),
+    ('delay step countdown', 'int', True),
+    ('measured wcet baseline', 'number', False),
+    ('cycles per step', 'number', False),
+    ('cycles per count', 'number', False),
+    ('synbench repeat', 'int', False),
+    ('min observations', 'int', False),
+    ('max observations', 'int', False),
+]
+
+
+def get_plan_file(xlsx_file):
+    # The plan of spreadsheet x.xlsx is written to x.plan.json
+    if xlsx_file.endswith('.xlsx'):
+        xlsx_file = xlsx_file[:-len('.xlsx')]
+    return xlsx_file + '.plan.json'
+
+
+def is_plan_file(filename):
+    return filename.endswith('.plan.json')
+
+
+def get_file_hash(filename):
+    h = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        h.update(f.read())
+    return h.hexdigest()
+
+
+def get_row_hash(row):
+    h = hashlib.sha256()
+    h.update(json.dumps(row, sort_keys=True).encode('utf-8'))
+    return h.hexdigest()
+
+
+def is_missing(value):
+    # empty cells are read as NaN
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def convert_value(value, kind):
+    if kind == 'str':
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        value = str(value)
+        if value.startswith("'"):
+            value = value[1:]
+        if value.endswith("'"):
+            value = value[:-1]
+        return value
+    if isinstance(value, str):
+        value = float(value.strip("'"))
+    if kind == 'bool':
+        return bool(value)
+    if kind == 'int':
+        if float(value) != int(value):
+            raise ValueError('{} is not an integer'.format(value))
+        return int(value)
+    if float(value).is_integer():
+        return int(value)
+    return float(value)
+
+
+def convert_row(values, columns):
+    # Typed plan row of the spreadsheet row values (column => value)
+    row = {}
+    for column, kind, required in plan_columns:
+        value = values.get(column)
+        if is_missing(value):
+            if required and column in columns:
+                raise ValueError('{} is empty'.format(column))
+            row[column] = None
+            continue
+        try:
+            row[column] = convert_value(value, kind)
+        except ValueError as e:
+            raise ValueError('{}: {}'.format(column, e))
+    return row
+
+
+def read_spreadsheet(xlsx_file):
+    # pandas and openpyxl take a while to import, they are only needed to
+    # compile a plan
+    import pandas as pd
+    # The first row is documentation, it should not be included
+    df = pd.read_excel(xlsx_file, skiprows=[0])
+    return df.dropna(how='all')
+
+
+def get_strings(dataframe, column):
+    # The column as strings without the quotes, empty cells are ''
+    if column not in dataframe.columns:
+        return dataframe.index.to_series().map(lambda i: '')
+    strings = dataframe[column].fillna('').astype(str)
+    return strings.str.replace(r"^'|'$|\.0$", '', regex=True)
+
+
+def get_baseline_keys(dataframe, series, bench):
+    # Key of the 1-core baseline of each experiment: the benchmark on core
+    # 0 with the same platform settings and input size (as in
+    # slowdown_factors.get_experiment_labels)
+    key = series.str[0] + bench.str[0]
+    for column in ['platform', 'raspberrypi', 'enable mmu', 'enable screen',
+                   'no cache management', 'input size core0']:
+        key += '_' + get_strings(dataframe, column).str.lower()
+    return key
+
+
+def get_problems(dataframe):
+    # Checks of all rows at once, returns lists of (mask, message) of the
+    # errors (the experiment cannot run) and of the warnings (the
+    # experiment runs, but its analysis will be off).
+    series = get_strings(dataframe, 'benchmark series')
+    bench = get_strings(dataframe, 'benchmark configuration')
+    cores = series.str.len()
+    errors = []
+    warnings = []
+
+    errors.append((cores != bench.str.len(),
+                   'benchmark series and benchmark configuration have ' +
+                   'different lengths'))
+    errors.append(((cores < 1) | (cores > max_cores),
+                   'benchmark series must be 1 to {} '.format(max_cores) +
+                   'digits'))
+    errors.append((~series.str.fullmatch(
+        '[1-{}]*'.format(len(benchmark_list))),
+                   'benchmark series digits must be 1 to ' +
+                   '{}'.format(len(benchmark_list))))
+    benchmarks = min(len(benchmarks) for benchmarks in benchmark_list)
+    errors.append((~bench.str.fullmatch('[1-{}]*'.format(benchmarks)),
+                   'benchmark configuration digits must be 1 to ' +
+                   '{}'.format(benchmarks)))
+    for core in range(max_cores):
+        pmu = get_strings(dataframe, 'pmu core {}'.format(core))
+        errors.append((~pmu.str.fullmatch('[0-9]{{0,{}}}'.format(
+            max_pmu_events)),
+                       'pmu core {} must be at most '.format(core) +
+                       '{} event codes (0 to 9)'.format(max_pmu_events)))
+        warnings.append(((pmu.str.len() > 0) & (cores <= core),
+                         'pmu core {} is set, but core '.format(core) +
+                         '{} does not run a benchmark'.format(core)))
+        inputsize = dataframe['input size core{}'.format(core)]
+        errors.append((inputsize.isnull(),
+                       'input size core{} is missing'.format(core)))
+    errors.append((~get_strings(dataframe, 'platform').str.lower().isin(
+        platforms), 'platform must be one of {}'.format(platforms)))
+    errors.append((~dataframe['raspberrypi'].isin(raspberrypis),
+                   'raspberrypi must be one of {}'.format(raspberrypis)))
+
+    warnings.append((dataframe['experiment number'].duplicated(keep=False),
+                     'experiment number is used more than once'))
+    # The data processing takes the input size from the label
+    label_inputsize = dataframe['experiment label'].astype(str).str.extract(
+        r'_INPUTSIZE([0-9]+)$', expand=False)
+    warnings.append((label_inputsize !=
+                     get_strings(dataframe, 'input size core0'),
+                     'experiment label does not end with _INPUTSIZE and ' +
+                     'the input size of core 0'))
+    # Every co-runner experiment is compared to its 1-core baseline
+    keys = get_baseline_keys(dataframe, series, bench)
+    warnings.append(((cores > 1) & ~keys.isin(keys[cores == 1]),
+                     'there is no 1-core baseline experiment with the ' +
+                     'same benchmark, platform settings and input size'))
+    return errors, warnings
+
+
+def validity_checks(dataframe):
+    # Check the whole spreadsheet before any experiment is built, log the
+    # experiment numbers of the rows with problems. Raises ValueError if
+    # there are errors.
+    errors, warnings = get_problems(dataframe)
+    numbers = dataframe['experiment number']
+    invalid = None
+    for mask, message in errors:
+        if mask.any():
+            logger.error('Experiments {}: '.format(numbers[mask].tolist()) +
+                         '{}.'.format(message))
+            invalid = mask if invalid is None else invalid | mask
+    for mask, message in warnings:
+        if mask.any():
+            logger.warning('Experiments {}: '.format(numbers[mask].tolist()) +
+                           '{}.'.format(message))
+    if invalid is not None:
+        raise ValueError('{} invalid experiments'.format(invalid.sum()))
+
+
+def compile_plan(xlsx_file):
+    # Read and validate the spreadsheet, returns the plan: the typed
+    # experiments (rows) with a hash each, and the hash of the spreadsheet
+    # to detect that the plan is out of date.
+    df = read_spreadsheet(xlsx_file)
+    for column, kind, required in plan_columns:
+        if required and column not in df.columns:
+            raise ValueError('Column "{}" is missing '.format(column) +
+                             'in {}'.format(xlsx_file))
+    validity_checks(df)
+    experiments = []
+    for values in df.to_dict('records'):
+        try:
+            row = convert_row(values, df.columns)
+        except ValueError as e:
+            raise ValueError('Experiment ' +
+                             '{}: {}'.format(values.get('experiment number'),
+                                             e))
+        experiments.append({'hash': get_row_hash(row), 'row': row})
+    return {'version': plan_version,
+            'source': basename(xlsx_file),
+            'source_hash': get_file_hash(xlsx_file),
+            'columns': {column: kind for column, kind, _ in plan_columns},
+            'experiments': experiments}
+
+
+def write_plan(plan, plan_file):
+    tmpfile = plan_file + '.tmp'
+    with open(tmpfile, 'w') as f:
+        json.dump(plan, f, indent=1, ensure_ascii=False)
+        f.write('\n')
+    os.replace(tmpfile, plan_file)
+
+
+def read_plan(plan_file):
+    with open(plan_file, encoding='utf-8') as f:
+        plan = json.load(f)
+    if plan.get('version') != plan_version:
+        raise ValueError('Plan {} has version '.format(plan_file) +
+                         '{}, expected '.format(plan.get('version')) +
+                         '{}, compile it again'.format(plan_version))
+    return plan
+
+
+def load_experiments(input_file):
+    # The experiments (list of rows, column => value) of a plan file or of
+    # a spreadsheet. The plan of a spreadsheet is used when it is up to
+    # date, otherwise the spreadsheet itself is compiled (which is slow).
+    if is_plan_file(input_file):
+        plan = read_plan(input_file)
+    else:
+        plan_file = get_plan_file(input_file)
+        plan = None
+        if isfile(plan_file):
+            plan = read_plan(plan_file)
+            if plan['source_hash'] != get_file_hash(input_file):
+                logger.warning('Plan {} is out of date, '.format(plan_file) +
+                               'reading {}.'.format(input_file))
+                plan = None
+        if plan is None:
+            logger.info('Compiling {}, '.format(input_file) +
+                        'use experiment_plan.py to compile it once.')
+            plan = compile_plan(input_file)
+    return [experiment['row'] for experiment in plan['experiments']]
+
+
+@click.command()
+@click.option('--input-file',
+              required=True,
+              multiple=True,
+              help='Path and filename of the input Excel file, can be ' +
+                   'given more than once.')
+@click_log.simple_verbosity_option(logger)
+def main(input_file):
+    # Compile each spreadsheet x.xlsx into the plan x.plan.json
+    for xlsx_file in input_file:
+        if not isfile(xlsx_file):
+            logger.error('Error: input file {} '.format(xlsx_file) +
+                         'does not exist!')
+            exit(1)
+        try:
+            plan = compile_plan(xlsx_file)
+        except ValueError as e:
+            logger.error('Error in {}: {}'.format(xlsx_file, e))
+            exit(1)
+        plan_file = get_plan_file(xlsx_file)
+        write_plan(plan, plan_file)
+        logger.info('Wrote {} experiments '.format(len(plan['experiments'])) +
+                    'to {}.'.format(plan_file))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import click_log
+import logging
+import json
+import os
+from os.path import isfile
+from threading import Lock
+import time
+
+logger = logging.getLogger(__name__)
+click_log.basic_config(logger)
+
+
+class Journal:
+    # Write-ahead journal of a campaign. Each line is a JSON object with an
+    # event for an experiment number:
+    #   start  -- the experiment is installed and about to run, with the
+    #             hash of its build,
+    #   finish -- enough observations have been read, with the number of
+    #             observations and the number of timeout resets,
+    #   abort  -- the log and the columnar store have been cut back to
+    #             where the experiment started (see truncate_interrupted
+    #             in run_experiments.py).
+    # Every line is flushed to disk before the campaign continues, so after
+    # a crash the journal tells which experiments have been completed.
+    def __init__(self, filename):
+        self.filename = filename
+        self.lock = Lock()
+        # number => last start entry, for experiments not finished yet
+        self.running = {}
+        # number => finish entry
+        self.completed = {}
+        partial = False
+        if isfile(filename):
+            partial = self.read()
+        self.filehandle = open(filename, 'a')
+        if partial:
+            # Terminate a partially written last line
+            self.write(None)
+
+    def read(self):
+        # Returns True if the last line is not terminated
+        line = '\n'
+        with open(self.filename) as f:
+            for lineno, line in enumerate(f, 1):
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # e.g. a partially written last line
+                    logger.warning('Skipping malformed line ' +
+                                   '{} of journal {}.'.format(lineno,
+                                                              self.filename))
+                    continue
+                number = entry['number']
+                if entry['event'] == 'start':
+                    self.running[number] = entry
+                elif entry['event'] == 'finish':
+                    self.running.pop(number, None)
+                    self.completed[number] = entry
+                elif entry['event'] == 'abort':
+                    self.running.pop(number, None)
+        logger.info('Journal {}: {} '.format(self.filename,
+                                             len(self.completed)) +
+                    'experiments completed, ' +
+                    '{} incomplete.'.format(len(self.running)))
+        return not line.endswith('\n')
+
+    def write(self, entry):
+        with self.lock:
+            if entry is not None:
+                self.filehandle.write(json.dumps(entry))
+            self.filehandle.write('\n')
+            self.filehandle.flush()
+            os.fsync(self.filehandle.fileno())
+
+    def is_completed(self, number):
+        return int(number) in self.completed
+
+    def start(self, number, build_hash, timeout_resets, log_position=None,
+              columnar_position=None):
+        # timeout_resets is the Resetter's count at the start, the count at
+        # the finish is used to compute the resets for this experiment.
+        # log_position is (log file, size of the log in bytes) at the start
+        # and columnar_position (directory, prefix, number of chunks per
+        # table) that of the columnar store, the log and the store are cut
+        # back to them when the experiment is interrupted.
+        entry = {'event': 'start',
+                 'number': int(number),
+                 'build_hash': build_hash,
+                 'time': time.time(),
+                 'timeout_resets': timeout_resets}
+        if log_position is not None:
+            entry['log_file'], entry['log_offset'] = log_position
+        if columnar_position is not None:
+            (entry['columnar_dir'], entry['columnar_prefix'],
+             entry['columnar_chunks']) = columnar_position
+        self.running[int(number)] = entry
+        self.write(entry)
+
+    def finish(self, number, observations, timeout_resets):
+        start = self.running.pop(int(number), None)
+        if start is not None:
+            timeout_resets -= start['timeout_resets']
+        entry = {'event': 'finish',
+                 'number': int(number),
+                 'time': time.time(),
+                 'observations': observations,
+                 'resets': timeout_resets}
+        self.completed[int(number)] = entry
+        self.write(entry)
+
+    def get_interrupted(self):
+        # The start entries of the experiments that were started, but not
+        # finished
+        return list(self.running.values())
+
+    def abort(self, number):
+        self.running.pop(int(number), None)
+        self.write({'event': 'abort',
+                    'number': int(number),
+                    'time': time.time()})
+
+    def close(self):
+        self.filehandle.close()
@@ -0,0 +1,328 @@
+import click
+import click_log
+import logging
+import os
+from os.path import getmtime, getsize, isdir, isfile, join
+import re
+import time
+from blocklog import get_block_log, is_block_log, read_blocks, \
+    read_lines, strip_log_suffix
+from logrecord import cycle_columns, event_columns, string_columns
+
+logger = logging.getLogger(__name__)
+click_log.basic_config(logger)
+
+
+# Converts a raw or block log (see blocklog.py) in one pass into the CSV
+# files with the observations: x.log into x-cycles.csv and x-events.csv.
+# The lines are split into fields like awk does (on spaces and tabs, not
+# on the other whitespace of bytes.split(), e.g. the carriage returns
+# before many lines), a CYCLECOUNT line must have 21 fields and an
+# EVENTCOUNT line 23, e.g.
+#   INFO: core0(): CYCLECOUNT label: XRTOS_PI3_BENCH_... config_series: '2'
+#     config_benchmarks: '1' benchmark: malardalen_bsort100 cores: 1
+#     core: 0 cycle_count:        57337 iteration: 1 offset: 0
+# The values are the odd fields from the 5th on. Lines with another number
+# of fields, or with numbers that cannot be read, are skipped with a
+# warning with their line number.
+split_table = bytes.maketrans(b'\r\x0b\x0c', b'\x00\x00\x00')
+CYCLECOUNT = b'CYCLECOUNT'
+EVENTCOUNT = b'EVENTCOUNT'
+cycle_fields = 21
+event_fields = 23
+
+
+def parse_cycles(fields):
+    (label, config_series, config_bench, benchmark, cores, core, cycles,
+     iteration, offset) = fields[4::2]
+    # remove underscores from benchmark name, it hurts LaTeX
+    return (label.decode('utf-8'), config_series.decode('utf-8'),
+            config_bench.decode('utf-8'),
+            benchmark.replace(b'_', b'').decode('utf-8'), int(cores),
+            int(core), int(cycles), int(iteration), int(offset))
+
+
+def parse_events(fields):
+    (label, config_series, config_bench, cores, core, pmu, event_number,
+     event_count, iteration, offset) = fields[4::2]
+    return (label.decode('utf-8'), config_series.decode('utf-8'),
+            config_bench.decode('utf-8'), int(cores), int(core), int(pmu),
+            int(event_number, 16), int(event_count), int(iteration),
+            int(offset))
+
+
+# (record type, table, number of fields, parse function)
+record_kinds = [(CYCLECOUNT, 'cycles', cycle_fields, parse_cycles),
+                (EVENTCOUNT, 'events', event_fields, parse_events)]
+
+
+def parse_log(log_file):
+    # Yields ('cycles', values) and ('events', values) for the records of
+    # log_file in order, values are typed as in the columnar stores:
+    # str for the label, configuration and benchmark, int otherwise
+    # (eventtype is the event number).
+    for lineno, line in enumerate(read_lines(log_file), 1):
+        for kind, table, nfields, parse in record_kinds:
+            if kind not in line:
+                continue
+            fields = line.translate(split_table).split()
+            try:
+                if len(fields) != nfields:
+                    raise ValueError('{} fields'.format(len(fields)))
+                yield table, parse(fields)
+            except ValueError as e:
+                logger.warning('{}: {} line {} '.format(log_file,
+                                                        kind.decode(),
+                                                        lineno) +
+                               'skipped, the number of fields or a ' +
+                               'value does not match ({}).'.format(e))
+
+
+def format_values(table, values):
+    # A CSV line as written by the awk scripts that preceded this module
+    if table == 'events':
+        values = values[:6] + ('0x{:x}'.format(values[6]),) + values[7:]
+    return ','.join(map(str, values)) + '\n'
+
+
+# The fast path of convert_log: the log is read at once and each record
+# kind is taken out of all lines in a few calls (a regular expression
+# search picks the lines, one split of all of them gives the fields), as
+# columns of bytes. It gives the same CSV lines as parse_log and
+# format_values, as long as the records are well-formed and the numbers
+# are written as format_values writes them. If not, the log is converted
+# line by line, which skips the bad lines with a warning.
+record_patterns = {kind: re.compile(re.escape(kind))
+                   for kind in (CYCLECOUNT, EVENTCOUNT)}
+# Put between the lines before the split, it is a field of its own (a log
+# with this byte is converted line by line)
+line_separator = b'\x01'
+digits = b'0123456789\n'
+leading_zero = re.compile(rb'\n0[0-9]')
+hex_numbers = re.compile(rb'0x(?:0|[1-9a-f][0-9a-f]*)' +
+                         rb'(?:\n0x(?:0|[1-9a-f][0-9a-f]*))*')
+
+
+def read_data(log_file):
+    if is_block_log(log_file):
+        return b''.join(read_blocks(log_file))
+    with open(log_file, 'rb') as f:
+        return f.read()
+
+
+def get_columns(lines, kind, nfields):
+    # The value columns of the kind lines, or None if one of them does not
+    # have nfields fields. The fields of all lines are split at once, with
+    # a separator field between the lines: when there are separators at
+    # every (nfields + 1)th field, all lines have nfields fields.
+    records = list(filter(record_patterns[kind].search, lines))
+    if not records:
+        return [[] for i in range(4, nfields, 2)]
+    fields = (b' ' + line_separator + b' ').join(records).split()
+    step = nfields + 1
+    separators = len(records) - 1
+    if (len(fields) != len(records) * step - 1 or
+            fields[nfields::step].count(line_separator) != separators):
+        return None
+    return [fields[i::step] for i in range(4, nfields, 2)]
+
+
+def is_number(column):
+    # All values are decimal numbers as str(int(value)) writes them
+    values = b'\n' + b'\n'.join(column) + b'\n'
+    return (not values.translate(None, digits) and
+            leading_zero.search(values) is None)
+
+
+def is_hex_number(column):
+    # All values are hexadecimal numbers as format_values writes them
+    return not column or hex_numbers.fullmatch(b'\n'.join(column)) is not None
+
+
+def format_columns(columns):
+    lines = b'\n'.join(map(b','.join, zip(*columns)))
+    return lines + b'\n' if lines else lines
+
+
+def format_log(log_file):
+    # The CSV lines of the cycles and the events of log_file and
+    # their number of rows, or None if the log cannot be converted at once
+    data = read_data(log_file)
+    if line_separator in data:
+        return None
+    lines = data.translate(split_table).split(b'\n')
+    cycles = get_columns(lines, CYCLECOUNT, cycle_fields)
+    events = get_columns(lines, EVENTCOUNT, event_fields)
+    if cycles is None or events is None:
+        return None
+    if not (all(map(is_number, cycles[4:] + events[3:6] + events[7:])) and
+            is_hex_number(events[6])):
+        return None
+    # remove underscores from benchmark name, it hurts LaTeX
+    cycles[3] = [benchmark.replace(b'_', b'') for benchmark in cycles[3]]
+    try:
+        # The strings must be UTF-8, as in parse_log
+        tables = {'cycles': format_columns(cycles).decode('utf-8'),
+                  'events': format_columns(events).decode('utf-8')}
+    except UnicodeDecodeError:
+        return None
+    return tables, {'cycles': len(cycles[0]), 'events': len(events[0])}
+
+
+def get_csv_files(log_file):
+    base = strip_log_suffix(log_file)
+    return base + '-cycles.csv', base + '-events.csv'
+
+
+def convert_log(log_file, cycles_file, events_file):
+    # Write the cycles and the events of log_file to the CSV files (at once
+    # by format_log, or line by line if it cannot), returns the number of
+    # rows of each. The files are written under a temporary name and then
+    # renamed, so an interrupted conversion leaves no partial CSV file
+    # behind.
+    formatted = format_log(log_file)
+    with open(cycles_file + '.tmp', 'w', encoding='utf-8') as cyclesf, \
+            open(events_file + '.tmp', 'w', encoding='utf-8') as eventsf:
+        outfiles = {'cycles': cyclesf, 'events': eventsf}
+        cyclesf.write(','.join(cycle_columns) + '\n')
+        eventsf.write(','.join(event_columns) + '\n')
+        if formatted is not None:
+            tables, counts = formatted
+            for table, text in tables.items():
+                outfiles[table].write(text)
+        else:
+            logger.debug('{}: converted line by line.'.format(log_file))
+            counts = {'cycles': 0, 'events': 0}
+            for table, values in parse_log(log_file):
+                outfiles[table].write(format_values(table, values))
+                counts[table] += 1
+    # The cycles file last, it tells make that the conversion is done
+    os.replace(events_file + '.tmp', events_file)
+    os.replace(cycles_file + '.tmp', cycles_file)
+    return counts
+
+
+def find_logs(directory):
+    # The raw and block logs in directory and its subdirectories, a raw log
+    # x.log is left out when its block log x.log.gz exists (as in the
+    # Makefile)
+    log_files = []
+    for dirpath, dirnames, filenames in os.walk(directory):
+        for filename in filenames:
+            if is_block_log(filename) or (
+                    filename.endswith('.log') and
+                    get_block_log(filename) not in filenames):
+                log_files.append(join(dirpath, filename))
+    return sorted(log_files)
+
+
+def is_up_to_date(log_file):
+    # Both CSV files exist and are newer than the log
+    mtime = getmtime(log_file)
+    return all(isfile(csv_file) and getmtime(csv_file) >= mtime
+               for csv_file in get_csv_files(log_file))
+
+
+def convert(log_file):
+    cycles_file, events_file = get_csv_files(log_file)
+    return log_file, convert_log(log_file, cycles_file, events_file)
+
+
+def convert_logs(log_files, jobs=None):
+    # Convert the logs in parallel, by a pool of jobs processes (by default
+    # one per CPU). The largest logs go first, so that a large log does not
+    # end up last on its own. Yields (log_file, counts) as the conversions
+    # finish.
+    log_files = sorted(log_files, key=getsize, reverse=True)
+    if jobs == 1 or len(log_files) <= 1:
+        for log_file in log_files:
+            yield convert(log_file)
+        return
+    # Imported here, it is a good part of the start-up time of a conversion
+    # in one process
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(convert, log_file)
+                   for log_file in log_files]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def read_log(log_file):
+    # The cycles and events of log_file as dataframes with typed columns,
+    # the string columns are categorical
+    import pandas as pd
+    rows = {'cycles': [], 'events': []}
+    for table, values in parse_log(log_file):
+        rows[table].append(values)
+    tables = []
+    for table, columns in [('cycles', cycle_columns),
+                           ('events', event_columns)]:
+        df = pd.DataFrame.from_records(rows[table], columns=columns)
+        for column in string_columns:
+            if column in columns:
+                df[column] = df[column].astype('category')
+        for column in columns:
+            if column not in string_columns:
+                df[column] = df[column].astype('int64')
+        tables.append(df)
+    return tuple(tables)
+
+
+@click.command()
+@click.option('--input-file',
+              multiple=True,
+              help='Path and filename of a raw or block-compressed log ' +
+                   'file, can be given more than once.')
+@click.option('--input-directory',
+              default=None,
+              help='Path of a directory of which all logs (also in ' +
+                   'subdirectories) are converted, if they have changed.')
+@click.option('--jobs',
+              default=None,
+              type=int,
+              help='Number of logs that are converted at the same time, ' +
+                   'by default the number of CPUs.')
+@click.option('--force',
+              is_flag=True,
+              default=False,
+              help='Also convert the logs of --input-directory that have ' +
+                   'not changed.')
+@click_log.simple_verbosity_option(logger)
+def main(input_file, input_directory, jobs, force):
+    # Convert each log x.log (or x.log.gz) into x-cycles.csv and
+    # x-events.csv
+    for log_file in input_file:
+        if not isfile(log_file):
+            logger.error('Error: input file {} '.format(log_file) +
+                         'does not exist!')
+            exit(1)
+    log_files = list(input_file)
+    if input_directory is not None:
+        if not isdir(input_directory):
+            logger.error('Error: input directory ' +
+                         '{} does not exist!'.format(input_directory))
+            exit(1)
+        found = find_logs(input_directory)
+        changed = [log_file for log_file in found
+                   if force or not is_up_to_date(log_file)]
+        logger.info('{} of {} logs in '.format(len(changed), len(found)) +
+                    '{} have changed.'.format(input_directory))
+        log_files += [log_file for log_file in changed
+                      if log_file not in log_files]
+    if not log_files:
+        if input_directory is None:
+            logger.error('Error: give --input-file or --input-directory!')
+            exit(1)
+        return
+    starttime = time.monotonic()
+    for log_file, counts in convert_logs(log_files, jobs):
+        logger.info('Converted {}: {} cycles '.format(log_file,
+                                                      counts['cycles']) +
+                    'and {} events.'.format(counts['events']))
+    logger.info('Converted {} logs in '.format(len(log_files)) +
+                '{:.1f} secs.'.format(time.monotonic() - starttime))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,12 @@
 import click
 import click_log
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from os.path import isfile, isdir, join
 import numpy as np
 import pandas as pd
 import re
+from columnar import read_table
 
 
 logger = logging.getLogger(__name__)
@@ -18,79 +20,108 @@ def remove_quotes(quoted):
     return quoted
 
 
-def export_dataframe(df, output_mode, metric, axis0, axis1, output_directory):
-    # axis0 is a tuple containing:
+def get_output_filename(output_mode, metric, key):
+    # key is the group of the output file:
     #   output_mode==summary
-    #     (label, cores, config_series, config_bench, slice(None))
+    #     (label, cores, config_series, config_bench)
     #   output_mode==data
     #     (label, cores, config_series, config_bench, offset)
-    (label, cores, config_series, config_bench, offset) = axis0
+    (label, cores, config_series, config_bench) = key[:4]
+    config_series = remove_quotes(config_series)
+    config_bench = remove_quotes(config_bench)
 
-    try:
-        df_exp = df.loc[axis0, axis1]
-        df_exp = df_exp.dropna(axis=0, how='all')
-        df_exp = df_exp.dropna(axis=1, how='all')
+    output_filename = '{}{}-{}-'.format(metric, output_mode, label)
+    output_filename += 'cores{}-'.format(cores)
+    output_filename += 'configseries{}-'.format(config_series)
+    output_filename += 'configbench{}'.format(config_bench)
 
-        if len(df_exp.index) > 0:
-            if output_mode == 'summary':
-                df_exp.columns = df_exp.columns.to_series().str.join('-')
-
-            config_series = remove_quotes(config_series)
-            config_bench = remove_quotes(config_bench)
+    if output_mode == 'data':
+        output_filename += '-{}{}.csv'.format('offset', key[4])
+    else:
+        output_filename += '.csv'
+    return output_filename
 
-            output_filename = '{}{}-{}-'.format(metric, output_mode, label)
-            output_filename += 'cores{}-'.format(cores)
-            output_filename += 'configseries{}-'.format(config_series)
-            output_filename += 'configbench{}'.format(config_bench)
 
-            if output_mode == 'data':
-                output_filename += '-{}{}.csv'.format('offset', offset)
-            else:
-                output_filename += '.csv'
-            logger.debug('output_filename={}'.format(output_filename))
+def export_dataframe(df_exp, output_mode, metric, key, output_directory):
+    # Write the rows of one group (see get_output_filename) to its file
+    df_exp = df_exp.dropna(axis=0, how='all')
+    df_exp = df_exp.dropna(axis=1, how='all')
 
-            outfile = join(output_directory, output_filename)
-            df_exp.to_csv(outfile, index=True, sep=' ')
-        else:
-            logger.warning('Trying to export an empty dataframe.')
-    except KeyError:
-        logger.warning('KeyError => label={} '.format(label) +
-                       'cores={} '.format(cores) +
-                       'configseries={} configbench={}'.format(config_series,
-                                                               config_bench))
+    if len(df_exp.index) > 0:
+        if output_mode == 'summary':
+            df_exp.columns = df_exp.columns.to_series().str.join('-')
 
+        output_filename = get_output_filename(output_mode, metric, key)
+        logger.debug('output_filename={}'.format(output_filename))
 
-@click.command()
-@click.option('--input-file',
-              required=True,
-              help='Path and filename of the input file.')
-@click.option('--output-directory',
-              default='report/data',
-              help='Path of the output directory.')
-@click.option('--output-mode',
-              default='data',
-              help='Mode of the output, either data or summary.')
-@click.option('--metric',
-              default='cycles',
-              help='Metric contained in the logs, either cycles or events. ' +
-                   'The metric argument pertains to data output mode only.')
-@click_log.simple_verbosity_option(logger)
-def main(input_file, output_directory, output_mode, metric):
-    if not isfile(input_file):
-        logger.error('Input file {}'.format(input_file) +
-                     ' does not exist!')
-        logger.info('Exiting program due to error.')
-        exit(1)
-
-    if not isdir(output_directory):
-        logger.error('Output directory {}'.format(output_directory) +
-                     ' does not exist!')
-        logger.info('Exiting program due to error.')
-        exit(1)
+        outfile = join(output_directory, output_filename)
+        df_exp.to_csv(outfile, index=True, sep=' ')
+    else:
+        logger.warning('Trying to export an empty dataframe.')
+
+
+def export_groups(df, output_mode, metric, output_directory, threads=1):
+    # One pass over the sorted index: every group of rows with the same
+    # label, cores, config_series, config_bench (and offset in data mode)
+    # goes to its own file. With more than one thread the files are
+    # written by a pool of threads. Returns the number of groups.
+    levels = [0, 1, 2, 3, 4] if output_mode == 'data' else [0, 1, 2, 3]
+    groups = df.groupby(level=levels, sort=False)
+    if threads <= 1:
+        for key, df_exp in groups:
+            export_dataframe(df_exp, output_mode, metric, key,
+                             output_directory)
+        return groups.ngroups
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        futures = [executor.submit(export_dataframe, df_exp, output_mode,
+                                   metric, key, output_directory)
+                   for key, df_exp in groups]
+        for future in futures:
+            future.result()
+    return groups.ngroups
+
+
+def get_outputs(output_modes, metrics):
+    # table => the (output mode, metric) pairs that are made from it: the
+    # summaries and the cycles data from the cycles table, the events data
+    # from the events table. The metric pertains to data output mode only.
+    outputs = {'cycles': [], 'events': []}
+    for output_mode in output_modes:
+        for metric in metrics:
+            if output_mode == 'summary':
+                metric = 'cycles'
+            if (output_mode, metric) not in outputs[metric]:
+                outputs[metric].append((output_mode, metric))
+    return outputs
+
+
+def get_table(df):
+    # The table of a CSV file of log2csv.py, from its columns
+    return 'events' if 'eventtype' in df.columns else 'cycles'
+
+
+def read_input(input_file, outputs):
+    # Yields (table, dataframe) for the tables of input_file that have
+    # outputs, each read once
+    if isdir(input_file):
+        # Columnar store written by run_experiments.py, the summaries are
+        # made from the cycles table
+        for table in ['cycles', 'events']:
+            if outputs[table]:
+                yield table, read_table(input_file, table,
+                                        csv_compatible=True)
+    else:
+        df = pd.read_csv(input_file)
+        table = get_table(df)
+        if outputs[table]:
+            yield table, df
+        else:
+            logger.warning('Input file {} has no {} '.format(input_file,
+                                                             table) +
+                           'outputs with the given modes and metrics.')
 
-    logger.info('Processing input file {}.'.format(input_file))
-    df = pd.read_csv(input_file)
 
+def get_output_dataframe(df, output_mode):
     # Construct a pivot table:
     #  - benchmarks/core will be indexed as columns,
     #  - cores, configuration, dassign, offset will be the index
@@ -99,22 +130,10 @@ def main(input_file, output_directory, output_mode, metric):
     # These resulting CSV files are read from within LaTeX.
     #    (Note: 'cores' == nr of cores,  'core' == core number)
     if output_mode == 'data':
-        if metric != 'cycles' and metric != 'events':
-            logger.error('Illegal metric for ' +
-                         'output mode {}'.format(output_mode))
-            logger.info('Exiting program due to error.')
-            exit(1)
-
         df = df.set_index(keys=['label', 'cores',
                                 'config_series', 'config_benchmarks',
                                 'offset'])
-    elif output_mode == 'summary':
-        if metric == 'events':
-            logger.error('Illegal metric for ' +
-                         'output mode {}'.format(output_mode))
-            logger.info('Exiting program due to error.')
-            exit(1)
-
+    else:  # output_mode == 'summary'
         df = pd.pivot_table(df,
                             index=['label', 'cores',
                                    'config_series', 'config_benchmarks',
@@ -126,61 +145,92 @@ def main(input_file, output_directory, output_mode, metric):
                                 1: 'core1',
                                 2: 'core2',
                                 3: 'core3'})
-    else:
-        logger.error('Illegal output mode "{}"'.format(output_mode) +
-                     ', output mode must be either data or summary.')
+    df.sort_index(inplace=True)
+    return df
+
+
+def process_input(input_file, outputs, output_directory, threads=1):
+    # Read input_file once and write all its outputs
+    logger.info('Processing input file {}.'.format(input_file))
+    for table, df in read_input(input_file, outputs):
+        for output_mode, metric in outputs[table]:
+            # Now output a series of CVS files that contain the summaries
+            # The index levels of the df_output dataframe are:
+            #  - level 0: label of experiment
+            #  - level 1: number of cores
+            #  - level 2: configuration series string
+            #  - level 3: configuration benchmarks string
+            #  - level 4: alignment offset
+            df_output = get_output_dataframe(df, output_mode)
+            ngroups = export_groups(df_output, output_mode, metric,
+                                    output_directory, threads)
+            logger.debug('Exported {} groups '.format(ngroups) +
+                         'of {}{}.'.format(metric, output_mode))
+
+
+@click.command()
+@click.option('--input-file',
+              required=True,
+              multiple=True,
+              help='Path and filename of the input file, or the ' +
+                   'directory of a columnar store. Can be given more ' +
+                   'than once.')
+@click.option('--output-directory',
+              default='report/data',
+              help='Path of the output directory.')
+@click.option('--output-mode',
+              multiple=True,
+              default=['data'],
+              help='Mode of the output, either data or summary. Can be ' +
+                   'given more than once.')
+@click.option('--metric',
+              multiple=True,
+              default=['cycles'],
+              help='Metric contained in the logs, either cycles or events. ' +
+                   'The metric argument pertains to data output mode only. ' +
+                   'Can be given more than once.')
+@click.option('--threads',
+              default=1,
+              type=int,
+              help='Number of threads that write the output files.')
+@click_log.simple_verbosity_option(logger)
+def main(input_file, output_directory, output_mode, metric, threads):
+    for filename in input_file:
+        if not isfile(filename) and not isdir(filename):
+            logger.error('Input file {}'.format(filename) +
+                         ' does not exist!')
+            logger.info('Exiting program due to error.')
+            exit(1)
+
+    if not isdir(output_directory):
+        logger.error('Output directory {}'.format(output_directory) +
+                     ' does not exist!')
         logger.info('Exiting program due to error.')
         exit(1)
 
-    df.sort_index(inplace=True)
+    for mode in output_mode:
+        if mode != 'data' and mode != 'summary':
+            logger.error('Illegal output mode "{}"'.format(mode) +
+                         ', output mode must be either data or summary.')
+            logger.info('Exiting program due to error.')
+            exit(1)
+    for m in metric:
+        if m != 'cycles' and m != 'events':
+            logger.error('Illegal metric "{}"'.format(m) +
+                         ', metric must be either cycles or events.')
+            logger.info('Exiting program due to error.')
+            exit(1)
+    if 'data' not in output_mode and 'cycles' not in metric:
+        logger.error('Illegal metric for output mode summary')
+        logger.info('Exiting program due to error.')
+        exit(1)
 
-    # Now output a series of CVS files that contain the summaries
-    # The index levels of the df dataframe are:
-    #  - level 0: label of experiment
-    #  - level 1: number of cores
-    #  - level 2: configuration series string
-    #  - level 3: configuration benchmarks string
-    #  - level 4: alignment offset
-
-    axis1 = (slice(None))
-    for label in set(df.index.get_level_values(0)):
-        logger.debug('label={}'.format(label))
-        dflabel = df.loc[label, :]
-        cores_list = dflabel.index.get_level_values(0)
-        logger.debug('cores_list={}'.format(cores_list))
-
-        for cores in set(cores_list):
-            logger.debug('cores={}.'.format(cores))
-            dfcore = dflabel.loc[cores, :]
-            config_series_list = dfcore.index.get_level_values(0)
-            logger.debug('config_series_list={}'.format(config_series_list))
-
-            for config_series in set(config_series_list):
-                logger.debug('config_series={}.'.format(config_series))
-                dfconfig_series = dfcore.loc[config_series, :]
-                config_bench_list = dfconfig_series.index.get_level_values(0)
-                logger.debug('config_bench_list={}'.format(config_bench_list))
-
-                for config_bench in set(config_bench_list):
-                    logger.debug('config_bench={}.'.format(config_bench))
-
-                    if output_mode != 'data':
-                        axis0 = (label, cores, config_series, config_bench,
-                                 slice(None))
-                        export_dataframe(df, output_mode, metric, axis0, axis1,
-                                         output_directory)
-
-                    else:  # output_mode == 'data':
-                        dfconfig_bench = dfconfig_series.loc[config_bench, :]
-                        offset_list = dfconfig_bench.index.get_level_values(0)
-                        logger.debug('offset_list={}'.format(offset_list))
-
-                        for offset in set(offset_list):
-                            logger.debug('offset={}'.format(offset))
-                            axis0 = (label, cores, config_series, config_bench,
-                                     offset)
-                            export_dataframe(df, output_mode, metric, axis0,
-                                             axis1, output_directory)
+    # Each input file is read once, for all its outputs. The input files
+    # are processed in order, so when an experiment is in several of them
+    # the last one wins (as with one call per input file).
+    outputs = get_outputs(output_mode, metric)
+    for filename in input_file:
+        process_input(filename, outputs, output_directory, threads)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,72 @@
+from collections import namedtuple
+import re
+
+
+# The Raspberry Pi reports two kinds of records over the serial line, e.g.
+#   INFO: core0(): CYCLECOUNT label: XRTOS_PI3_BENCH_... config_series: '2'
+#     config_benchmarks: '1' benchmark: malardalen_bsort100 cores: 1 core: 0
+#     cycle_count:        57337 iteration: 1 offset: 0
+#   INFO: core0(): EVENTCOUNT label: XRTOS_PI3_BENCH_... config_series: '2'
+#     config_benchmarks: '1' cores: 1 core: 0 pmu: 1 event_number: 0x16
+#     event_count: 26 iteration: 1 offset: 0
+# (each on one line). The prefix before the record type depends on the
+# platform, e.g. circle prefixes a timestamp and 'CoRunners:'.
+record_regex = re.compile(
+    rb'(CYCLECOUNT|EVENTCOUNT) '
+    rb'label: (\S+) '
+    rb'config_series: (\S+) '
+    rb'config_benchmarks: (\S+) '
+    rb'(?:benchmark: (\S+) )?'
+    rb'cores: ([0-9]+) '
+    rb'core: ([0-9]+) '
+    rb'(?:cycle_count: +([0-9]+)|'
+    rb'pmu: ([0-9]+) event_number: (0x[0-9a-fA-F]+) event_count: ([0-9]+)) '
+    rb'iteration: ([0-9]+) '
+    rb'offset: ([0-9]+)')
+
+CYCLECOUNT = b'CYCLECOUNT'
+EVENTCOUNT = b'EVENTCOUNT'
+
+# The columns of the cycles and events tables of the observations, in the
+# CSV files made by log2csv.py and in the columnar stores of columnar.py
+cycle_columns = ['label', 'config_series', 'config_benchmarks', 'benchmark',
+                 'cores', 'core', 'cycles', 'iteration', 'offset']
+event_columns = ['label', 'config_series', 'config_benchmarks', 'cores',
+                 'core', 'pmu', 'eventtype', 'eventcount', 'iteration',
+                 'offset']
+string_columns = ['label', 'config_series', 'config_benchmarks',
+                  'benchmark']
+
+# Labels, config strings and benchmark names are kept as bytes, they are
+# only decoded when needed. The numeric fields are converted to int, fields
+# that don't belong to the kind of record are None.
+Record = namedtuple('Record', ['kind', 'label', 'config_series',
+                               'config_benchmarks', 'benchmark', 'cores',
+                               'core', 'cycles', 'pmu', 'event_number',
+                               'event_count', 'iteration', 'offset'])
+
+
+def parse_record(data, pos=0, endpos=None):
+    # Parse the record found in data[pos:endpos], data can be any bytes-like
+    # object (e.g. the reusable bytearray of the serial reader), no copy of
+    # the line is made. Returns None if there is no (complete) record.
+    if endpos is None:
+        endpos = len(data)
+    m = record_regex.search(data, pos, endpos)
+    if m is None:
+        return None
+    (kind, label, config_series, config_bench, benchmark, cores, core,
+     cycles, pmu, event_number, event_count, iteration, offset) = m.groups()
+    if kind == CYCLECOUNT:
+        if cycles is None or benchmark is None:
+            return None
+        return Record(kind, label, config_series, config_bench, benchmark,
+                      int(cores), int(core), int(cycles), None, None, None,
+                      int(iteration), int(offset))
+    else:
+        if pmu is None or benchmark is not None:
+            return None
+        return Record(kind, label, config_series, config_bench, None,
+                      int(cores), int(core), None, int(pmu),
+                      int(event_number, 16), int(event_count),
+                      int(iteration), int(offset))
@@ -18,12 +18,11 @@ import numpy as np
 from scipy.stats import ttest_ind
 from scipy.stats import mannwhitneyu
 import matplotlib.pyplot as plt
-import glob
 from itertools import combinations
 from itertools import combinations_with_replacement
 from itertools import permutations
 from itertools import product
-import re
+from observationdb import ObservationDB
 
 
 def create_bar_plot(df, title):
@@ -36,23 +35,16 @@ def create_bar_plot(df, title):
     plt.title(title)
 
 
-g = 'report/data/*.csv'
-filenames = glob.glob(g)
-flist = list(set(filenames))
-flist.sort()
-regex = re.compile(r'^.*cyclesdata-CIRCLE_PI4_BENCH_DISPARITY_([^-]*).*$')
-for f in flist:
-    m = regex.match(f)
-    if m:
-        label = m.group(1)
-        df = pd.read_csv(f, sep=' ')
-        df = df[df['core'] == 0]
-        for offset in range(0, 1):
-            df_offset = df[df['offset'] == offset]
-            if len(df_offset.index) > 0:
-                maximum = df_offset['cycles'].max()
-                median = df_offset['cycles'].median()
-                print('Experiment:{}\tWCET:{:10.0f}\t\tMedian:{:10.0f}\tFactor:{:8.3f}\toffset:{}'.format(label, maximum, median, maximum/median, offset))
+# The cycles of core 0 come from the observation database (make database)
+db = ObservationDB('output/observations.db')
+prefix = 'CIRCLE_PI4_BENCH_DISPARITY_'
+for offset in range(0, 1):
+    df = db.get_cycles(columns=['label', 'cycles'], label_prefix=prefix,
+                       core=0, offset=offset)
+    for label, df_label in df.groupby('label'):
+        maximum = df_label['cycles'].max()
+        median = df_label['cycles'].median()
+        print('Experiment:{}\tWCET:{:10.0f}\t\tMedian:{:10.0f}\tFactor:{:8.3f}\toffset:{}'.format(label[len(prefix):], maximum, median, maximum/median, offset))
 
 # ## SD-VBS disparity --- 1 core
 
@@ -0,0 +1,283 @@
+import click
+import click_log
+import logging
+import os
+from os.path import abspath, basename, getmtime, getsize, isdir, isfile
+import sqlite3
+import time
+from blocklog import strip_log_suffix
+from log2csv import find_logs, parse_log
+from logrecord import cycle_columns, event_columns
+
+logger = logging.getLogger(__name__)
+click_log.basic_config(logger)
+
+
+# All observations of the logs in one SQLite database, so that the analysis
+# scripts and notebooks query them instead of globbing and parsing CSV
+# files again and again. The cycles and events tables have the columns of
+# the CSV files of log2csv.py (eventtype is the event number), plus the
+# log they were read from. Both tables are indexed on
+#   (label, cores, config_series, config_benchmarks, offset, core,
+#    iteration)
+# The logs table keeps the path, name (the file name without .log or
+# .log.gz), modification time and size of each imported log; a log that
+# changed is imported again, and a log that is gone (deleted, moved or
+# replaced by its block log) is removed, see ObservationDB.update().
+# The configurations are stored with quotes, as in the logs and the CSV
+# files (e.g. '2'), also when a log has them without. A filter on them
+# may be given with or without quotes.
+default_database = 'output/observations.db'
+
+key_columns = ['label', 'cores', 'config_series', 'config_benchmarks',
+               'offset', 'core', 'iteration']
+schema = ['''CREATE TABLE IF NOT EXISTS logs (
+               id INTEGER PRIMARY KEY,
+               path TEXT UNIQUE,
+               name TEXT,
+               mtime REAL,
+               size INTEGER)''',
+          '''CREATE TABLE IF NOT EXISTS cycles (
+               log INTEGER REFERENCES logs(id),
+               label TEXT, config_series TEXT, config_benchmarks TEXT,
+               benchmark TEXT, cores INTEGER, core INTEGER,
+               cycles INTEGER, iteration INTEGER, offset INTEGER)''',
+          '''CREATE TABLE IF NOT EXISTS events (
+               log INTEGER REFERENCES logs(id),
+               label TEXT, config_series TEXT, config_benchmarks TEXT,
+               cores INTEGER, core INTEGER, pmu INTEGER,
+               eventtype INTEGER, eventcount INTEGER, iteration INTEGER,
+               offset INTEGER)''',
+          'CREATE INDEX IF NOT EXISTS cycles_key ON cycles ' +
+          '({})'.format(', '.join(key_columns)),
+          'CREATE INDEX IF NOT EXISTS events_key ON events ' +
+          '({})'.format(', '.join(key_columns)),
+          'CREATE INDEX IF NOT EXISTS cycles_log ON cycles (log)',
+          'CREATE INDEX IF NOT EXISTS events_log ON events (log)']
+
+tables = {'cycles': cycle_columns, 'events': event_columns}
+quoted_columns = ['config_series', 'config_benchmarks']
+
+
+def quote_config(value):
+    return "'{}'".format(str(value).strip("'"))
+
+
+def quote_configs(values):
+    # values of a cycles or events row, the configurations follow the
+    # label
+    return values[:1] + (quote_config(values[1]),
+                         quote_config(values[2])) + values[3:]
+
+
+class ObservationDB:
+    def __init__(self, filename=default_database):
+        self.filename = filename
+        self.connection = sqlite3.connect(filename)
+        with self.connection:
+            for statement in schema:
+                self.connection.execute(statement)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def is_up_to_date(self, log_file):
+        row = self.connection.execute(
+            'SELECT mtime, size FROM logs WHERE path = ?',
+            (abspath(log_file),)).fetchone()
+        return row is not None and row == (getmtime(log_file),
+                                           getsize(log_file))
+
+    def import_log(self, log_file):
+        # (Re)import the observations of log_file in one transaction,
+        # returns the number of cycles and events rows
+        path = abspath(log_file)
+        counts = {'cycles': 0, 'events': 0}
+        rows = {'cycles': [], 'events': []}
+        for table, values in parse_log(log_file):
+            rows[table].append(quote_configs(values))
+        with self.connection:
+            self.connection.execute(
+                'DELETE FROM cycles WHERE log IN ' +
+                '(SELECT id FROM logs WHERE path = ?)', (path,))
+            self.connection.execute(
+                'DELETE FROM events WHERE log IN ' +
+                '(SELECT id FROM logs WHERE path = ?)', (path,))
+            self.connection.execute('DELETE FROM logs WHERE path = ?',
+                                    (path,))
+            log_id = self.connection.execute(
+                'INSERT INTO logs (path, name, mtime, size) ' +
+                'VALUES (?, ?, ?, ?)',
+                (path, strip_log_suffix(basename(log_file)),
+                 getmtime(log_file), getsize(log_file))).lastrowid
+            for table, columns in tables.items():
+                self.connection.executemany(
+                    'INSERT INTO {} (log, {}) '.format(table,
+                                                       ', '.join(columns)) +
+                    'VALUES (?, {})'.format(', '.join('?' * len(columns))),
+                    ((log_id,) + values for values in rows[table]))
+                counts[table] = len(rows[table])
+        return counts
+
+    def delete_log(self, log_id):
+        with self.connection:
+            self.connection.execute('DELETE FROM cycles WHERE log = ?',
+                                    (log_id,))
+            self.connection.execute('DELETE FROM events WHERE log = ?',
+                                    (log_id,))
+            self.connection.execute('DELETE FROM logs WHERE id = ?',
+                                    (log_id,))
+
+    def prune(self, log_files, directory=None):
+        # Remove the logs that no longer exist, and the logs in directory
+        # (and its subdirectories) that are not in log_files. Returns the
+        # paths of the logs removed.
+        keep = set(abspath(log_file) for log_file in log_files)
+        if directory is not None:
+            directory = os.path.join(abspath(directory), '')
+        removed = []
+        for log_id, path in self.connection.execute(
+                'SELECT id, path FROM logs').fetchall():
+            if not isfile(path) or (directory is not None and
+                                    path.startswith(directory) and
+                                    path not in keep):
+                self.delete_log(log_id)
+                removed.append(path)
+        return removed
+
+    def update(self, log_files, directory=None):
+        # Import the logs that are new or have changed since their import,
+        # and remove the logs that are gone (see prune()). Returns the logs
+        # imported.
+        for path in self.prune(log_files, directory):
+            logger.info('Removed the observations of {}, '.format(path) +
+                        'it is no longer an input log.')
+        imported = []
+        for log_file in log_files:
+            if self.is_up_to_date(log_file):
+                continue
+            counts = self.import_log(log_file)
+            logger.info('Imported {}: {} cycles '.format(log_file,
+                                                         counts['cycles']) +
+                        'and {} events.'.format(counts['events']))
+            imported.append(log_file)
+        return imported
+
+    def get_where(self, filters, log_prefix=None, label_prefix=None):
+        # SQL condition and parameters: filters maps a column to a value or
+        # a list of values, log_prefix and label_prefix select on the start
+        # of the log name and of the label.
+        conditions = []
+        parameters = []
+        for column, value in filters.items():
+            if value is None:
+                continue
+            if column not in key_columns + ['benchmark', 'pmu',
+                                            'eventtype']:
+                raise ValueError('Cannot select on column ' +
+                                 '{}'.format(column))
+            if isinstance(value, (list, tuple, set)):
+                value = list(value)
+                if column in quoted_columns:
+                    value = [quote_config(v) for v in value]
+                conditions.append('{} IN ({})'.format(
+                    column, ', '.join('?' * len(value))))
+                parameters += value
+            else:
+                if column in quoted_columns:
+                    value = quote_config(value)
+                conditions.append('{} = ?'.format(column))
+                parameters.append(value)
+        if label_prefix is not None:
+            conditions.append("label LIKE ? ESCAPE '\\'")
+            parameters.append(escape_like(label_prefix) + '%')
+        if log_prefix is not None:
+            conditions.append('log IN (SELECT id FROM logs ' +
+                              "WHERE name LIKE ? ESCAPE '\\')")
+            parameters.append(escape_like(log_prefix) + '%')
+        if not conditions:
+            return '', parameters
+        return ' WHERE ' + ' AND '.join(conditions), parameters
+
+    def query(self, table, columns=None, log_prefix=None,
+              label_prefix=None, **filters):
+        # The rows of table ('cycles' or 'events') as a pandas dataframe,
+        # in the order of the index, e.g.
+        #   db.query('cycles', label='XRTOS_PI3_...', core=0, offset=0)
+        # With the column 'log' the name of the log of each row is
+        # included.
+        import pandas as pd
+        if columns is None:
+            columns = tables[table]
+        selected = ['(SELECT name FROM logs WHERE id = log) AS log'
+                    if column == 'log' else column for column in columns]
+        where, parameters = self.get_where(filters, log_prefix,
+                                           label_prefix)
+        sql = 'SELECT {} FROM {}'.format(', '.join(selected), table) + \
+            where + ' ORDER BY {}'.format(', '.join(key_columns))
+        return pd.read_sql_query(sql, self.connection, params=parameters)
+
+    def get_cycles(self, columns=None, **filters):
+        return self.query('cycles', columns, **filters)
+
+    def get_events(self, columns=None, **filters):
+        return self.query('events', columns, **filters)
+
+    def get_values(self, table, column, log_prefix=None, label_prefix=None,
+                   **filters):
+        # One column of the selected rows as a numpy array, e.g. the cycles
+        # of core 0 of an experiment
+        import numpy as np
+        where, parameters = self.get_where(filters, log_prefix,
+                                           label_prefix)
+        sql = 'SELECT {} FROM {}'.format(column, table) + where + \
+            ' ORDER BY {}'.format(', '.join(key_columns))
+        return np.array([row[0] for row in self.connection.execute(
+            sql, parameters)])
+
+    def get_labels(self, table='cycles', log_prefix=None,
+                   label_prefix=None):
+        where, parameters = self.get_where({}, log_prefix, label_prefix)
+        sql = 'SELECT DISTINCT label FROM {}'.format(table) + where + \
+            ' ORDER BY label'
+        return [row[0] for row in self.connection.execute(sql, parameters)]
+
+
+def escape_like(string):
+    return string.replace('\\', '\\\\').replace('%', '\\%').replace('_',
+                                                                    '\\_')
+
+
+@click.command()
+@click.option('--input-directory',
+              default='output',
+              help='Path of the directory with the logs (raw or ' +
+                   'block-compressed, also in subdirectories).')
+@click.option('--database',
+              default=default_database,
+              help='Path and filename of the SQLite database.')
+@click_log.simple_verbosity_option(logger)
+def main(input_directory, database):
+    # Import the logs that are new or have changed into the database
+    if not isdir(input_directory):
+        logger.error('Error: input directory ' +
+                     '{} does not exist!'.format(input_directory))
+        exit(1)
+    starttime = time.monotonic()
+    log_files = find_logs(input_directory)
+    with ObservationDB(database) as db:
+        imported = db.update(log_files, input_directory)
+    logger.info('Imported {} of {} logs '.format(len(imported),
+                                                 len(log_files)) +
+                'into {} in '.format(database) +
+                '{:.1f} secs.'.format(time.monotonic() - starttime))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import click_log
+import logging
+
+logger = logging.getLogger(__name__)
+click_log.basic_config(logger)
+
+
+# Rough costs of a campaign (seconds), used for the estimate of its
+# duration. The build time depends on what changes with respect to the
+# previous build:
+#   full       -- another platform or Raspberry Pi version (other tree),
+#   config     -- other benchmarks, PMU events or platform settings,
+#   parameters -- only input sizes, delay step or label.
+build_times = {'full': 120.0, 'config': 30.0, 'parameters': 15.0}
+reboot_time = 10.0
+# CPU clock per Raspberry Pi version (Hz)
+clock_rates = {3: 1.2e9, 4: 1.5e9}
+# The observations are reported over the UART at 115200 baud (10 bits per
+# byte), one record is about 230 bytes.
+uart_bytes_per_second = 115200 / 10
+record_bytes = 230
+
+config_columns = ['benchmark series', 'benchmark configuration',
+                  'pmu core 0', 'pmu core 1', 'pmu core 2', 'pmu core 3',
+                  'enable mmu', 'enable screen', 'no cache management']
+parameter_columns = ['input size core0', 'input size core1',
+                     'input size core2', 'input size core3',
+                     'delay step countdown', 'synbench repeat']
+
+
+def strip_quotes(value):
+    return str(value).strip("'")
+
+
+def get_platform_key(row):
+    return (str(row['platform']).lower(), int(row['raspberrypi']))
+
+
+def get_config_key(row):
+    return tuple(str(row.get(column)) for column in config_columns)
+
+
+def get_parameter_key(row):
+    return tuple(-1.0 if row.get(column) is None
+                 else float(row.get(column))
+                 for column in parameter_columns)
+
+
+def get_build_kind(previous, row):
+    if previous is None or get_platform_key(previous) != \
+            get_platform_key(row):
+        return 'full'
+    if get_config_key(previous) != get_config_key(row):
+        return 'config'
+    return 'parameters'
+
+
+def get_measurement_time(row, observations):
+    # An iteration takes the WCET of the task (if known) plus the time to
+    # report a cycle count and the PMU events of every core.
+    cores = len(strip_quotes(row['benchmark series']))
+    records = 0
+    for core in range(cores):
+        pmu = row.get('pmu core {}'.format(core))
+        events = 0 if pmu is None else len(strip_quotes(pmu))
+        records += 1 + events
+    iteration = records * record_bytes / uart_bytes_per_second
+    wcet = row.get('measured wcet baseline')
+    if wcet is not None:
+        clock = clock_rates.get(int(row['raspberrypi']), 1.2e9)
+        iteration += float(wcet) / clock
+    return observations * iteration
+
+
+def estimate_duration(rows, observations, pipelined=False):
+    # Returns the estimated duration (seconds) of running rows in order,
+    # and the number of builds of each kind.
+    duration = 0.0
+    builds = {kind: 0 for kind in build_times}
+    previous = None
+    for row in rows:
+        kind = get_build_kind(previous, row)
+        builds[kind] += 1
+        build = build_times[kind]
+        measurement = get_measurement_time(row, observations)
+        if pipelined and previous is not None:
+            # The build overlaps the measurement of the previous experiment
+            duration += reboot_time + max(build, measurement)
+        else:
+            duration += reboot_time + build + measurement
+        previous = row
+    return duration, builds
+
+
+def plan_experiments(rows):
+    # Group the experiments on platform and Raspberry Pi version, then on
+    # the benchmark configuration, so that consecutive builds differ as
+    # little as possible. Within a group the experiments are ordered on
+    # input sizes and delay step, ties keep the spreadsheet order. The
+    # experiment numbers are not changed.
+    return sorted(rows, key=lambda row: (get_platform_key(row),
+                                         get_config_key(row),
+                                         get_parameter_key(row)))
+
+
+def format_duration(seconds):
+    hours, rest = divmod(int(seconds), 3600)
+    return '{}h{:02d}m{:02d}s'.format(hours, rest // 60, rest % 60)
+
+
+def log_plan(rows, planned, observations, pipelined=False):
+    previous = None
+    for position, row in enumerate(planned):
+        logger.info('{:3d}. experiment '.format(position + 1) +
+                    '{} '.format(row['experiment number']) +
+                    '{} '.format(row['experiment label']) +
+                    '({} build)'.format(get_build_kind(previous, row)))
+        previous = row
+    for name, order in [('spreadsheet', rows), ('planned', planned)]:
+        duration, builds = estimate_duration(order, observations, pipelined)
+        logger.info('Estimated duration in {} order: '.format(name) +
+                    '{} '.format(format_duration(duration)) +
+                    '({} full, {} config and '.format(builds['full'],
+                                                      builds['config']) +
+                    '{} parameter builds).'.format(builds['parameters']))
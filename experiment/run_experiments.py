@@ -1,18 +1,45 @@
 import click
 import click_log
 import logging
+import glob
+import json
 import os
-from os.path import isfile, isabs
+from os.path import abspath, basename, getsize, isdir, isfile, isabs, \
+    join
+import shutil
 import subprocess
 from subprocess import CalledProcessError
-import pandas as pd
 import re
 import time
 from enum import Enum
-from threading import Thread
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+from threading import Condition, Event, Lock, Thread
 import serial
 import sys
-import math
+import build_cache
+from build_cache import BuildCache, get_build_key
+from logrecord import parse_record
+from blocklog import BlockLogWriter, concatenate, is_block_log, \
+    strip_log_suffix, truncate_log
+import convergence
+from convergence import ConvergenceMonitor
+import journal
+from journal import Journal
+from columnar import ColumnarWriter, get_columnar_dir, truncate_store
+import streamstats
+from streamstats import StreamStats, get_stats_file
+import planner
+from planner import log_plan, plan_experiments
+import experiment_plan
+from experiment_plan import load_experiments
+import watchdog
+from watchdog import Watchdog
+import campaign_status
+from campaign_status import CampaignStatus
+import estimator
+from estimator import estimate_boards, estimate_rows, log_boards_estimate, \
+    log_campaign_estimate, read_history
 
 logger = logging.getLogger(__name__)
 click_log.basic_config(logger)
@@ -38,32 +65,96 @@ class Fields(Enum):
     INPUTSIZE_CORE3 = 17
     DELAY_STEP_COUNTDOWN = 18
     SYNBENCH_REPEAT = 19
+    MIN_OBSERVATIONS = 20
+    MAX_OBSERVATIONS = 21
 
 
 class Compile:
+    # The commands run in working_dir with the environment of this object,
+    # the working directory of the process is never changed. This way
+    # several Compile objects can build at the same time.
     def __init__(self):
-        self.scriptdir = sys.path[0]
         self.working_dir = None
-
-    def create_benchmark_config(self, benchmark_config_cmd):
+        # Sources and headers that (indirectly) include benchmark_config.h
+        self.config_includers = None
+        # Duration of the builds of the experiments (seconds)
+        self.build_times = []
+
+    def create_benchmark_config(self, benchmark_config_cmd,
+                                only_changed=False):
+        # Returns True if benchmark_config.h has been written. With
+        # only_changed, an existing file with the same content is left
+        # alone, so its mtime doesn't trigger a rebuild.
         logger.debug('create_benchmark_config: ' +
                      'working_dir={}'.format(self.working_dir))
-        os.chdir(self.working_dir)
+        filename = join(self.working_dir, 'benchmark_config.h')
         try:
             # generate the benchmark_config.h file
             logger.info('Run {}'.format(benchmark_config_cmd))
-            with open('benchmark_config.h', 'w') as outfile:
-                subprocess.run(benchmark_config_cmd,
-                               stdout=outfile)
+            config = self.get_benchmark_config(benchmark_config_cmd)
         except (CalledProcessError, UnicodeDecodeError):
             logger.warning('m4 subprocess resulted in an error!')
-        os.chdir(self.scriptdir)
+            config = ''
+        if only_changed and isfile(filename):
+            with open(filename) as f:
+                if f.read() == config:
+                    logger.info('benchmark_config.h is unchanged.')
+                    return False
+        with open(filename, 'w') as outfile:
+            outfile.write(config)
+        return True
+
+    def get_config_includers(self):
+        # Scan the tree once for the files that include benchmark_config.h,
+        # directly or through other headers.
+        if self.config_includers is not None:
+            return self.config_includers
+        include_regex = re.compile(r'^\s*#\s*include\s*[<"]([^>"]+)[>"]',
+                                   re.MULTILINE)
+        includes = {}
+        for dirpath, dirnames, filenames in os.walk(self.working_dir):
+            for filename in filenames:
+                if not filename.endswith(('.c', '.cpp', '.h', '.S')):
+                    continue
+                path = join(dirpath, filename)
+                with open(path, errors='replace') as f:
+                    includes[path] = set(basename(include) for include in
+                                         include_regex.findall(f.read()))
+        headers = {'benchmark_config.h'}
+        includers = set()
+        while True:
+            found = set(path for path, included in includes.items()
+                        if path not in includers and
+                        not headers.isdisjoint(included))
+            if len(found) == 0:
+                break
+            includers |= found
+            headers |= set(basename(path) for path in found
+                           if path.endswith('.h'))
+        self.config_includers = sorted(includers)
+        logger.debug('Files that include benchmark_config.h: ' +
+                     '{}'.format(self.config_includers))
+        return self.config_includers
+
+    def touch_config_includers(self):
+        # Make sure that the objects that depend on benchmark_config.h are
+        # rebuilt, also when the Makefiles don't track header dependencies
+        now = time.time()
+        for path in self.get_config_includers():
+            os.utime(path, (now, now))
+
+    def get_benchmark_config(self, benchmark_config_cmd):
+        # Return the contents benchmark_config.h would get, without
+        # writing the file
+        cp = subprocess.run(benchmark_config_cmd,
+                            cwd=self.working_dir,
+                            capture_output=True,
+                            text=True)
+        return cp.stdout
 
     def make(self, makecmd):
         logger.debug('make: working_dir={}'.format(self.working_dir))
         logger.debug('make: makecmd={}'.format(makecmd))
-        os.chdir(self.working_dir)
-        logger.debug('New curdir is {}'.format(os.getcwd()))
 
         try:
             # do the actual compilation
@@ -72,6 +163,7 @@ class Compile:
                                 check=True,
                                 capture_output=True,
                                 text=True,
+                                cwd=self.working_dir,
                                 env=self.myenv)
             text = cp.stdout.split('\n')
             for line in text:
@@ -82,7 +174,14 @@ class Compile:
             print("Error is of type: ", sys.exc_info()[0])
             print(self.myenv)
             raise
-        os.chdir(self.scriptdir)
+
+    def install_images(self, tftp_dir, image_pattern='kernel*.img'):
+        # Copy the compiled kernel image(s) to a TFTP directory, for
+        # boards that do not boot from the location of 'make install'.
+        for image in glob.glob(join(self.working_dir, image_pattern)):
+            logger.info('Installing {} to {}.'.format(basename(image),
+                                                      tftp_dir))
+            shutil.copy2(image, tftp_dir)
 
     def set_environment(self, raspberrypi):
         self.myenv = dict(os.environ)
@@ -141,19 +240,19 @@ class Compile:
         if inputsizes is not None:
             # if inputsizes is not None, it must be a tuple of four
             input_core0, input_core1, input_core2, input_core3 = inputsizes
-            if not pd.isnull(input_core0):
+            if input_core0 is not None:
                 input_core0_param = '-Dinputsize_core0={}'.format(input_core0)
                 logger.debug('input_core0={}'.format(input_core0))
                 arg_m4_list.append(input_core0_param)
-            if not pd.isnull(input_core1):
+            if input_core1 is not None:
                 input_core1_param = '-Dinputsize_core1={}'.format(input_core1)
                 logger.debug('input_core0={}'.format(input_core0))
                 arg_m4_list.append(input_core1_param)
-            if not pd.isnull(input_core2):
+            if input_core2 is not None:
                 input_core2_param = '-Dinputsize_core2={}'.format(input_core2)
                 logger.debug('input_core2={}'.format(input_core2))
                 arg_m4_list.append(input_core2_param)
-            if not pd.isnull(input_core3):
+            if input_core3 is not None:
                 input_core3_param = '-Dinputsize_core3={}'.format(input_core3)
                 logger.debug('input_core3={}'.format(input_core3))
                 arg_m4_list.append(input_core3_param)
@@ -161,25 +260,25 @@ class Compile:
         if pmu_cores is not None:
             # if pmu_cores is not None, it must be a tuple of four
             pmu0, pmu1, pmu2, pmu3 = pmu_cores
-            if not pd.isnull(pmu0):
+            if pmu0 is not None:
                 pmu0 = re.sub(r'^\'', '', pmu0)
                 pmu0 = re.sub(r'\'$', '', pmu0)
                 pmu_core0_param = '-Dpmu_core0={}'.format(pmu0)
                 logger.debug('pmu0={}'.format(pmu0))
                 arg_m4_list.append(pmu_core0_param)
-            if not pd.isnull(pmu1):
+            if pmu1 is not None:
                 pmu1 = re.sub(r'^\'', '', pmu1)
                 pmu1 = re.sub(r'\'$', '', pmu1)
                 pmu_core1_param = '-Dpmu_core1={}'.format(pmu1)
                 logger.debug('pmu1={}'.format(pmu1))
                 arg_m4_list.append(pmu_core1_param)
-            if not pd.isnull(pmu2):
+            if pmu2 is not None:
                 pmu2 = re.sub(r'^\'', '', pmu2)
                 pmu2 = re.sub(r'\'$', '', pmu2)
                 pmu_core2_param = '-Dpmu_core2={}'.format(pmu2)
                 logger.debug('pmu2={}'.format(pmu2))
                 arg_m4_list.append(pmu_core2_param)
-            if not pd.isnull(pmu3):
+            if pmu3 is not None:
                 pmu3 = re.sub(r'^\'', '', pmu3)
                 pmu3 = re.sub(r'\'$', '', pmu3)
                 pmu_core3_param = '-Dpmu_core3={}'.format(pmu3)
@@ -192,6 +291,14 @@ class Compile:
         return benchmark_config_cmd
 
 
+def get_output_path(output_file):
+    # Relative output files are relative to the directory of this script
+    if isabs(output_file):
+        return output_file
+    else:
+        return sys.path[0] + '/' + output_file
+
+
 class SerialThread(Thread):
     def __init__(self, tty):
         super(SerialThread, self).__init__()
@@ -228,85 +335,185 @@ class SerialThread(Thread):
 
 
 class Resetter(SerialThread):
-    def __init__(self, tty, log_processor, min_observations=100):
+    def __init__(self, tty, log_processor, min_observations=100,
+                 before_reset=None):
         super(Resetter, self).__init__(tty)
         self.log_processor = log_processor
-        # Flag for main thread to detect move to next experiment
-        self.next_experiment = False
+        # Optional callable that is run right before the Pi is reset
+        # because the experiment has finished (not on a timeout), e.g.
+        # for installing the next, already compiled, experiment.
+        self.before_reset = before_reset
+        # Event for main thread to detect move to next experiment
+        self.next_experiment = Event()
+        self.next_experiment_time = None
         self.min_observations = min_observations
         # timeout for not receiving data anymore (seconds)
         self.timeout = 60.0
-        self.curtime = 0.0
-        # number of seconds to sleep
+        # Optional Watchdog with per experiment timeouts, replaces timeout
+        self.watchdog = None
+        # Callables that are run after each reset
+        self.reset_handlers = []
+        # time of the last reset (time.monotonic)
+        self.reset_time = time.monotonic()
+        # number of seconds between 'waiting' messages
+        self.status_interval = 10.0
+        # number of seconds to sleep when not connected
         self.timeslice = 1.0
         self.connected = False
+        # Handoff latencies (seconds): from the LogProcessor reading the
+        # observation that crosses the threshold to the Resetter reacting,
+        # and from the Resetter setting the next experiment event to the
+        # main thread picking it up.
+        self.reaction_latencies = []
+        self.detection_latencies = []
+        # Number of resets because of a timeout, and number of observations
+        # of the last finished experiment
+        self.timeout_resets = 0
+        self.observations = 0
 
     def run(self):
         # Make connection to the Arduino
         self.connect_to_serial(9600)
+        log_processor = self.log_processor
+        log_processor.set_threshold(self.min_observations)
 
         while self.run_thread is True:
-            if self.connected is True:
-                # Get number of log lines
-                input_ok = self.log_processor.get_input_ok()
-                logger.debug('Resetter: got input ok={}.'.format(input_ok))
-                if input_ok:
-                    # There is some progress, reset the curtime
-                    self.curtime = 0
-                    observations = self.log_processor.get_iteration()
-                    logger.debug('Resetter: ' +
-                                 'observations={}.'.format(observations))
-                    # Do we have enough observations?
-                    if observations > self.min_observations:
-                        logger.info('Enough observations read.')
-                        logger.debug('Setting next experiment flag to True.')
-                        self.set_next_experiment(True)
-                        self.log_processor.set_init_state()
-                        self.do_reset()
-                else:
-                    # check for timeout
-                    self.curtime += self.timeslice
-                    if int(self.curtime) % 10 == 0:
-                        logger.info('Waiting {}'.format(self.curtime) +
-                                    ' secs and counting..')
-                    if self.curtime > self.timeout:
-                        logger.warning('Timeout reached.')
-                        logger.debug('Setting reset flag to True.')
-                        self.log_processor.set_init_state()
-                        self.do_reset()
-            time.sleep(self.timeslice)
+            if self.connected is not True:
+                time.sleep(self.timeslice)
+                continue
+
+            # Sleep until the LogProcessor signals that the threshold has
+            # been crossed or the input stalled, or until the watchdog
+            # deadline (or the next status message) is due.
+            timeout = self.get_timeout()
+            with log_processor.condition:
+                deadline = (max(log_processor.last_progress,
+                                self.reset_time) + timeout)
+                waittime = min(deadline - time.monotonic(),
+                               self.status_interval)
+                if log_processor.threshold_time is None and waittime > 0:
+                    log_processor.condition.wait(waittime)
+                threshold_time = log_processor.threshold_time
+                input_ok = log_processor.input_ok
+                last_progress = max(log_processor.last_progress,
+                                    self.reset_time)
+            if self.run_thread is not True:
+                break
+
+            now = time.monotonic()
+            if threshold_time is not None:
+                self.reaction_latencies.append(now - threshold_time)
+                logger.info('Enough observations read.')
+                logger.debug('Reaction latency is ' +
+                             '{:.3f} secs.'.format(now - threshold_time))
+                if self.before_reset is not None:
+                    self.before_reset()
+                self.observations = log_processor.get_iteration()
+                logger.debug('Setting next experiment flag to True.')
+                self.set_next_experiment(True)
+                log_processor.set_init_state()
+                self.do_reset()
+            elif now - last_progress > timeout:
+                logger.warning('Timeout of {:.1f} secs '.format(timeout) +
+                               'reached.')
+                self.timeout_resets += 1
+                if self.watchdog is not None:
+                    self.watchdog.timed_out(timeout)
+                log_processor.set_init_state()
+                self.do_reset()
+            elif not input_ok:
+                logger.info('Waiting {:.0f}'.format(now - last_progress) +
+                            ' secs and counting..')
+
+    def cleanup(self):
+        # Wake up the run loop, so that the thread can be joined
+        with self.log_processor.condition:
+            self.log_processor.condition.notify_all()
+
+    def get_timeout(self):
+        if self.watchdog is None:
+            return self.timeout
+        return self.watchdog.get_timeout()
 
     def get_next_experiment(self):
-        return self.next_experiment
+        return self.next_experiment.is_set()
 
     def set_next_experiment(self, flag):
-        self.next_experiment = flag
+        if flag:
+            self.next_experiment_time = time.monotonic()
+            self.next_experiment.set()
+        else:
+            self.next_experiment.clear()
+
+    def wait_next_experiment(self, timeout=None):
+        return self.next_experiment.wait(timeout)
 
     def do_reset(self):
         logger.info('Resetting the Raspberry Pi now.')
         self.serial.write('r'.encode())
         # Reset to initial state
-        self.curtime = 0
-        self.last_iteration = -1
+        self.reset_time = time.monotonic()
+        if self.watchdog is not None:
+            self.watchdog.reset()
+        for handler in self.reset_handlers:
+            handler()
+
+    def log_handoff_statistics(self):
+        for name, latencies in [('reaction', self.reaction_latencies),
+                                ('detection', self.detection_latencies)]:
+            if len(latencies) > 0:
+                logger.info('Handoff {} latency: '.format(name) +
+                            'mean {:.3f} secs, '.format(sum(latencies) /
+                                                        len(latencies)) +
+                            'max {:.3f} secs '.format(max(latencies)) +
+                            '({} handoffs).'.format(len(latencies)))
 
 
 class LogProcessor(SerialThread):
-    def __init__(self, tty, output_file):
+    def __init__(self, tty, output_file, append=False, write_log=True):
         super(LogProcessor, self).__init__(tty)
+        # append to an existing output file (when resuming a campaign)
+        self.append = append
+        # without write_log, the records only go to the record handlers
+        self.write_log = write_log
         # for the monitor that reads the log
         self.iteration = 0
         self.input_ok = False
         # start/stop thread flag
         self.run_thread = False
-        if isabs(output_file):
-            self.logfile = output_file
-        else:
-            self.logfile = sys.path[0] + '/' + output_file
+        self.logfile = get_output_path(output_file)
         logger.debug('Logfile path is {}'.format(self.logfile))
         self.filehandle = None
+        # Taken around the writes to the log, see get_log_position()
+        self.log_lock = Lock()
+        # x.log.gz is written as a block-compressed log (see blocklog.py)
+        self.block_log = write_log and is_block_log(self.logfile)
         self.connected = False
         self.no_match = 0
         self.max_no_match = 50
+        # Lines without record and records of a non-logical iteration
+        self.no_matches = 0
+        self.discarded = 0
+        # Reusable receive buffer, lines are split and parsed in place
+        self.buffer = bytearray(65536)
+        self.view = memoryview(self.buffer)
+        self.fill = 0
+        self.record_handlers = []
+        # Ingestion statistics
+        self.starttime = None
+        self.bytes = 0
+        self.lines = 0
+        self.records = 0
+        # Notified when the number of observations crosses the threshold
+        # and when the input stalls. Only changes to the state below are
+        # made while holding the condition's lock.
+        self.condition = Condition()
+        self.threshold = None
+        self.stop_criterion = None
+        # time.monotonic() of crossing the threshold, and of the last
+        # logical iteration read
+        self.threshold_time = None
+        self.last_progress = time.monotonic()
 
     # Overridden from Thread.run()
     def run(self):
@@ -315,57 +522,139 @@ class LogProcessor(SerialThread):
 
         # Open logfile for writing
         self.open_logfile()
+        self.starttime = time.monotonic()
 
         while self.run_thread is True:
             if self.connected is True:
-                # readline is only temporarily blocking, timeout is set
-                line = self.serial.readline()
                 try:
-                    string = line.decode('utf-8')
-                    logger.debug('LogProcessor: line={}'.format(string.strip()))
-                    match = re.search(r'iteration: ([0-9]+)', string)
-                    if match:
-                        iteration = int(match.group(1))
-                        if self.is_logical_iteration(iteration):
-                            self.input_ok = True
-                            self.no_match = 0
-                            logger.debug('Found iteration {}.'.format(iteration))
-                            self.iteration = iteration
-                            if self.filehandle is not None:
-                                self.filehandle.write(string)
-                        else:
-                            self.set_init_state()
-                            logger.warning('Discarding non-logical iteration ' +
-                                           '{}.'.format(iteration))
-                    else:
-                        # no match in received line
-                        logger.debug('LogProcessor: no match in ' +
-                                     ' line {}'.format(line))
-                        self.no_match += 1
-                        if self.no_match > self.max_no_match:
-                            logger.warning('LogProcessor: number ' +
-                                           'of not-matched lines ' +
-                                           'have exceeded threshold!')
-                            self.set_init_state()
-                            self.input_ok = False
-                except (TypeError, UnicodeDecodeError):
+                    self.read_frames()
+                except serial.SerialException:
                     self.set_init_state()
                     logger.warning('Caught Error reading bytes via serial')
-                    logger.debug('Error: ', sys.exc_info()[0])
+                    logger.debug('Error: {}'.format(sys.exc_info()[0]))
             else:
                 time.sleep(0.5)
 
+    def read_frames(self):
+        # Read all bytes that are waiting in one go into the reusable
+        # buffer (blocking for at most the timeout until at least one byte
+        # has arrived), then process all complete lines in the buffer.
+        buffer = self.buffer
+        size = max(1, min(self.serial.in_waiting, len(buffer) - self.fill))
+        n = self.serial.readinto(self.view[self.fill:self.fill + size])
+        if not n:
+            # Nothing received within the timeout
+            self.count_no_match()
+            return
+        self.bytes += n
+        self.fill += n
+
+        start = 0
+        while True:
+            end = buffer.find(b'\n', start, self.fill)
+            if end < 0:
+                break
+            self.process_frame(start, end + 1)
+            start = end + 1
+
+        # Move the incomplete last line to the front for the next read
+        rest = self.fill - start
+        if rest == len(buffer):
+            # The buffer is full without a single line ending, discard it
+            logger.warning('LogProcessor: discarding ' +
+                           '{} bytes without line ending.'.format(rest))
+            self.count_no_match()
+            rest = 0
+        elif start > 0 and rest > 0:
+            buffer[:rest] = buffer[start:self.fill]
+        self.fill = rest
+
+    def process_frame(self, start, end):
+        self.lines += 1
+        # The record is parsed in place, no copy of the line is made
+        record = parse_record(self.buffer, start, end)
+        if record is None:
+            # no match in received line
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('LogProcessor: no match in ' +
+                             ' line {}'.format(bytes(self.view[start:end])))
+            self.count_no_match()
+            return
+
+        if self.is_logical_iteration(record.iteration):
+            self.records += 1
+            with self.log_lock:
+                if self.block_log:
+                    self.filehandle.write(self.view[start:end], record.label)
+                elif self.filehandle is not None:
+                    self.filehandle.write(self.view[start:end])
+            for handler in self.record_handlers:
+                handler(record)
+            self.set_progress(record.iteration)
+        else:
+            self.discarded += 1
+            self.set_init_state()
+            logger.warning('Discarding non-logical iteration ' +
+                           '{}.'.format(record.iteration))
+
+    def count_no_match(self):
+        self.no_match += 1
+        self.no_matches += 1
+        if self.no_match > self.max_no_match:
+            logger.warning('LogProcessor: number ' +
+                           'of not-matched lines ' +
+                           'have exceeded threshold!')
+            self.set_init_state()
+
+    def add_record_handler(self, handler):
+        # handler is called with each accepted Record (see logrecord.py),
+        # from within the LogProcessor thread.
+        self.record_handlers.append(handler)
+
+    def get_lines_per_second(self):
+        if self.starttime is None:
+            return 0.0
+        elapsed = time.monotonic() - self.starttime
+        return self.lines / elapsed if elapsed > 0 else 0.0
+
     def open_logfile(self):
+        if not self.write_log:
+            return
         logger.debug('Logfile to open is {}'.format(self.logfile))
         logger.debug('Current directory is {}'.format(os.getcwd()))
         # open logfile for writing
         try:
-            self.filehandle = open(self.logfile, 'w')
+            with self.log_lock:
+                if self.block_log:
+                    self.filehandle = BlockLogWriter(self.logfile,
+                                                     append=self.append)
+                elif self.append:
+                    self.filehandle = open(self.logfile, 'ab')
+                else:
+                    self.filehandle = open(self.logfile, 'wb')
         except Exception:
             logger.error('Could not open file ' +
                          '{}'.format(self.logfile))
             raise
 
+    def get_log_position(self):
+        # (log file, size of the log in bytes) with the records read so
+        # far, None without log. The block of a block log is written first,
+        # so the size is at a block boundary.
+        if not self.write_log:
+            return None
+        with self.log_lock:
+            if self.filehandle is None:
+                # Not opened yet (or closed), nothing is buffered
+                size = getsize(self.logfile) if isfile(self.logfile) else 0
+            else:
+                self.filehandle.flush()
+                if self.block_log:
+                    size = self.filehandle.offset
+                else:
+                    size = self.filehandle.tell()
+        return abspath(self.logfile), size
+
     def is_logical_iteration(self, iteration):
         if iteration == self.iteration:
             return True
@@ -376,10 +665,45 @@ class LogProcessor(SerialThread):
         else:
             return False
 
+    def set_progress(self, iteration):
+        # The stop criterion is evaluated before taking the lock, so that
+        # the Resetter and the status readers are not blocked while it
+        # runs (e.g. the bootstrap of adaptive stopping). It only uses
+        # state of this thread.
+        reached = (self.threshold_time is None and
+                   self.is_threshold_reached(iteration))
+        with self.condition:
+            self.input_ok = True
+            self.no_match = 0
+            self.iteration = iteration
+            self.last_progress = time.monotonic()
+            if self.threshold_time is None and reached:
+                self.threshold_time = self.last_progress
+                self.condition.notify_all()
+
+    def is_threshold_reached(self, iteration):
+        if self.stop_criterion is not None:
+            return self.stop_criterion(iteration)
+        return self.threshold is not None and iteration > self.threshold
+
+    def set_threshold(self, threshold):
+        with self.condition:
+            self.threshold = threshold
+
+    def set_stop_criterion(self, stop_criterion):
+        # stop_criterion(iteration) replaces the fixed threshold, e.g.
+        # ConvergenceMonitor.is_converged for adaptive stopping.
+        with self.condition:
+            self.stop_criterion = stop_criterion
+
     def set_init_state(self):
-        self.input_ok = False
-        self.no_match = 0
-        self.iteration = 0
+        with self.condition:
+            self.input_ok = False
+            self.no_match = 0
+            self.iteration = 0
+            self.threshold_time = None
+            # Input has stalled or has been reset
+            self.condition.notify_all()
 
     def get_iteration(self):
         return self.iteration
@@ -388,7 +712,336 @@ class LogProcessor(SerialThread):
         return self.input_ok
 
     def cleanup(self):
-        self.filehandle.close()
+        logger.info('LogProcessor: read {} lines '.format(self.lines) +
+                    '({} records, {} bytes), '.format(self.records,
+                                                      self.bytes) +
+                    '{:.1f} lines/sec.'.format(self.get_lines_per_second()))
+        with self.log_lock:
+            if self.filehandle is not None:
+                self.filehandle.close()
+                self.filehandle = None
+
+
+class StagedBuild:
+    # Hand over of builds to the Resetter: while the Raspberry Pi runs
+    # experiment N, experiment N+1 is compiled (see BuildPool). The
+    # compiled image is only installed into the TFTP location by
+    # install_staged(), which is called by the Resetter right before the
+    # reset that ends experiment N.
+    def __init__(self):
+        # Function that installs a finished, but not yet installed build
+        self.staged = None
+        self.ready = Event()
+
+    def stage(self, install):
+        # Hand over a function that installs a finished build upon the next
+        # reset. An install of None means that there is nothing left to
+        # install.
+        self.staged = install
+        self.ready.set()
+
+    def install_staged(self):
+        # Called from the Resetter thread: wait until the build of the
+        # next experiment has finished, then swap it into place.
+        if not self.ready.is_set():
+            logger.info('Waiting for the build of the next experiment.')
+        self.ready.wait()
+        if self.staged is not None:
+            logger.info('Installing staged build.')
+            self.staged()
+        self.staged = None
+        self.ready.clear()
+
+
+class BuildPool:
+    # Runs up to workers builds at the same time, each in its own copy of
+    # the platform tree (the first one is the tree itself). A tree is in
+    # use from the start of a build until its image has been installed, so
+    # a build never overwrites an image that still has to be installed.
+    def __init__(self, working_dir, raspberrypi, workers, incremental=False):
+        self.working_dir = working_dir
+        self.incremental = incremental
+        self.comps = Queue()
+        for i in range(workers):
+            comp = Compile()
+            comp.set_environment(raspberrypi)
+            if i == 0:
+                comp.set_working_dir(working_dir)
+            else:
+                comp.set_working_dir(get_tree_copy(working_dir,
+                                                   'build{}'.format(i)))
+            self.comps.put(comp)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+    def build(self, m4cmd, makecmd, installcmd, cache=None, cache_key=None,
+              label=None):
+        comp = self.comps.get()
+        try:
+            install = compile_experiment(comp, m4cmd, makecmd, installcmd,
+                                         cache, cache_key, self.incremental,
+                                         label)
+        except Exception:
+            self.comps.put(comp)
+            raise
+
+        def install_and_release():
+            try:
+                install()
+            finally:
+                self.comps.put(comp)
+        return install_and_release
+
+    def submit(self, m4cmd, makecmd, installcmd, cache=None, cache_key=None,
+               label=None):
+        # Returns a Future of the install function of the build
+        return self.executor.submit(self.build, m4cmd, makecmd, installcmd,
+                                    cache, cache_key, label)
+
+    def shutdown(self):
+        self.executor.shutdown()
+
+    def get_build_times(self):
+        # Only complete after shutdown, when all trees are back
+        return [build_time for comp in list(self.comps.queue)
+                for build_time in comp.build_times]
+
+
+def get_tree_copy(working_dir, name):
+    # Copies of a platform tree live next to the original tree, this way
+    # relative paths in the Makefiles (e.g. circle's ../..) remain valid.
+    workdir = re.sub(r'/$', '', working_dir)
+    tree_dir = workdir + '-' + name
+    if not isdir(tree_dir):
+        logger.info('Creating build tree {}.'.format(tree_dir))
+        shutil.copytree(workdir, tree_dir, symlinks=True)
+    return tree_dir
+
+
+def get_experiment_m4cmd(comp, row, labelstart):
+    config_series = row[flds[Fields.CONFIG_SERIES]]
+    config_bench = row[flds[Fields.CONFIG_BENCH]]
+    label = labelstart + row[flds[Fields.EXP_LABEL]]
+    no_cache_mgmt = row[flds[Fields.NO_CACHE_MGMT]]
+    enable_mmu = row[flds[Fields.ENABLE_MMU]]
+    enable_screen = row[flds[Fields.ENABLE_SCREEN]]
+    pmu_cores = (row[flds[Fields.PMU_CORE0]],
+                 row[flds[Fields.PMU_CORE1]],
+                 row[flds[Fields.PMU_CORE2]],
+                 row[flds[Fields.PMU_CORE3]])
+    inputsizes = (row[flds[Fields.INPUTSIZE_CORE0]],
+                  row[flds[Fields.INPUTSIZE_CORE1]],
+                  row[flds[Fields.INPUTSIZE_CORE2]],
+                  row[flds[Fields.INPUTSIZE_CORE3]])
+    delay_step = row[flds[Fields.DELAY_STEP_COUNTDOWN]]
+    synbench_repeat = row[flds[Fields.SYNBENCH_REPEAT]]
+
+    # Construct the m4 command for creation of benchmark_config.h
+    return comp.get_benchmark_config_cmd(config_series=config_series,
+                                         config_bench=config_bench,
+                                         label=label,
+                                         pmu_cores=pmu_cores,
+                                         no_cache_mgmt=no_cache_mgmt,
+                                         enable_mmu=enable_mmu,
+                                         enable_screen=enable_screen,
+                                         inputsizes=inputsizes,
+                                         delay_step=delay_step,
+                                         synbench_repeat=synbench_repeat)
+
+
+def select_experiments(experiments, begin, count, journal=None):
+    # The rows of the experiments numbered begin up to begin + count, that
+    # have not been completed according to the journal
+    rows = []
+    for row in experiments:
+        number = row[flds[Fields.NUMBER]]
+        logger.debug('Experiment number read is {}.'.format(number))
+        if number >= begin and number < (begin + count):
+            if journal is not None and journal.is_completed(number):
+                logger.info('Skipping experiment {}, '.format(number) +
+                            'it was completed according to the journal.')
+            else:
+                rows.append(row)
+        else:
+            logger.debug('Not processing experiment {}.'.format(number))
+    return rows
+
+
+def get_observation_limits(row):
+    # Optional per experiment minimum and maximum number of observations
+    # for adaptive stopping, None if not given in the spreadsheet.
+    return (row.get(flds[Fields.MIN_OBSERVATIONS]),
+            row.get(flds[Fields.MAX_OBSERVATIONS]))
+
+
+def create_monitor(adaptive_stop, tolerance, min_observations,
+                   max_observations, log_processor):
+    # Set up adaptive stopping for the experiments read by log_processor
+    monitor = ConvergenceMonitor(adaptive_stop, tolerance,
+                                 min_observations, max_observations)
+    log_processor.add_record_handler(monitor.handle_record)
+    log_processor.set_stop_criterion(monitor.is_converged)
+    return monitor
+
+
+def compile_experiment(comp, m4cmd, makecmd, installcmd,
+                       cache=None, cache_key=None, incremental=False,
+                       label=None):
+    # Compile the experiment and return a function that installs the
+    # result. On a build cache hit, make is not invoked at all and the
+    # cached kernel image is installed instead. label is the experiment
+    # label, kept with the build in the cache.
+    if cache is not None and cache.lookup(cache_key):
+        return lambda: cache.install(cache_key)
+
+    starttime = time.monotonic()
+    if incremental:
+        # Only the files that include benchmark_config.h are rebuilt
+        if comp.create_benchmark_config(m4cmd, only_changed=True):
+            comp.touch_config_includers()
+    else:
+        # First do a make clean to clean up previous experiment
+        comp.make(['make', 'clean'])
+        comp.create_benchmark_config(m4cmd)
+    comp.make(makecmd)
+    build_time = time.monotonic() - starttime
+    comp.build_times.append(build_time)
+    logger.info('Build took {:.1f} secs.'.format(build_time))
+    if cache is not None:
+        cache.store(cache_key, comp.working_dir, label)
+
+    if makecmd == installcmd:
+        # Already installed by make
+        return lambda: None
+    else:
+        return lambda: comp.make(installcmd)
+
+
+def log_build_times(build_times):
+    if len(build_times) > 0:
+        logger.info('{} builds took {:.1f} secs '.format(len(build_times),
+                                                         sum(build_times)) +
+                    '(mean {:.1f} secs, '.format(sum(build_times) /
+                                                 len(build_times)) +
+                    'max {:.1f} secs).'.format(max(build_times)))
+
+
+def create_columnar_writer(output_format, outfile, log_processor,
+                           prefix=''):
+    if output_format == 'raw':
+        return None
+    writer = ColumnarWriter(get_columnar_dir(get_output_path(outfile)),
+                            prefix)
+    log_processor.add_record_handler(writer.handle_record)
+    return writer
+
+
+def create_stream_stats(streaming_stats, outfile, log_processor):
+    if not streaming_stats:
+        return None
+    stats = StreamStats(get_stats_file(get_output_path(outfile)))
+    log_processor.add_record_handler(stats.handle_record)
+    return stats
+
+
+def create_watchdog(adaptive_watchdog, log_processor):
+    if not adaptive_watchdog:
+        return None
+    experiment_watchdog = Watchdog()
+    log_processor.add_record_handler(experiment_watchdog.handle_record)
+    return experiment_watchdog
+
+
+def start_watchdog(experiment_watchdog, label):
+    if experiment_watchdog is not None:
+        experiment_watchdog.start_experiment(label)
+
+
+def create_campaign_status(status_file, status_port, total):
+    if status_file is None and status_port is None:
+        return None
+    if status_file is not None:
+        status_file = get_output_path(status_file)
+    campaign = CampaignStatus(status_file, status_port)
+    campaign.set_total(total)
+    campaign.start()
+    return campaign
+
+
+def create_board_status(campaign, name, log_processor, resetter,
+                        get_build_times=None):
+    # Call before the threads of log_processor and resetter are started
+    if campaign is None:
+        return None
+    board_status = campaign.add_board(name, log_processor, resetter,
+                                      get_build_times)
+    log_processor.add_record_handler(board_status.handle_record)
+    resetter.reset_handlers.append(board_status.reset)
+    return board_status
+
+
+def set_status_phase(board_status, phase):
+    if board_status is not None:
+        board_status.set_phase(phase)
+
+
+def status_start(board_status, number, label):
+    if board_status is not None:
+        board_status.start_experiment(number, label)
+
+
+def status_finish(board_status, number):
+    if board_status is not None:
+        board_status.finish_experiment(number)
+
+
+def journal_start(journal, number, build_hash, resetter, writer=None):
+    if journal is not None:
+        journal.start(number, build_hash, resetter.timeout_resets,
+                      resetter.log_processor.get_log_position(),
+                      writer.get_position() if writer is not None else None)
+
+
+def truncate_interrupted(journal):
+    # Cut the logs and columnar stores back to where the experiments that
+    # were interrupted started. They are run again, and their partial
+    # observations would otherwise be in the log twice.
+    for entry in journal.get_interrupted():
+        log_file = entry.get('log_file')
+        if log_file is not None and isfile(log_file):
+            logger.info('Experiment {} was '.format(entry['number']) +
+                        'interrupted, cutting {} '.format(log_file) +
+                        'back to {} bytes.'.format(entry['log_offset']))
+            truncate_log(log_file, entry['log_offset'])
+        columnar_dir = entry.get('columnar_dir')
+        if columnar_dir is not None and isdir(columnar_dir):
+            logger.info('Experiment {} was '.format(entry['number']) +
+                        'interrupted, cutting {} '.format(columnar_dir) +
+                        'back to {} chunks.'.format(entry['columnar_chunks']))
+            truncate_store(columnar_dir, entry['columnar_prefix'],
+                           entry['columnar_chunks'])
+        journal.abort(entry['number'])
+
+
+def journal_finish(journal, number, resetter, writer=None):
+    # The observations of a completed experiment are in the columnar store
+    # before the journal says so
+    if writer is not None:
+        writer.flush()
+    if journal is not None:
+        journal.finish(number, resetter.observations,
+                       resetter.timeout_resets)
+
+
+def wait_for_next_experiment(resetter):
+    resetter.wait_next_experiment()
+    # Oh! The resetter has reset the Pi. We should move on
+    # to the next experiment
+    resetter.detection_latencies.append(time.monotonic() -
+                                        resetter.next_experiment_time)
+    logger.info('Detected reset, ' +
+                ' move on to next experiment..')
+    # Finally reset the reset flag for the next iteration
+    resetter.set_next_experiment(False)
 
 
 flds = {
@@ -411,151 +1064,600 @@ flds = {
     Fields.INPUTSIZE_CORE3: 'input size core3',
     Fields.DELAY_STEP_COUNTDOWN: 'delay step countdown',
     Fields.SYNBENCH_REPEAT: 'synbench repeat',
+    Fields.MIN_OBSERVATIONS: 'min observations',
+    Fields.MAX_OBSERVATIONS: 'max observations',
 }
 
 
-def do_experiments(infile, outfile, workdir_xrtos, workdir_circle,
-                   tty_reset, tty_logging, min_observations, begin, count):
+def read_experiments(infile):
+    # The typed experiments of the plan file or excel file, see
+    # experiment_plan.py
+    try:
+        return load_experiments(infile)
+    except ValueError as e:
+        logger.error('Error in {}: {}'.format(infile, e))
+        exit(1)
+
+
+def build_circle_library(raspberrypi, workdir_circle):
+    # Circle platofrm needs an initial compilation,
+    # set working dir to platform dir
+    comp = Compile()
+    comp.set_environment(raspberrypi)
+    workdir = re.sub(r'/$', '', workdir_circle)
+    comp.set_working_dir(workdir + '/../..')
+    comp.make(['./makeall', 'clean'])
+    comp.make(['./makeall'])
+
+
+def get_build_times(platform_builds):
+    build_times = []
+    for platform_build in platform_builds.values():
+        build_times += platform_build.comp.build_times
+        if platform_build.build_pool is not None:
+            build_times += platform_build.build_pool.get_build_times()
+    return build_times
+
+
+def get_labelstart(platform, raspberrypi):
+    return str(platform).upper() + '_' + 'PI' + str(raspberrypi) + '_'
+
+
+def get_platform_dir(platform, workdir_xrtos, workdir_circle):
+    if str(platform).lower() == 'circle':
+        return workdir_circle
+    else:
+        return workdir_xrtos
+
+
+def get_circle_raspberrypi(rows):
+    # All circle experiments share the circle library, which is compiled
+    # for one Raspberry Pi version. Returns that version, or None if there
+    # are no circle experiments.
+    versions = set(int(row[flds[Fields.RASPBERRYPI]]) for row in rows
+                   if str(row[flds[Fields.PLATFORM]]).lower() == 'circle')
+    if len(versions) > 1:
+        logger.error('The circle experiments are for Raspberry Pi ' +
+                     'versions {}, '.format(sorted(versions)) +
+                     'the circle library can only be built for one.')
+        exit(1)
+    return versions.pop() if len(versions) > 0 else None
+
+
+class PlatformBuild:
+    # The build setup of one platform and Raspberry Pi version: the label
+    # prefix of its experiments, the Compile object of its platform tree,
+    # which stays warm during the campaign, and its install command.
+    def __init__(self, platform, raspberrypi, working_dir):
+        self.platform = str(platform).lower()
+        self.raspberrypi = raspberrypi
+        self.labelstart = get_labelstart(platform, raspberrypi)
+        self.comp = Compile()
+        self.comp.set_environment(raspberrypi)
+        self.comp.set_working_dir(working_dir)
+        if self.platform == 'circle' and raspberrypi == 3:
+            self.installcmd = ['make', 'install3']
+        else:
+            self.installcmd = ['make', 'install']
+        # BuildPool for pipelined mode, see get_build_pool()
+        self.build_pool = None
 
-    # Read the excel file, the first row is documentation, it should
-    # not be included in the data frame
-    df = pd.read_excel(infile, skiprows=[0])
-    validity_checks(df)
+    def get_build_pool(self, workers, incremental=False):
+        if self.build_pool is None:
+            self.build_pool = BuildPool(self.comp.working_dir,
+                                        self.raspberrypi, workers,
+                                        incremental)
+        return self.build_pool
 
-    # First get the first row in which the platform (xrtos) and raspberrypi are
-    # specified: if platform is circle we must perform an initial compilation in
-    # the main circle directory.
-    platform = df.loc[0, flds[Fields.PLATFORM]]
-    raspberrypi = df.loc[0, flds[Fields.RASPBERRYPI]]
-    labelstart = platform.upper() + '_' + 'PI' + str(raspberrypi) + '_'
 
-    logger.debug('Platform read is {}'.format(platform))
-    logger.debug('Raspberry Pi version read is {}'.format(raspberrypi))
+def do_experiments(infile, outfile, workdir_xrtos, workdir_circle,
+                   tty_reset, tty_logging, min_observations, begin, count,
+                   pipelined=False, cache_dir=None, cache_size=1024,
+                   tftp_dir=None, adaptive_stop=None, tolerance=0.01,
+                   max_observations=1000, journal=None, resume=False,
+                   output_format='raw', streaming_stats=False,
+                   build_workers=1, incremental=False, plan=False,
+                   adaptive_watchdog=False, status_file=None,
+                   status_port=None):
+
+    experiments = read_experiments(infile)
+    rows = select_experiments(experiments, begin, count, journal)
+
+    # The experiments may be for several platforms, but there is only one
+    # board: they must all be for the same Raspberry Pi version.
+    raspberrypis = set(int(row[flds[Fields.RASPBERRYPI]]) for row in rows)
+    if len(raspberrypis) > 1:
+        logger.error('The experiments are for Raspberry Pi versions ' +
+                     '{}, use --boards '.format(sorted(raspberrypis)) +
+                     'to run them on a board of each version.')
+        exit(1)
+    circle_raspberrypi = get_circle_raspberrypi(rows)
 
     logger.info('Instantiating LogProcessor object.')
-    log_processor = LogProcessor(tty_logging, outfile)
-    log_processor.start_thread()
+    log_processor = LogProcessor(tty_logging, outfile, append=resume,
+                                 write_log=(output_format != 'columnar'))
+    writer = create_columnar_writer(output_format, outfile, log_processor)
+    stats = create_stream_stats(streaming_stats, outfile, log_processor)
+    if adaptive_stop is not None:
+        monitor = create_monitor(adaptive_stop, tolerance, min_observations,
+                                 max_observations, log_processor)
+    else:
+        monitor = None
+    experiment_watchdog = create_watchdog(adaptive_watchdog, log_processor)
 
     logger.info('Instantiating Resetter object.')
     resetter = Resetter(tty_reset, log_processor, min_observations)
+    resetter.watchdog = experiment_watchdog
+    # (platform, raspberrypi) => PlatformBuild
+    platform_builds = {}
+    campaign = create_campaign_status(status_file, status_port,
+                                      len(rows))
+    board_status = create_board_status(
+        campaign, 'board', log_processor, resetter,
+        lambda: get_build_times(platform_builds))
+    log_processor.start_thread()
     resetter.start_thread()
 
-    logger.info('Instantiating Compile object.')
-    comp = Compile()
-
-    # Prepare the environment variables for the compilation object
-    comp.set_environment(raspberrypi)
+    # The circle platform needs an initial compilation, once per campaign
+    if circle_raspberrypi is not None:
+        build_circle_library(circle_raspberrypi, workdir_circle)
 
-    if platform == 'circle':
-        # Circle platofrm needs an initial compilation,
-        # set working dir to platform dir
-        workdir = re.sub(r'/$', '', workdir_circle)
-        comp.set_working_dir(workdir + '/../..')
-        comp.make(['./makeall', 'clean'])
-        comp.make(['./makeall'])
-        comp.set_working_dir(workdir_circle)
+    if cache_dir is not None:
+        cache = BuildCache(cache_dir, tftp_dir, cache_size * 2**20)
     else:
-        comp.set_working_dir(workdir_xrtos)
-
-    # Convert boolean fields to actual bool type
-    df[flds[Fields.NO_CACHE_MGMT]] = df[flds[Fields.NO_CACHE_MGMT]].astype(bool)
-    df[flds[Fields.ENABLE_MMU]] = df[flds[Fields.ENABLE_MMU]].astype(bool)
-    df[flds[Fields.ENABLE_SCREEN]] = df[flds[Fields.ENABLE_SCREEN]].astype(bool)
-    # Convert input fields to actual int type
-    df[flds[Fields.INPUTSIZE_CORE0]] = df[flds[Fields.INPUTSIZE_CORE0]].astype(int)
-    df[flds[Fields.INPUTSIZE_CORE1]] = df[flds[Fields.INPUTSIZE_CORE1]].astype(int)
-    df[flds[Fields.INPUTSIZE_CORE2]] = df[flds[Fields.INPUTSIZE_CORE2]].astype(int)
-    df[flds[Fields.INPUTSIZE_CORE3]] = df[flds[Fields.INPUTSIZE_CORE3]].astype(int)
-
-    for idx, row in df.iterrows():
+        cache = None
+
+    if plan:
+        planned = plan_experiments(rows)
+        log_plan(rows, planned, min_observations, pipelined)
+        rows = planned
+
+    # First determine the experiments to run: number, m4 command, hash of
+    # the build, the build setup of its platform and the label
+    jobs = []
+    for row in rows:
         number = row[flds[Fields.NUMBER]]
-        logger.debug('Experiment number read is {}.'.format(number))
-        if number >= begin and number < (begin + count):
-            # First compile this experiment
-            logger.info('Starting a new compilation, ' +
-                        'experiment nr is {}.'.format(number))
+        platform = str(row[flds[Fields.PLATFORM]]).lower()
+        raspberrypi = int(row[flds[Fields.RASPBERRYPI]])
+        logger.debug('Experiment {} is for {} '.format(number, platform) +
+                     'on Raspberry Pi {}.'.format(raspberrypi))
+        if (platform, raspberrypi) not in platform_builds:
+            platform_builds[(platform, raspberrypi)] = PlatformBuild(
+                platform, raspberrypi,
+                get_platform_dir(platform, workdir_xrtos, workdir_circle))
+        platform_build = platform_builds[(platform, raspberrypi)]
+        comp = platform_build.comp
+        label = platform_build.labelstart + row[flds[Fields.EXP_LABEL]]
+        m4cmd = get_experiment_m4cmd(comp, row, platform_build.labelstart)
+        if monitor is not None:
+            monitor.set_limits(label, *get_observation_limits(row))
+        if experiment_watchdog is not None:
+            experiment_watchdog.set_expected(label, row)
+        if cache is not None or journal is not None:
+            build_hash = get_build_key(comp.get_benchmark_config(m4cmd),
+                                       platform, raspberrypi, comp.myenv)
+        else:
+            build_hash = None
+        jobs.append((number, m4cmd, build_hash, platform_build, label))
 
-            # First do a make clean to clean up previous experiment
-            comp.make(['make', 'clean'])
+    if cache is not None:
+        get_cache_key = (lambda build_hash: build_hash)
+    else:
+        get_cache_key = (lambda build_hash: None)
 
-            config_series = row[flds[Fields.CONFIG_SERIES]]
-            config_bench = row[flds[Fields.CONFIG_BENCH]]
-            label = labelstart + row[flds[Fields.EXP_LABEL]]
-            no_cache_mgmt = row[flds[Fields.NO_CACHE_MGMT]]
-            enable_mmu = row[flds[Fields.ENABLE_MMU]]
-            enable_screen = row[flds[Fields.ENABLE_SCREEN]]
-            pmu_cores = (row[flds[Fields.PMU_CORE0]],
-                         row[flds[Fields.PMU_CORE1]],
-                         row[flds[Fields.PMU_CORE2]],
-                         row[flds[Fields.PMU_CORE3]])
-            inputsizes = (row[flds[Fields.INPUTSIZE_CORE0]],
-                          row[flds[Fields.INPUTSIZE_CORE1]],
-                          row[flds[Fields.INPUTSIZE_CORE2]],
-                          row[flds[Fields.INPUTSIZE_CORE3]])
-            delay_step = row[flds[Fields.DELAY_STEP_COUNTDOWN]]
-            synbench_repeat = row[flds[Fields.SYNBENCH_REPEAT]]
-            if math.isnan(synbench_repeat):
-                synbench_repeat = None
-
-            # Construct the m4 command for creation of benchmark_config.h
-            m4cmd = comp.get_benchmark_config_cmd(config_series=config_series,
-                                                  config_bench=config_bench,
-                                                  label=label,
-                                                  pmu_cores=pmu_cores,
-                                                  no_cache_mgmt=no_cache_mgmt,
-                                                  enable_mmu=enable_mmu,
-                                                  enable_screen=enable_screen,
-                                                  inputsizes=inputsizes,
-                                                  delay_step=delay_step,
-                                                  synbench_repeat=synbench_repeat)
-            comp.create_benchmark_config(m4cmd)
-
-            # Now we can do the actual compilation and installation
-            if platform == 'circle' and raspberrypi == 3:
-                comp.make(['make', 'install3'])
-            else:
-                comp.make(['make', 'install'])
+    if not pipelined:
+        for number, m4cmd, build_hash, platform_build, label in jobs:
+            logger.info('Starting a new compilation, ' +
+                        'experiment nr is {}.'.format(number))
+            set_status_phase(board_status, 'build')
+            install = compile_experiment(platform_build.comp, m4cmd,
+                                         platform_build.installcmd,
+                                         platform_build.installcmd, cache,
+                                         get_cache_key(build_hash),
+                                         incremental, label)
+            install()
             logger.info('Compilation done.')
-
-            while True:
-                if resetter.get_next_experiment() is True:
-                    # Oh! The resetter has reset the Pi. We should move on
-                    # to the next experiment
-                    logger.info('Detected reset, ' +
-                                ' move on to next experiment..')
-                    # Finally reset the reset flag for the next iteration
-                    resetter.set_next_experiment(False)
-
-                    # break out of this loop
-                    break
+            set_status_phase(board_status, 'boot')
+            start_watchdog(experiment_watchdog, label)
+            status_start(board_status, number, label)
+            journal_start(journal, number, build_hash, resetter, writer)
+            wait_for_next_experiment(resetter)
+            journal_finish(journal, number, resetter, writer)
+            status_finish(board_status, number)
+    else:
+        staged_build = StagedBuild()
+        resetter.before_reset = staged_build.install_staged
+        futures = []
+        for i, (number, m4cmd, build_hash, platform_build, label) in \
+                enumerate(jobs):
+            # Keep the build pools busy with the next experiments. The
+            # images of the experiments before i have been installed, so
+            # the builds up to i + build_workers - 1 all get a tree.
+            while len(futures) < min(i + build_workers, len(jobs)):
+                (next_number, next_m4cmd, next_build_hash,
+                 next_platform_build, next_label) = jobs[len(futures)]
+                logger.info('Starting a new compilation, ' +
+                            'experiment nr is {}.'.format(next_number))
+                installcmd = next_platform_build.installcmd
+                if len(futures) == 0:
+                    # Nothing is running yet, install right away
+                    makecmd = installcmd
                 else:
-                    time.sleep(0.5)
-
-        else:
-            logger.debug('Not processing experiment {}.'.format(number))
+                    # Only build, the image is installed by the Resetter
+                    # at the moment the running experiment is done.
+                    makecmd = ['make']
+                build_pool = next_platform_build.get_build_pool(
+                    build_workers, incremental)
+                futures.append(build_pool.submit(
+                    next_m4cmd, makecmd, installcmd, cache,
+                    get_cache_key(next_build_hash), next_label))
+            if i == 0:
+                set_status_phase(board_status, 'build')
+            install = futures[i].result()
+            if i == 0:
+                install()
+                logger.info('Compilation done.')
+                set_status_phase(board_status, 'boot')
+            else:
+                logger.info('Compilation done, staged for installation.')
+                staged_build.stage(install)
+                # Wait for the end of the experiment that is running now
+                wait_for_next_experiment(resetter)
+                journal_finish(journal, jobs[i - 1][0], resetter,
+                               writer)
+                status_finish(board_status, jobs[i - 1][0])
+            start_watchdog(experiment_watchdog, label)
+            status_start(board_status, number, label)
+            journal_start(journal, number, build_hash, resetter, writer)
+
+        if len(jobs) > 0:
+            # Wait for the end of the last experiment, nothing to install
+            staged_build.stage(None)
+            wait_for_next_experiment(resetter)
+            journal_finish(journal, jobs[-1][0], resetter, writer)
+            status_finish(board_status, jobs[-1][0])
+        for platform_build in platform_builds.values():
+            if platform_build.build_pool is not None:
+                platform_build.build_pool.shutdown()
+    log_build_times(get_build_times(platform_builds))
 
     logger.info('Done processing excel file..')
+    if cache is not None:
+        cache.log_statistics()
     time.sleep(0.5)
 
+    resetter.log_handoff_statistics()
+    if experiment_watchdog is not None:
+        experiment_watchdog.log_statistics()
+
     # Stop the threads
     resetter.stop_thread()
     log_processor.stop_thread()
+    if writer is not None:
+        writer.close()
+    if stats is not None:
+        stats.close()
+    if campaign is not None:
+        campaign.close()
 
     logger.info('Stopping.. bye now!')
 
 
-def validity_checks(dataframe):
-    # tbd
-    return
+def read_boards(boards_file):
+    # The boards file is a JSON list with one descriptor per board, e.g.
+    #   [{"name": "pi3a", "platform": "xrtos", "raspberrypi": 3,
+    #     "tty_logging": "/dev/ttyUSB1", "tty_reset": "/dev/ttyUSB0",
+    #     "tftp_directory": "/srv/tftp/pi3a"}, ...]
+    # The platform is optional, a board without platform runs the
+    # experiments of all platforms for its Raspberry Pi version.
+    with open(boards_file) as f:
+        boards = json.load(f)
+    keys = ['name', 'raspberrypi',
+            'tty_logging', 'tty_reset', 'tftp_directory']
+    for board in boards:
+        for key in keys:
+            if key not in board:
+                raise ValueError('Board {} '.format(board) +
+                                 'has no field {}.'.format(key))
+    if len(set(board['name'] for board in boards)) != len(boards):
+        raise ValueError('Board names must be unique.')
+    for board in boards:
+        board.setdefault('platform', None)
+    return boards
+
+
+def get_board_file(outfile, board):
+    # Per board output file, e.g. output/campaign-pi3a.log (or .log.gz)
+    suffix = '.log.gz' if is_block_log(outfile) else '.log'
+    return strip_log_suffix(outfile) + '-{}'.format(board['name']) + suffix
+
+
+def is_compatible(row, board):
+    return ((board['platform'] is None or
+             str(row[flds[Fields.PLATFORM]]).lower() ==
+             str(board['platform']).lower()) and
+            int(row[flds[Fields.RASPBERRYPI]]) == int(board['raspberrypi']))
+
+
+class ExperimentQueue:
+    # Spreadsheet rows that still have to be run, shared by all boards
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.lock = Lock()
+        # experiment number => board name, time spent
+        self.done = {}
+
+    def take(self, board):
+        # Take the first pending row that can run on this board
+        with self.lock:
+            for i, row in enumerate(self.rows):
+                if is_compatible(row, board):
+                    return self.rows.pop(i)
+        return None
+
+    def finish(self, number, board, duration):
+        with self.lock:
+            self.done[number] = (board['name'], duration)
+
+
+class BoardWorker(Thread):
+    # Runs experiments on one board: it owns the LogProcessor and Resetter
+    # of the board and a private copy of each platform tree in which the
+    # experiments for this board are compiled.
+    def __init__(self, board, queue, outfile, workdir_xrtos, workdir_circle,
+                 min_observations,
+                 cache=None, adaptive_stop=None, tolerance=0.01,
+                 max_observations=1000, journal=None, resume=False,
+                 output_format='raw', streaming_stats=False,
+                 incremental=False, adaptive_watchdog=False,
+                 campaign=None):
+        super(BoardWorker, self).__init__()
+        self.campaign = campaign
+        self.incremental = incremental
+        self.adaptive_watchdog = adaptive_watchdog
+        self.streaming_stats = streaming_stats
+        self.campaign_outfile = outfile
+        self.output_format = output_format
+        self.journal = journal
+        self.resume = resume
+        self.adaptive_stop = adaptive_stop
+        self.tolerance = tolerance
+        self.max_observations = max_observations
+        self.board = board
+        self.queue = queue
+        self.outfile = get_board_file(outfile, board)
+        self.workdir_xrtos = workdir_xrtos
+        self.workdir_circle = workdir_circle
+        self.min_observations = min_observations
+        self.cache = cache
+        # platform => Compile object of the board's copy of its tree
+        self.comps = {}
+
+    def get_compile(self, platform):
+        # The trees are created when the board gets its first experiment
+        # for the platform, and stay warm for the rest of the campaign
+        platform = str(platform).lower()
+        if platform not in self.comps:
+            comp = Compile()
+            comp.set_environment(self.board['raspberrypi'])
+            comp.set_working_dir(get_board_dir(
+                get_platform_dir(platform, self.workdir_xrtos,
+                                 self.workdir_circle),
+                self.board['name']))
+            self.comps[platform] = comp
+        return self.comps[platform]
+
+    def run(self):
+        board = self.board
+        name = board['name']
+        log_processor = LogProcessor(board['tty_logging'], self.outfile,
+                                     append=self.resume,
+                                     write_log=(self.output_format !=
+                                                'columnar'))
+        # The boards share the columnar store of the campaign
+        writer = create_columnar_writer(self.output_format,
+                                        self.campaign_outfile, log_processor,
+                                        name + '-')
+        stats = create_stream_stats(self.streaming_stats, self.outfile,
+                                    log_processor)
+        if self.adaptive_stop is not None:
+            monitor = create_monitor(self.adaptive_stop, self.tolerance,
+                                     self.min_observations,
+                                     self.max_observations, log_processor)
+        else:
+            monitor = None
+        experiment_watchdog = create_watchdog(self.adaptive_watchdog,
+                                              log_processor)
+        resetter = Resetter(board['tty_reset'], log_processor,
+                            self.min_observations)
+        resetter.watchdog = experiment_watchdog
+        board_status = create_board_status(
+            self.campaign, name, log_processor, resetter,
+            lambda: [build_time for comp in list(self.comps.values())
+                     for build_time in comp.build_times])
+        log_processor.start_thread()
+        resetter.start_thread()
+
+        while True:
+            row = self.queue.take(board)
+            if row is None:
+                break
+            number = row[flds[Fields.NUMBER]]
+            starttime = time.time()
+            logger.info('Board {}: starting experiment {}.'.format(name,
+                                                                   number))
+            platform = row[flds[Fields.PLATFORM]]
+            comp = self.get_compile(platform)
+            labelstart = get_labelstart(platform,
+                                        row[flds[Fields.RASPBERRYPI]])
+            m4cmd = get_experiment_m4cmd(comp, row, labelstart)
+            label = labelstart + row[flds[Fields.EXP_LABEL]]
+            if monitor is not None:
+                monitor.set_limits(label, *get_observation_limits(row))
+            if experiment_watchdog is not None:
+                experiment_watchdog.set_expected(label, row)
+            # The boards build at the same time, each in its own tree
+            set_status_phase(board_status, 'build')
+            build_hash = get_build_key(comp.get_benchmark_config(m4cmd),
+                                       str(platform).lower(),
+                                       board['raspberrypi'], comp.myenv)
+            if self.cache is not None:
+                if self.cache.lookup(build_hash):
+                    self.cache.install(build_hash, board['tftp_directory'])
+                else:
+                    self.build(comp, m4cmd)
+                    self.cache.store(build_hash, comp.working_dir, label)
+            else:
+                self.build(comp, m4cmd)
+            logger.info('Board {}: compilation done.'.format(name))
+            set_status_phase(board_status, 'boot')
+            start_watchdog(experiment_watchdog, label)
+            status_start(board_status, number, label)
+            journal_start(self.journal, number, build_hash, resetter,
+                          writer)
+            wait_for_next_experiment(resetter)
+            journal_finish(self.journal, number, resetter, writer)
+            status_finish(board_status, number)
+            self.queue.finish(number, board, time.time() - starttime)
+
+        resetter.log_handoff_statistics()
+        if experiment_watchdog is not None:
+            experiment_watchdog.log_statistics()
+        log_build_times([build_time for comp in self.comps.values()
+                         for build_time in comp.build_times])
+        resetter.stop_thread()
+        log_processor.stop_thread()
+        if writer is not None:
+            writer.close()
+        if stats is not None:
+            stats.close()
+        logger.info('Board {}: no experiments left.'.format(name))
+
+    def build(self, comp, m4cmd):
+        compile_experiment(comp, m4cmd, ['make'], ['make'],
+                           incremental=self.incremental)
+        comp.install_images(self.board['tftp_directory'])
+
+
+def get_board_dir(working_dir, name):
+    # Each board gets its own copy of the platform tree
+    return get_tree_copy(working_dir, name)
+
+
+def merge_board_files(outfile, boards):
+    # Combine the per board output files into one campaign output file,
+    # the log lines are labeled so the order of the boards doesn't matter.
+    merged = get_output_path(outfile)
+    if is_block_log(merged):
+        board_files = [get_board_file(merged, board) for board in boards]
+        concatenate([board_file for board_file in board_files
+                     if isfile(board_file)], merged)
+        logger.info('Merged the board output files into {}.'.format(merged))
+        return
+    with open(merged, 'w') as outf:
+        for board in boards:
+            board_file = get_board_file(merged, board)
+            if isfile(board_file):
+                with open(board_file) as inf:
+                    shutil.copyfileobj(inf, outf)
+    logger.info('Merged the board output files into {}.'.format(merged))
+
+
+def do_farm_experiments(infile, outfile, boards, workdir_xrtos,
+                        workdir_circle, min_observations, begin, count,
+                        cache_dir=None, cache_size=1024, adaptive_stop=None,
+                        tolerance=0.01, max_observations=1000, journal=None,
+                        resume=False, output_format='raw',
+                        streaming_stats=False, incremental=False,
+                        plan=False, adaptive_watchdog=False,
+                        status_file=None, status_port=None):
+    experiments = read_experiments(infile)
+    rows = select_experiments(experiments, begin, count, journal)
+    if plan:
+        planned = plan_experiments(rows)
+        log_plan(rows, planned, min_observations)
+        rows = planned
+    for row in rows:
+        if not any(is_compatible(row, board) for board in boards):
+            logger.warning('No board available for experiment ' +
+                           '{}.'.format(row[flds[Fields.NUMBER]]))
+    rows = [row for row in rows
+            if any(is_compatible(row, board) for board in boards)]
+
+    if cache_dir is not None:
+        # tftp directory is per board, given to install()
+        cache = BuildCache(cache_dir, None, cache_size * 2**20)
+    else:
+        cache = None
+
+    # The circle platform needs an initial compilation, once per campaign
+    circle_raspberrypi = get_circle_raspberrypi(rows)
+    if circle_raspberrypi is not None:
+        build_circle_library(circle_raspberrypi, workdir_circle)
+
+    campaign = create_campaign_status(status_file, status_port, len(rows))
+    queue = ExperimentQueue(rows)
+    workers = []
+    starttime = time.time()
+    for board in boards:
+        worker = BoardWorker(board, queue, outfile, workdir_xrtos,
+                             workdir_circle, min_observations, cache,
+                             adaptive_stop, tolerance, max_observations,
+                             journal, resume, output_format,
+                             streaming_stats, incremental, adaptive_watchdog,
+                             campaign)
+        worker.start()
+        workers.append(worker)
+    for worker in workers:
+        worker.join()
+
+    for number, (name, duration) in sorted(queue.done.items()):
+        logger.info('Experiment {} ran on board {} '.format(number, name) +
+                    'in {:.0f} secs.'.format(duration))
+    logger.info('Campaign took {:.0f} secs.'.format(time.time() - starttime))
+    if cache is not None:
+        cache.log_statistics()
+    if output_format != 'columnar':
+        merge_board_files(outfile, boards)
+    if campaign is not None:
+        campaign.close()
+    logger.info('Stopping.. bye now!')
+
+
+def do_estimate(infile, min_observations, begin, count, pipelined=False,
+                boards=None, adaptive_stop=None, max_observations=1000,
+                plan=False, history_dir='output'):
+    # Estimate the duration of the campaign from the logs of previous
+    # campaigns (see estimator.py), nothing is built and the serial ports
+    # are not opened.
+    experiments = read_experiments(infile)
+    rows = select_experiments(experiments, begin, count)
+    if plan:
+        rows = plan_experiments(rows)
+    labels = [get_labelstart(row[flds[Fields.PLATFORM]],
+                             row[flds[Fields.RASPBERRYPI]]) +
+              row[flds[Fields.EXP_LABEL]] for row in rows]
+    histories = read_history(history_dir, labels)
+    if boards is None:
+        estimates = estimate_rows(rows, labels, histories, min_observations,
+                                  max_observations, adaptive_stop)
+        log_campaign_estimate(estimates, pipelined)
+    else:
+        board_estimates = estimate_boards(rows, labels, boards, histories,
+                                          is_compatible, min_observations,
+                                          max_observations, adaptive_stop)
+        log_boards_estimate(board_estimates)
 
 
 @click.command()
 @click.option('--input-file',
               required=True,
-              help='Path and filename of the input Excel file.')
+              help='Path and filename of the input Excel file, or of ' +
+                   'its plan (see experiment_plan.py).')
 @click.option('--output-file',
-              required=True,
-              help='Path and filename of the log file for output.')
+              default=None,
+              help='Path and filename of the log file for output, ' +
+                   'required unless --estimate is given.')
 @click.option('--working-directory-xrtos',
               default='../platforms/raspberrypi/Raspberry-Pi-Multicore/xRTOS_MMU_SEMAPHORE',
               help='Path of the working directory.')
@@ -577,21 +1679,192 @@ def validity_checks(dataframe):
 @click.option('--experiment-count',
               default=1,
               help='Number of experiments process.')
+@click.option('--pipelined',
+              is_flag=True,
+              default=False,
+              help='Compile the next experiment in a staging directory ' +
+                   'while the current experiment is running.')
+@click.option('--build-cache-dir',
+              default=None,
+              help='Path of the directory in which compiled kernel images ' +
+                   'are cached, by default no build cache is used.')
+@click.option('--build-cache-size',
+              default=1024,
+              help='Maximum size of the build cache in MB.')
+@click.option('--tftp-directory',
+              default=None,
+              help='Path of the TFTP directory to which cached kernel ' +
+                   'images are installed, required for the build cache.')
+@click.option('--boards',
+              default=None,
+              help='Path and filename of a JSON file describing several ' +
+                   'boards, to run the experiments on all of them.')
+@click.option('--adaptive-stop',
+              type=click.Choice(['ci', 'max']),
+              default=None,
+              help='Stop an experiment when its statistics converge: ci ' +
+                   '(confidence interval of the mean) or max (maximum ' +
+                   'versus high quantile), by default stop after ' +
+                   '--min-observations.')
+@click.option('--adaptive-tolerance',
+              default=0.01,
+              help='Relative tolerance for adaptive stopping.')
+@click.option('--max-observations',
+              default=1000,
+              help='Maximum number of observations to read with adaptive ' +
+                   'stopping.')
+@click.option('--resume',
+              is_flag=True,
+              default=False,
+              help='Resume an interrupted campaign: skip the experiments ' +
+                   'that are completed according to the journal and ' +
+                   'append to the existing output file.')
+@click.option('--output-format',
+              type=click.Choice(['raw', 'columnar', 'both']),
+              default='raw',
+              help='Write the raw log to the output file, the ' +
+                   'observations as typed columns to a columnar store ' +
+                   'next to it, or both.')
+@click.option('--streaming-stats',
+              is_flag=True,
+              default=False,
+              help='Keep statistics of the cycle counts per experiment, ' +
+                   'core and offset while the experiments run, and write ' +
+                   'them to a -stats.csv file next to the output file.')
+@click.option('--build-workers',
+              default=1,
+              help='Number of experiments that are compiled at the same ' +
+                   'time in pipelined mode, each in its own copy of the ' +
+                   'platform directory.')
+@click.option('--incremental',
+              is_flag=True,
+              default=False,
+              help='Do not clean the platform directory before each ' +
+                   'build, only recompile what depends on ' +
+                   'benchmark_config.h.')
+@click.option('--plan',
+              is_flag=True,
+              default=False,
+              help='Reorder the experiments so that consecutive builds ' +
+                   'differ as little as possible, and log the planned ' +
+                   'order with an estimate of the campaign duration.')
+@click.option('--adaptive-watchdog',
+              is_flag=True,
+              default=False,
+              help='Reset the Pi after a timeout per experiment, derived ' +
+                   'from its measured WCET baseline and the observed ' +
+                   'time between iterations, instead of after 60 secs.')
+@click.option('--status-file',
+              default=None,
+              help='Path and filename of a JSON file with the progress ' +
+                   'of the campaign, rewritten every 5 secs.')
+@click.option('--status-port',
+              default=None,
+              type=int,
+              help='Serve the progress of the campaign as JSON on ' +
+                   'http://127.0.0.1:<port>/.')
+@click.option('--estimate',
+              is_flag=True,
+              default=False,
+              help='Only estimate the build, boot and measurement time ' +
+                   'of the experiments from the logs of previous ' +
+                   'campaigns, without building or opening the serial ' +
+                   'ports.')
+@click.option('--history-directory',
+              default='output',
+              help='Path of the directory with the logs of previous ' +
+                   'campaigns used by --estimate.')
 @click_log.simple_verbosity_option(logger)
 def main(input_file, output_file, working_directory_xrtos,
          working_directory_circle, tty_reset, tty_logging,
-         min_observations, experiment_begin, experiment_count):
+         min_observations, experiment_begin, experiment_count, pipelined,
+         build_cache_dir, build_cache_size, tftp_directory, boards,
+         adaptive_stop, adaptive_tolerance, max_observations, resume,
+         output_format, streaming_stats, build_workers, incremental, plan,
+         adaptive_watchdog, status_file, status_port, estimate,
+         history_directory):
+    build_cache.logger.setLevel(logger.level)
+    convergence.logger.setLevel(logger.level)
+    journal.logger.setLevel(logger.level)
+    streamstats.logger.setLevel(logger.level)
+    planner.logger.setLevel(logger.level)
+    experiment_plan.logger.setLevel(logger.level)
+    watchdog.logger.setLevel(logger.level)
+    campaign_status.logger.setLevel(logger.level)
+    estimator.logger.setLevel(logger.level)
     if not isfile(input_file):
         print('Error: input file {}'.format(input_file), end=' ')
         print('does not exist!')
         exit(1)
-    if isfile(output_file):
+    if estimate:
+        board_list = read_boards(boards) if boards is not None else None
+        do_estimate(input_file, min_observations, experiment_begin,
+                    experiment_count, pipelined, board_list, adaptive_stop,
+                    max_observations, plan, history_directory)
+        return
+    if output_file is None:
+        print('Error: --output-file is required!')
+        exit(1)
+    if isfile(output_file) and not resume:
         print('Error: output file {}'.format(output_file), end=' ')
         print('already exists!')
         exit(1)
+    columnar_dir = get_columnar_dir(get_output_path(output_file))
+    if output_format != 'raw' and isdir(columnar_dir) and not resume:
+        print('Error: columnar store {}'.format(columnar_dir), end=' ')
+        print('already exists!')
+        exit(1)
+    # The journal is kept next to the output file
+    journal_file = get_output_path(output_file) + '.journal'
+    if isfile(journal_file) and not resume:
+        print('Error: journal file {}'.format(journal_file), end=' ')
+        print('already exists!')
+        exit(1)
+    if boards is not None:
+        if pipelined:
+            print('Error: --pipelined cannot be combined with --boards!')
+            exit(1)
+        board_list = read_boards(boards)
+        for board in board_list:
+            if isfile(get_board_file(output_file, board)) and not resume:
+                print('Error: output file ', end='')
+                print('{} already exists!'.format(get_board_file(output_file,
+                                                                 board)))
+                exit(1)
+    else:
+        if build_workers < 1:
+            print('Error: --build-workers must be at least 1!')
+            exit(1)
+        if build_cache_dir is not None:
+            if tftp_directory is None or not isdir(tftp_directory):
+                print('Error: the build cache needs an existing ', end='')
+                print('--tftp-directory!')
+                exit(1)
+    # Only now that the arguments are checked, the journal file is made
+    campaign_journal = Journal(journal_file)
+    if resume:
+        truncate_interrupted(campaign_journal)
+    if boards is not None:
+        do_farm_experiments(input_file, output_file, board_list,
+                            working_directory_xrtos, working_directory_circle,
+                            min_observations, experiment_begin,
+                            experiment_count, build_cache_dir,
+                            build_cache_size, adaptive_stop,
+                            adaptive_tolerance, max_observations,
+                            campaign_journal, resume, output_format,
+                            streaming_stats, incremental, plan,
+                            adaptive_watchdog, status_file, status_port)
+        campaign_journal.close()
+        return
     do_experiments(input_file, output_file, working_directory_xrtos,
                    working_directory_circle, tty_reset, tty_logging,
-                   min_observations, experiment_begin, experiment_count)
+                   min_observations, experiment_begin, experiment_count,
+                   pipelined, build_cache_dir, build_cache_size,
+                   tftp_directory, adaptive_stop, adaptive_tolerance,
+                   max_observations, campaign_journal, resume, output_format,
+                   streaming_stats, build_workers, incremental, plan,
+                   adaptive_watchdog, status_file, status_port)
+    campaign_journal.close()
 
 
 if __name__ == "__main__":
@@ -19,21 +19,9 @@ import serial
 import sys
 import scipy
 import scikits.bootstrap as bootstrap
-
-
-benchmark_list = [
-    ['linear array access',
-     'linear array write',
-     'random array access',
-     'random array write'],
-    ['malardalen bsort100',
-     'malardalen ns',
-     'malardalen matmult',
-     'fir'],
-    ['sd-vbs disparity',
-     'sd-vbs mser',
-     'sd-vbs svm',
-     'sd-vbs stitch']]
+from experiment_plan import benchmark_list, load_experiments
+from logrecord import cycle_columns
+from observationdb import ObservationDB
 
 
 logger = logging.getLogger(__name__)
@@ -109,13 +97,13 @@ def get_check_inputsize(label, inputsize=None):
 
 
 def get_experiment_labels(input_file):
-    df = pd.read_excel(input_file, skiprows=[0])
+    experiments = load_experiments(input_file)
 
     # first pass, extract all 1-core experiments that are baseline
     # to the other experiments
     exp_keys = {}
     exp_mapping = {}
-    for idx, row in df.iterrows():
+    for row in experiments:
         exp_nr = row[flds[Fields.NUMBER]]
         config_series = row[flds[Fields.CONFIG_SERIES]]
         config_bench = row[flds[Fields.CONFIG_BENCH]]
@@ -153,7 +141,7 @@ def get_experiment_labels(input_file):
             exp_keys[exp_key] = label
 
     # second pass, extract all n-core experiments that have co-runners
-    for idx, row in df.iterrows():
+    for row in experiments:
         config_series = row[flds[Fields.CONFIG_SERIES]]
         config_bench = row[flds[Fields.CONFIG_BENCH]]
 
@@ -203,13 +191,26 @@ def get_ci(data):
     return interval
 
 
-def get_experiment_data(csv_dir, csv_file_prefix):
-    df = pd.DataFrame()
-    dfs = pd.DataFrame()
+def read_cycles(csv_dir, csv_file_prefix, db=None):
+    # The cycles of each log whose name starts with csv_file_prefix, from
+    # its CSV file or from the observation database
+    if db is not None:
+        df = db.get_cycles(columns=['log'] + cycle_columns,
+                           log_prefix=csv_file_prefix)
+        for log, df_log in df.groupby('log', sort=False):
+            logger.debug(f'Read log {log} from the database')
+            yield df_log.drop(columns='log')
+        return
     infiles = glob.glob(join(csv_dir, csv_file_prefix + '*-cycles.csv'))
     for f in infiles:
         logger.debug(f'Reading input file {f}')
-        df = pd.read_csv(f)
+        yield pd.read_csv(f)
+
+
+def get_experiment_data(csv_dir, csv_file_prefix, db=None):
+    df = pd.DataFrame()
+    dfs = pd.DataFrame()
+    for df in read_cycles(csv_dir, csv_file_prefix, db):
         # Drop rows with 1 core and offset > 0
         df = df[(df['cores'] > 1) | (df['offset'] == 0)]
         # Drop rows with offset > 10
@@ -234,7 +235,32 @@ def get_experiment_data(csv_dir, csv_file_prefix):
     return dfs
 
 
-def get_experiment_results(exp_labels, exp_data, data_dir):
+def read_core0_cycles(data_dir, label, cores, config_series, config_bench,
+                      offset, db=None):
+    # The cycles of core 0 of one experiment and offset, from the data file
+    # in data_dir or from the observation database. Raises
+    # FileNotFoundError if there are none.
+    if db is not None:
+        cycles = db.get_values('cycles', 'cycles', label=label,
+                               cores=int(cores),
+                               config_series=config_series,
+                               config_benchmarks=config_bench,
+                               offset=int(offset), core=0)
+        if len(cycles) == 0:
+            raise FileNotFoundError('no cycles in the database')
+        return pd.Series(cycles)
+    infile = '{}{}-{}-'.format('cycles', 'data', label)
+    infile += 'cores{}-'.format(cores)
+    infile += 'configseries{}-'.format(config_series)
+    infile += 'configbench{}'.format(config_bench)
+    infile += '-{}{}.csv'.format('offset', offset)
+    infile = join(data_dir, infile)
+    data_df = pd.read_csv(infile, sep=' ')
+    data_df = data_df[data_df['core'] == 0]
+    return data_df['cycles']
+
+
+def get_experiment_results(exp_labels, exp_data, data_dir, db=None):
     exp_results = pd.DataFrame()
 
     # Extend the experiments dataframe with result data
@@ -274,22 +300,18 @@ def get_experiment_results(exp_labels, exp_data, data_dir):
                                                 ['core0'])]
 
                     # To obtain the confidence interval, we now have to
-                    # read a different file, containing the data instead of
-                    # the summary information we have in df_tmp (it's a pivot
-                    # table). The data file is obtained from data_dir
+                    # read the data instead of the summary information we
+                    # have in df_tmp (it's a pivot table). The data file is
+                    # obtained from data_dir, or the data from the database
                     try:
-                        infile = '{}{}-{}-'.format('cycles', 'data', label)
-                        infile += 'cores{}-'.format(cores)
-                        infile += 'configseries{}-'.format(config_series)
-                        infile += 'configbench{}'.format(config_bench)
-                        infile += '-{}{}.csv'.format('offset', offset)
-                        infile = join(data_dir, infile)
-                        data_df = pd.read_csv(infile, sep=' ')
-                        data_df = data_df[data_df['core'] == 0]
-                        conf_interval = get_ci(data_df['cycles'])
-                    except FileNotFoundError:
-                        logger.warning(f'Could not open {infile} for' +
-                                       ' computing confidence interval.')
+                        cycles = read_core0_cycles(data_dir, label, cores,
+                                                   config_series,
+                                                   config_bench, offset, db)
+                        conf_interval = get_ci(cycles)
+                    except FileNotFoundError as e:
+                        logger.warning(f'Could not read the data of {label}' +
+                                       f' offset {offset} for computing' +
+                                       f' confidence interval ({e}).')
                         conf_interval = (None, None)
 
                     # dftmp_offset now contains one row, 4 cols
@@ -355,7 +377,7 @@ def get_experiment_results(exp_labels, exp_data, data_dir):
 @click.option('--input-file',
               required=True,
               help=('Path and filename of the input Excel file containing' +
-                    ' the experiments.'))
+                    ' the experiments, or of its plan.'))
 @click.option('--output-file',
               required=True,
               help='Path and filename of the output file.')
@@ -368,8 +390,14 @@ def get_experiment_results(exp_labels, exp_data, data_dir):
 @click.option('--data-dir',
               default='report/data',
               help='Path of the directory where the data files are stored.')
+@click.option('--database',
+              default=None,
+              help=('Path and filename of the observation database (see ' +
+                    'observationdb.py), to read the data from instead ' +
+                    'of the CSV files and data files.'))
 @click_log.simple_verbosity_option(logger)
-def main(input_file, output_file, csv_dir, csv_file_prefix, data_dir):
+def main(input_file, output_file, csv_dir, csv_file_prefix, data_dir,
+         database):
     if not isfile(input_file):
         logger.error('Error: input file {} '.format(input_file) +
                      'does not exist!')
@@ -381,16 +409,26 @@ def main(input_file, output_file, csv_dir, csv_file_prefix, data_dir):
 
     # First get all labels of the experiments, mapped to their
     # corresponding single run (no co-runners) experiments.
-    logger.info('Reading experiment labels from excel file ' +
+    logger.info('Reading experiment labels from ' +
                 ' "{}".'.format(input_file))
     exp_labels = get_experiment_labels(input_file)
 
-    logger.info('Reading experiment data from CSV files found ' +
-                'in directory "{}".'.format(csv_dir))
-    exp_data = get_experiment_data(csv_dir, csv_file_prefix)
+    if database is not None:
+        if not isfile(database):
+            logger.error('Error: database {} '.format(database) +
+                         'does not exist!')
+            exit(1)
+        db = ObservationDB(database)
+        logger.info('Reading experiment data from database ' +
+                    '"{}".'.format(database))
+    else:
+        db = None
+        logger.info('Reading experiment data from CSV files found ' +
+                    'in directory "{}".'.format(csv_dir))
+    exp_data = get_experiment_data(csv_dir, csv_file_prefix, db)
 
     logger.info('Combining label mappings with experiment data...')
-    exp_results = get_experiment_results(exp_labels, exp_data, data_dir)
+    exp_results = get_experiment_results(exp_labels, exp_data, data_dir, db)
     logger.info('Writing resulting slowdown factors to CSV ' +
                 'output file "{}".'.format(output_file))
     exp_results.to_csv(output_file, index=False, sep=' ')
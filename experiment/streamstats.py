@@ -0,0 +1,181 @@
+import click_log
+import logging
+import math
+from os.path import isfile
+import time
+from blocklog import strip_log_suffix
+from logrecord import CYCLECOUNT
+
+logger = logging.getLogger(__name__)
+click_log.basic_config(logger)
+
+
+stats_columns = ['label', 'core', 'offset', 'count', 'mean', 'std', 'min',
+                 'max', 'median', 'p99']
+
+
+def get_stats_file(logfile):
+    # The statistics of output file x.log (or x.log.gz) are written to
+    # x-stats.csv
+    return strip_log_suffix(logfile) + '-stats.csv'
+
+
+class QuantileSketch:
+    # Quantile sketch with relative accuracy (as DDSketch): the values are
+    # counted in logarithmic buckets, bucket i holds the values in
+    # (gamma^(i-1), gamma^i]. A quantile estimate is within accuracy of the
+    # real value, the number of buckets is bounded by the range of the
+    # values (about 1000 for cycle counts up to 10^9 at 1%), and two
+    # sketches with the same accuracy are merged by adding the buckets.
+    def __init__(self, accuracy=0.01):
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, value):
+        self.count += 1
+        if value <= 0:
+            self.zeros += 1
+            return
+        i = math.ceil(math.log(value) / self.log_gamma)
+        self.buckets[i] = self.buckets.get(i, 0) + 1
+
+    def merge(self, other):
+        if other.accuracy != self.accuracy:
+            raise ValueError('Cannot merge sketches of different accuracy')
+        for i, n in other.buckets.items():
+            self.buckets[i] = self.buckets.get(i, 0) + n
+        self.zeros += other.zeros
+        self.count += other.count
+
+    def quantile(self, q):
+        if self.count == 0:
+            return math.nan
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for i in sorted(self.buckets):
+            seen += self.buckets[i]
+            if rank < seen:
+                # the middle of the bucket, in relative terms
+                return 2 * self.gamma ** i / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+class RunningStats:
+    # Constant memory statistics of a stream of values: Welford's mean and
+    # variance, minimum, maximum (the observed WCET) and a quantile sketch.
+    def __init__(self, accuracy=0.01):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sketch = QuantileSketch(accuracy)
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.sketch.add(value)
+
+    def merge(self, other):
+        # Chan et al.'s parallel variant of Welford's algorithm
+        count = self.count + other.count
+        if count == 0:
+            return
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+
+    def get_std(self):
+        # sample standard deviation, as pandas' std()
+        if self.count < 2:
+            return math.nan
+        return math.sqrt(self.m2 / (self.count - 1))
+
+    def get_median(self):
+        return self.sketch.quantile(0.5)
+
+    def get_p99(self):
+        return self.sketch.quantile(0.99)
+
+
+class StreamStats:
+    # Record handler for the LogProcessor that keeps RunningStats of the
+    # cycle counts per (label, core, offset) of the running experiment.
+    # Every status_interval seconds a status line with the statistics is
+    # logged. When the label changes (the next experiment has started)
+    # and at close(), the statistics of the experiment are appended to the
+    # CSV file stats_file (see stats_columns).
+    def __init__(self, stats_file, status_interval=10.0, accuracy=0.01):
+        self.stats_file = stats_file
+        self.status_interval = status_interval
+        self.accuracy = accuracy
+        self.label = None
+        # (core, offset) => RunningStats
+        self.stats = {}
+        self.last_status = time.monotonic()
+        if not isfile(stats_file):
+            with open(stats_file, 'w') as f:
+                f.write(','.join(stats_columns) + '\n')
+
+    def handle_record(self, record):
+        if record.kind != CYCLECOUNT:
+            return
+        if record.label != self.label:
+            self.write_experiment()
+            self.label = record.label
+        key = (record.core, record.offset)
+        if key not in self.stats:
+            self.stats[key] = RunningStats(self.accuracy)
+        self.stats[key].add(record.cycles)
+        now = time.monotonic()
+        if now - self.last_status >= self.status_interval:
+            self.last_status = now
+            self.log_status()
+
+    def log_status(self):
+        if self.label is None:
+            return
+        status = []
+        for (core, offset), stats in sorted(self.stats.items()):
+            status.append('core{}/offset{}: '.format(core, offset) +
+                          'n={} mean={:.0f} '.format(stats.count, stats.mean) +
+                          'median={:.0f} '.format(stats.get_median()) +
+                          'p99={:.0f} '.format(stats.get_p99()) +
+                          'max={}'.format(stats.max))
+        logger.info('{}: '.format(self.label.decode('utf-8')) +
+                    '; '.join(status))
+
+    def write_experiment(self):
+        if self.label is None or len(self.stats) == 0:
+            return
+        label = self.label.decode('utf-8')
+        with open(self.stats_file, 'a') as f:
+            for (core, offset), stats in sorted(self.stats.items()):
+                f.write('{},{},{},{},'.format(label, core, offset,
+                                              stats.count) +
+                        '{:.3f},{:.3f},'.format(stats.mean, stats.get_std()) +
+                        '{},{},'.format(stats.min, stats.max) +
+                        '{:.0f},{:.0f}\n'.format(stats.get_median(),
+                                                 stats.get_p99()))
+        self.log_status()
+        self.label = None
+        self.stats = {}
+
+    def close(self):
+        # Write the statistics of the last experiment. Call this after the
+        # LogProcessor thread has stopped.
+        self.write_experiment()
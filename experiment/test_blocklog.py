@@ -0,0 +1,126 @@
+import gzip
+from os.path import dirname, getsize, join
+import shutil
+import tempfile
+import unittest
+from blocklog import BlockLogWriter, compress_log, concatenate, \
+    get_index_file, get_labels, index_blocks, read_index, read_lines, \
+    truncate_log
+from logrecord import parse_record
+
+log_file = join(dirname(__file__), 'output',
+                'experiments_Mälardalen_bsort_xrtos_pi3-exp1_8.log')
+
+
+def get_label(line):
+    record = parse_record(line)
+    return record.label.decode('utf-8') if record is not None else None
+
+
+class BlockLogTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.logfile = join(self.tmpdir.name, 'exp.log')
+        shutil.copy(log_file, self.logfile)
+        with open(self.logfile, 'rb') as f:
+            self.lines = f.readlines()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def get_lines(self, labels):
+        # The lines of the raw log of the experiments with labels, with the
+        # lines without record that follow them
+        lines = []
+        label = None
+        for line in self.lines:
+            label = get_label(line) or label
+            if label in labels:
+                lines.append(line)
+        return lines
+
+    def test_roundtrip(self):
+        block_log = compress_log(self.logfile)
+        self.assertEqual(block_log, self.logfile + '.gz')
+        # zcat gives the raw log
+        with gzip.open(block_log, 'rb') as f:
+            self.assertEqual(f.read(), b''.join(self.lines))
+        self.assertEqual(list(read_lines(block_log)), self.lines)
+        self.assertEqual(list(read_lines(self.logfile)), self.lines)
+        entries = read_index(block_log)
+        self.assertEqual(sum(entry['lines'] for entry in entries),
+                         len(self.lines))
+        self.assertEqual(index_blocks(block_log), entries)
+
+    def test_index_lookup(self):
+        block_log = compress_log(self.logfile)
+        labels = get_labels(block_log)
+        expected = []
+        for line in self.lines:
+            label = get_label(line)
+            if label is not None and label not in expected:
+                expected.append(label)
+        self.assertEqual(labels, expected)
+        for label in [labels[0], labels[3], labels[-1]]:
+            self.assertEqual(list(read_lines(block_log, [label])),
+                             self.get_lines([label]))
+        self.assertEqual(list(read_lines(block_log, labels[1:3])),
+                         self.get_lines(labels[1:3]))
+        self.assertEqual(list(read_lines(block_log, ['UNKNOWN'])), [])
+
+    def test_writer(self):
+        block_log = self.logfile + '.gz'
+        writer = BlockLogWriter(block_log, block_size=1000)
+        half = len(self.lines) // 2
+        for line in self.lines[:half]:
+            writer.write(memoryview(line), b'A')
+        writer.close()
+        # Continued, e.g. when a campaign is resumed
+        writer = BlockLogWriter(block_log, append=True, block_size=1000)
+        for line in self.lines[half:]:
+            writer.write(line, b'B')
+        writer.close()
+        entries = read_index(block_log)
+        self.assertTrue(all(entry['size'] < 1000 for entry in entries))
+        self.assertEqual(list(read_lines(block_log)), self.lines)
+        self.assertEqual(list(read_lines(block_log, ['B'])),
+                         self.lines[half:])
+
+    def test_incomplete_index(self):
+        block_log = compress_log(self.logfile)
+        index_file = get_index_file(block_log)
+        with open(index_file) as f:
+            index = f.readlines()
+        with open(index_file, 'w') as f:
+            f.writelines(index[:-1])
+        self.assertIsNone(read_index(block_log))
+        self.assertIsNone(get_labels(block_log))
+        # All blocks are read
+        self.assertEqual(list(read_lines(block_log, ['UNKNOWN'])),
+                         self.lines)
+
+    def test_truncate(self):
+        block_log = compress_log(self.logfile)
+        entries = read_index(block_log)
+        offset = entries[3]['offset']
+        truncate_log(block_log, offset)
+        self.assertEqual(getsize(block_log), offset)
+        self.assertEqual(read_index(block_log), entries[:3])
+        lines = sum(entry['lines'] for entry in entries[:3])
+        self.assertEqual(list(read_lines(block_log)), self.lines[:lines])
+        # Without index
+        truncate_log(self.logfile, 100)
+        self.assertEqual(getsize(self.logfile), 100)
+
+    def test_concatenate(self):
+        block_log = compress_log(self.logfile)
+        output_file = join(self.tmpdir.name, 'all.log.gz')
+        concatenate([block_log, block_log], output_file)
+        self.assertEqual(list(read_lines(output_file)), self.lines * 2)
+        label = get_labels(block_log)[2]
+        self.assertEqual(list(read_lines(output_file, [label])),
+                         self.get_lines([label]) * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
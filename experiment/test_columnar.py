@@ -0,0 +1,91 @@
+import glob
+from os.path import dirname, join
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+import log2csv
+from columnar import ColumnarWriter, get_columnar_dir, read_table, \
+    truncate_store
+from logrecord import parse_record
+
+log_name = 'experiments_Mälardalen_bsort_xrtos_pi3-exp1_8'
+log_file = join(dirname(__file__), 'output', log_name + '.log')
+
+
+class ColumnarTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        with open(log_file, 'rb') as f:
+            records = [parse_record(line) for line in f]
+        self.records = [record for record in records if record is not None]
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_store(self, records, directory, prefix='', chunk_size=100):
+        writer = ColumnarWriter(directory, prefix, chunk_size)
+        for record in records:
+            writer.handle_record(record)
+        writer.close()
+
+    def test_csv_compatible(self):
+        # The same tables as the CSV files of log2csv.py
+        logfile = join(self.tmpdir.name, log_name + '.log')
+        shutil.copy(log_file, logfile)
+        log2csv.convert(logfile)
+        directory = get_columnar_dir(logfile + '.gz')
+        self.assertEqual(directory, join(self.tmpdir.name,
+                                         log_name + '.columnar'))
+        self.write_store(self.records, directory)
+        for table in ['cycles', 'events']:
+            csv_file = join(self.tmpdir.name,
+                            '{}-{}.csv'.format(log_name, table))
+            pd.testing.assert_frame_equal(
+                read_table(directory, table, csv_compatible=True),
+                pd.read_csv(csv_file))
+
+    def test_chunks(self):
+        directory = join(self.tmpdir.name, 'store')
+        self.write_store(self.records, directory, 'board0-', chunk_size=250)
+        cycles = sum(1 for record in self.records if record.cycles)
+        events = len(self.records) - cycles
+        self.assertEqual(
+            len(glob.glob(join(directory, 'board0-cycles-*.npz'))),
+            (cycles + 249) // 250)
+        self.assertEqual(
+            len(glob.glob(join(directory, 'board0-events-*.npz'))),
+            (events + 249) // 250)
+        self.assertEqual(len(read_table(directory, 'cycles')), cycles)
+        events_df = read_table(directory, 'events')
+        self.assertEqual(len(events_df), events)
+        self.assertEqual(events_df['eventtype'].dtype, 'int64')
+        self.assertEqual(len(read_table(join(self.tmpdir.name, 'empty'),
+                                        'cycles')), 0)
+
+    def test_resume(self):
+        # Interrupted in the second half of the records, then resumed from
+        # the position at the start of the second half
+        directory = join(self.tmpdir.name, 'store')
+        half = len(self.records) // 2
+        writer = ColumnarWriter(directory, 'board0-', chunk_size=100)
+        for record in self.records[:half]:
+            writer.handle_record(record)
+        _, prefix, chunks = writer.get_position()
+        for record in self.records[half:half + 500]:
+            writer.handle_record(record)
+        writer.close()
+        # The chunks of another board are kept
+        self.write_store(self.records[:10], directory, 'board1-')
+        truncate_store(directory, prefix, chunks)
+        self.write_store(self.records[half:], directory, prefix)
+        expected = join(self.tmpdir.name, 'expected')
+        self.write_store(self.records, expected, 'board0-')
+        self.write_store(self.records[:10], expected, 'board1-')
+        for table in ['cycles', 'events']:
+            pd.testing.assert_frame_equal(read_table(directory, table),
+                                          read_table(expected, table))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+import numpy as np
+from convergence import ConvergenceMonitor
+from logrecord import CYCLECOUNT, EVENTCOUNT, Record
+
+
+def cycle_record(cycles, iteration, core=0, label=b'A'):
+    return Record(CYCLECOUNT, label, b"'1'", b"'1'", b'bench', 1, core,
+                  cycles, None, None, None, iteration, 0)
+
+
+class ConvergenceMonitorTest(unittest.TestCase):
+    def test_moments(self):
+        # Welford's running mean and variance are numpy's
+        rng = np.random.default_rng(1)
+        cycles = rng.integers(10**6, 10**9, 5000)
+        monitor = ConvergenceMonitor()
+        for i, c in enumerate(cycles):
+            monitor.handle_record(cycle_record(int(c), i + 1))
+        count, mean, m2 = monitor.moments[0]
+        self.assertEqual(count, len(cycles))
+        self.assertAlmostEqual(mean / np.mean(cycles), 1.0, places=12)
+        self.assertAlmostEqual(m2 / (count - 1) / np.var(cycles, ddof=1),
+                               1.0, places=9)
+        self.assertAlmostEqual(monitor.get_normal_halfwidth(0),
+                               1.96 * np.std(cycles, ddof=1) /
+                               np.sqrt(len(cycles)), delta=1e-6 * mean)
+
+    def test_reset(self):
+        monitor = ConvergenceMonitor()
+        monitor.handle_record(cycle_record(100, 1))
+        monitor.handle_record(cycle_record(200, 2))
+        monitor.handle_record(cycle_record(300, 2, core=1))
+        # Event counts are ignored
+        monitor.handle_record(Record(EVENTCOUNT, b'A', b"'1'", b"'1'", None,
+                                     1, 0, None, 1, 0x16, 26, 3, 0))
+        self.assertEqual(monitor.moments, {0: [2, 150.0, 5000.0],
+                                           1: [1, 300.0, 0.0]})
+        # The experiment restarted
+        monitor.handle_record(cycle_record(400, 1))
+        self.assertEqual(monitor.cycles, {0: [400]})
+        # The next experiment
+        monitor.handle_record(cycle_record(500, 2, label=b'B'))
+        self.assertEqual(monitor.label, b'B')
+        self.assertEqual(monitor.moments, {0: [1, 500.0, 0.0]})
+
+    def test_limits(self):
+        monitor = ConvergenceMonitor(min_observations=10,
+                                     max_observations=20, check_interval=1)
+        monitor.set_limits('B', max_observations=50)
+        for i in range(1, 31):
+            monitor.handle_record(cycle_record(1000 + i % 7 * 500, i))
+        self.assertFalse(monitor.is_converged(10))
+        self.assertTrue(monitor.is_converged(20))
+        monitor.reset(b'B')
+        monitor.handle_record(cycle_record(1000, 1, label=b'B'))
+        self.assertFalse(monitor.is_converged(10))
+        self.assertTrue(monitor.is_converged(50))
+
+    def test_ci(self):
+        rng = np.random.default_rng(2)
+        monitor = ConvergenceMonitor(tolerance=0.01, min_observations=10,
+                                     max_observations=10**6,
+                                     check_interval=1)
+        monitor.rng = np.random.default_rng(3)
+        # The mean of a 10% spread is known within 1% after about
+        # (1.96 * 0.1 / 0.01)^2 = 384 observations
+        for i in range(1, 101):
+            monitor.handle_record(
+                cycle_record(int(rng.normal(10**6, 10**5)), i))
+        self.assertFalse(monitor.is_converged(100))
+        for i in range(101, 1001):
+            monitor.handle_record(
+                cycle_record(int(rng.normal(10**6, 10**5)), i))
+        self.assertTrue(monitor.is_converged(1000))
+
+    def test_max(self):
+        monitor = ConvergenceMonitor(criterion='max', tolerance=0.05,
+                                     min_observations=10,
+                                     max_observations=1000, check_interval=1)
+        for i in range(1, 101):
+            monitor.handle_record(cycle_record(1000 + i % 10, i))
+        # The maximum has not been checked before
+        self.assertFalse(monitor.is_converged(100))
+        self.assertTrue(monitor.is_converged(101))
+        # A new maximum far above the high quantile
+        monitor.handle_record(cycle_record(5000, 101))
+        self.assertFalse(monitor.is_converged(102))
+        self.assertFalse(monitor.is_converged(103))
+
+    def test_unknown_criterion(self):
+        with self.assertRaises(ValueError):
+            ConvergenceMonitor(criterion='mean')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+import os
+from os.path import join
+import tempfile
+import unittest
+import pandas as pd
+import experiment_plan
+from experiment_plan import compile_plan, get_plan_file, get_problems, \
+    load_experiments, read_plan, validity_checks, write_plan
+
+
+def get_row(number, series="'2'", bench="'1'", inputsize=100, **values):
+    cores = len(series.strip("'"))
+    row = {'experiment number': number,
+           'platform': 'xrtos',
+           'raspberrypi': 3,
+           'benchmark series': series,
+           'benchmark configuration': bench,
+           'enable mmu': 1,
+           'enable screen': 1,
+           'no cache management': 0,
+           'experiment label': 'BENCH_CORES{}_INPUTSIZE{}'.format(
+               cores, inputsize),
+           'pmu core 0': "'5689'",
+           'pmu core 1': None,
+           'pmu core 2': None,
+           'pmu core 3': None,
+           'input size core0': inputsize,
+           'input size core1': 0,
+           'input size core2': 0,
+           'input size core3': 0,
+           'delay step countdown': 654,
+           'measured wcet baseline': 58929,
+           'cycles per step': 5892.5,
+           'cycles per count': 9}
+    row.update(values)
+    return row
+
+
+def get_messages(problems):
+    # message => the row positions it applies to
+    return {message: mask[mask].index.tolist()
+            for mask, message in problems if mask.any()}
+
+
+class ExperimentPlanTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.xlsx_file = join(self.tmpdir.name, 'experiments.xlsx')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_spreadsheet(self, rows):
+        # The first row of a spreadsheet is documentation
+        df = pd.DataFrame(rows)
+        df.to_excel(self.xlsx_file, index=False, startrow=1)
+
+    def test_compile(self):
+        self.write_spreadsheet([get_row(1),
+                                get_row(2, "'22'", "'11'",
+                                        **{'pmu core 1': "'56'",
+                                           'min observations': 200})])
+        plan = compile_plan(self.xlsx_file)
+        self.assertEqual(plan['version'], experiment_plan.plan_version)
+        self.assertEqual(plan['source'], 'experiments.xlsx')
+        rows = [experiment['row'] for experiment in plan['experiments']]
+        self.assertEqual(rows[0]['experiment number'], 1)
+        self.assertEqual(rows[0]['benchmark series'], '2')
+        self.assertEqual(rows[1]['benchmark series'], '22')
+        self.assertEqual(rows[0]['pmu core 0'], '5689')
+        self.assertIsNone(rows[0]['pmu core 1'])
+        self.assertEqual(rows[1]['pmu core 1'], '56')
+        self.assertIs(rows[0]['enable mmu'], True)
+        self.assertIs(rows[0]['no cache management'], False)
+        self.assertEqual(rows[0]['measured wcet baseline'], 58929)
+        self.assertEqual(rows[0]['cycles per step'], 5892.5)
+        # Optional columns that are not in the spreadsheet are None
+        self.assertIsNone(rows[0]['synbench repeat'])
+        self.assertIsNone(rows[0]['min observations'])
+        self.assertEqual(rows[1]['min observations'], 200)
+        # A hash per row, compiling again gives the same plan
+        self.assertNotEqual(plan['experiments'][0]['hash'],
+                            plan['experiments'][1]['hash'])
+        self.assertEqual(compile_plan(self.xlsx_file), plan)
+
+    def test_load(self):
+        self.write_spreadsheet([get_row(1)])
+        plan_file = get_plan_file(self.xlsx_file)
+        self.assertEqual(plan_file, join(self.tmpdir.name,
+                                         'experiments.plan.json'))
+        plan = compile_plan(self.xlsx_file)
+        write_plan(plan, plan_file)
+        self.assertEqual(read_plan(plan_file), plan)
+        self.assertEqual(load_experiments(self.xlsx_file),
+                         [plan['experiments'][0]['row']])
+        # An out of date plan is not used
+        self.write_spreadsheet([get_row(1), get_row(2)])
+        self.assertEqual(len(load_experiments(self.xlsx_file)), 2)
+        self.assertEqual(len(load_experiments(plan_file)), 1)
+        plan['version'] += 1
+        write_plan(plan, plan_file)
+        with self.assertRaises(ValueError):
+            read_plan(plan_file)
+
+    def test_problems(self):
+        df = pd.DataFrame([
+            get_row(1),
+            get_row(2, "'22'", "'11'"),
+            # no baseline with input size 500 (the baseline is found by
+            # the benchmark of core 0)
+            get_row(3, "'22'", "'11'", inputsize=500),
+            get_row(4, "'22'", "'1'"),
+            get_row(5, "'25'", "'19'"),
+            get_row(6, "'22222'", "'11111'"),
+            get_row(7, **{'pmu core 1': "'5'", 'raspberrypi': 5}),
+            get_row(7, **{'platform': 'linux',
+                          'experiment label': 'BENCH'}),
+            get_row(9, **{'pmu core 0': "'12345'",
+                          'input size core2': None})])
+        errors, warnings = get_problems(df)
+        self.assertEqual(get_messages(errors), {
+            'benchmark series and benchmark configuration have different '
+            'lengths': [3],
+            'benchmark series must be 1 to 4 digits': [5],
+            'benchmark series digits must be 1 to 3': [4],
+            'benchmark configuration digits must be 1 to 4': [4],
+            'raspberrypi must be one of [3, 4]': [6],
+            "platform must be one of ['xrtos', 'circle']": [7],
+            'pmu core 0 must be at most 4 event codes (0 to 9)': [8],
+            'input size core2 is missing': [8]})
+        self.assertEqual(get_messages(warnings), {
+            'pmu core 1 is set, but core 1 does not run a benchmark': [6],
+            'experiment number is used more than once': [6, 7],
+            'experiment label does not end with _INPUTSIZE and the input '
+            'size of core 0': [7],
+            'there is no 1-core baseline experiment with the same '
+            'benchmark, platform settings and input size': [2]})
+        with self.assertRaises(ValueError):
+            validity_checks(df)
+        # Warnings only
+        validity_checks(df.iloc[[0, 1, 2]])
+
+    def test_missing_column(self):
+        row = get_row(1)
+        del row['delay step countdown']
+        self.write_spreadsheet([row])
+        with self.assertRaises(ValueError):
+            compile_plan(self.xlsx_file)
+
+    def test_empty_value(self):
+        self.write_spreadsheet([get_row(1, **{'delay step countdown': None})])
+        with self.assertRaises(ValueError):
+            compile_plan(self.xlsx_file)
+        self.write_spreadsheet([get_row(1, **{'delay step countdown': 1.5})])
+        with self.assertRaises(ValueError):
+            compile_plan(self.xlsx_file)
+        self.assertFalse(os.path.isfile(get_plan_file(self.xlsx_file)))
+
+
+if __name__ == '__main__':
+    unittest.main()
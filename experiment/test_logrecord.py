@@ -0,0 +1,154 @@
+from os.path import dirname, join
+import random
+import unittest
+from logrecord import CYCLECOUNT, EVENTCOUNT, parse_record
+from run_experiments import LogProcessor
+
+cycle_line = (b"INFO: core0(): CYCLECOUNT label: XRTOS_PI3_A "
+              b"config_series: '2' config_benchmarks: '1' "
+              b"benchmark: malardalen_bsort100 cores: 1 core: 0 "
+              b"cycle_count:        57337 iteration: 1 offset: 0\n")
+event_line = (b"INFO: core0(): EVENTCOUNT label: XRTOS_PI3_A "
+              b"config_series: '2' config_benchmarks: '1' cores: 1 core: 0 "
+              b"pmu: 1 event_number: 0x16 event_count: 26 iteration: 1 "
+              b"offset: 0\n")
+circle_line = (b"00:01:02.50 CoRunners: CYCLECOUNT label: CIRCLE_PI4_B "
+               b"config_series: '21' config_benchmarks: '11' "
+               b"benchmark: sdvbs_disparity cores: 2 core: 1 "
+               b"cycle_count: 123456789 iteration: 12 offset: 3\n")
+log_file = join(dirname(__file__), 'output',
+                'experiments_Mälardalen_bsort_xrtos_pi3-exp1_8.log')
+
+
+class ParseRecordTest(unittest.TestCase):
+    def test_cycle_record(self):
+        record = parse_record(cycle_line)
+        self.assertEqual(record.kind, CYCLECOUNT)
+        self.assertEqual(record.label, b'XRTOS_PI3_A')
+        self.assertEqual(record.config_series, b"'2'")
+        self.assertEqual(record.config_benchmarks, b"'1'")
+        self.assertEqual(record.benchmark, b'malardalen_bsort100')
+        self.assertEqual((record.cores, record.core, record.cycles,
+                          record.iteration, record.offset),
+                         (1, 0, 57337, 1, 0))
+        self.assertIsNone(record.pmu)
+
+    def test_event_record(self):
+        record = parse_record(event_line)
+        self.assertEqual(record.kind, EVENTCOUNT)
+        self.assertIsNone(record.benchmark)
+        self.assertIsNone(record.cycles)
+        self.assertEqual((record.pmu, record.event_number,
+                          record.event_count), (1, 0x16, 26))
+
+    def test_circle_prefix(self):
+        record = parse_record(circle_line)
+        self.assertEqual(record.label, b'CIRCLE_PI4_B')
+        self.assertEqual((record.cores, record.core, record.cycles,
+                          record.iteration, record.offset),
+                         (2, 1, 123456789, 12, 3))
+
+    def test_mixed_up_fields(self):
+        # A cycle count without benchmark, an event count with one
+        self.assertIsNone(parse_record(
+            cycle_line.replace(b'benchmark: malardalen_bsort100 ', b'')))
+        self.assertIsNone(parse_record(
+            event_line.replace(b'cores:', b'benchmark: x cores:')))
+        self.assertIsNone(parse_record(b'booting...\n'))
+
+    def test_partial_line(self):
+        # Cut anywhere before the offset, a line has no record
+        end = cycle_line.index(b'offset: ') + len(b'offset: ')
+        for n in range(end):
+            self.assertIsNone(parse_record(cycle_line[:n]))
+
+    def test_in_place(self):
+        # Only data[pos:endpos] is parsed
+        data = bytearray(event_line + cycle_line + event_line)
+        view = memoryview(data)
+        pos = len(event_line)
+        endpos = pos + len(cycle_line)
+        self.assertEqual(parse_record(view, pos, endpos),
+                         parse_record(cycle_line))
+        self.assertIsNone(parse_record(data, pos, endpos - 3))
+
+
+class FakeSerial:
+    # Hands out the given chunks of bytes, a chunk may be read in parts
+    def __init__(self, chunks):
+        self.chunks = [bytes(chunk) for chunk in chunks]
+
+    @property
+    def in_waiting(self):
+        return len(self.chunks[0]) if self.chunks else 0
+
+    def readinto(self, view):
+        if not self.chunks:
+            return 0
+        chunk = self.chunks.pop(0)
+        n = min(len(view), len(chunk))
+        view[:n] = chunk[:n]
+        if n < len(chunk):
+            self.chunks.insert(0, chunk[n:])
+        return n
+
+
+class LogProcessorTest(unittest.TestCase):
+    def read(self, chunks, buffer_size=None):
+        log_processor = LogProcessor('/dev/null', 'unused.log',
+                                     write_log=False)
+        if buffer_size is not None:
+            log_processor.buffer = bytearray(buffer_size)
+            log_processor.view = memoryview(log_processor.buffer)
+        records = []
+        log_processor.add_record_handler(records.append)
+        log_processor.serial = FakeSerial(chunks)
+        while log_processor.serial.chunks:
+            log_processor.read_frames()
+        return log_processor, records
+
+    def test_split_lines(self):
+        # A line split over several reads is parsed once it is complete
+        data = cycle_line + event_line
+        for cut in range(1, len(data)):
+            log_processor, records = self.read([data[:cut], data[cut:]])
+            self.assertEqual(records, [parse_record(cycle_line),
+                                       parse_record(event_line)])
+            self.assertEqual(log_processor.fill, 0)
+
+    def test_partial_read(self):
+        log_processor, records = self.read([cycle_line,
+                                            event_line[:-10]])
+        self.assertEqual(records, [parse_record(cycle_line)])
+        # The incomplete line waits at the front of the buffer
+        self.assertEqual(bytes(log_processor.buffer[:log_processor.fill]),
+                         event_line[:-10])
+
+    def test_log(self):
+        with open(log_file, 'rb') as f:
+            data = f.read()
+        expected = [parse_record(line) for line in data.splitlines(True)]
+        expected = [record for record in expected if record is not None]
+        # Random reads through a small buffer
+        rng = random.Random(1)
+        chunks = []
+        pos = 0
+        while pos < len(data):
+            n = rng.randint(1, 700)
+            chunks.append(data[pos:pos + n])
+            pos += n
+        log_processor, records = self.read(chunks, buffer_size=1024)
+        self.assertEqual(records, expected)
+        self.assertEqual(log_processor.records, len(expected))
+
+    def test_line_too_long(self):
+        # A buffer full without line ending is discarded, reading goes on
+        # with the next line
+        log_processor, records = self.read(
+            [b'x' * 200 + cycle_line + event_line], buffer_size=256)
+        self.assertEqual(records, [parse_record(event_line)])
+        self.assertEqual(log_processor.no_matches, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
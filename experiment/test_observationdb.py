@@ -0,0 +1,139 @@
+import os
+from os.path import join
+import tempfile
+import unittest
+from observationdb import ObservationDB
+
+
+def cycle_line(label, cycles, iteration, core=0, cores=1,
+               config_series="'1'", config_benchmarks="'1'"):
+    return ('INFO: core0(): CYCLECOUNT label: {} '.format(label) +
+            'config_series: {} '.format(config_series) +
+            'config_benchmarks: {} '.format(config_benchmarks) +
+            'benchmark: malardalen_bsort100 ' +
+            'cores: {} core: {} '.format(cores, core) +
+            'cycle_count:        {} '.format(cycles) +
+            'iteration: {} offset: 0\n'.format(iteration))
+
+
+def event_line(label, count, iteration):
+    return ('INFO: core0(): EVENTCOUNT label: {} '.format(label) +
+            "config_series: '1' config_benchmarks: '1' cores: 1 core: 0 " +
+            'pmu: 1 event_number: 0x16 event_count: {} '.format(count) +
+            'iteration: {} offset: 0\n'.format(iteration))
+
+
+class ObservationDBTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.logdir = join(self.tmpdir.name, 'output')
+        os.makedirs(self.logdir)
+        self.db = ObservationDB(join(self.tmpdir.name, 'observations.db'))
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def write_log(self, name, lines, mtime=None):
+        log_file = join(self.logdir, name)
+        with open(log_file, 'w') as f:
+            f.writelines(lines)
+        if mtime is not None:
+            os.utime(log_file, (mtime, mtime))
+        return log_file
+
+    def test_import(self):
+        log_file = self.write_log('a.log', [
+            'booting\n',
+            cycle_line('A_1', 100, 1),
+            event_line('A_1', 26, 1),
+            cycle_line('A_1', 110, 2),
+            event_line('A_1', 27, 2)])
+        self.assertEqual(self.db.update([log_file]), [log_file])
+        df = self.db.get_cycles(columns=['log', 'label', 'config_series',
+                                         'benchmark', 'cycles'])
+        self.assertEqual(df['log'].tolist(), ['a', 'a'])
+        self.assertEqual(df['label'].tolist(), ['A_1', 'A_1'])
+        self.assertEqual(df['config_series'].tolist(), ["'1'", "'1'"])
+        self.assertEqual(df['benchmark'].tolist(), ['malardalenbsort100'] * 2)
+        self.assertEqual(df['cycles'].tolist(), [100, 110])
+        events = self.db.get_events()
+        self.assertEqual(events['eventtype'].tolist(), [0x16, 0x16])
+        self.assertEqual(events['eventcount'].tolist(), [26, 27])
+        # Not imported again while it has not changed
+        self.assertEqual(self.db.update([log_file]), [])
+
+    def test_config_quoting(self):
+        # Stored with quotes, also when the log has them without
+        log_file = self.write_log('a.log', [
+            cycle_line('A', 100, 1, config_series="'21'",
+                       config_benchmarks="'11'", cores=2),
+            cycle_line('B', 200, 1, config_series='21',
+                       config_benchmarks='11', cores=2)])
+        self.db.update([log_file])
+        df = self.db.get_cycles(columns=['config_series',
+                                         'config_benchmarks'])
+        self.assertEqual(df['config_series'].tolist(), ["'21'", "'21'"])
+        self.assertEqual(df['config_benchmarks'].tolist(), ["'11'", "'11'"])
+        # A filter with or without quotes
+        for config_series in ['21', "'21'", ['21'], ["'21'"]]:
+            cycles = self.db.get_values('cycles', 'cycles',
+                                        config_series=config_series,
+                                        config_benchmarks='11')
+            self.assertEqual(cycles.tolist(), [100, 200])
+
+    def test_reimport(self):
+        log_file = self.write_log('a.log', [cycle_line('A', 100, 1)],
+                                  mtime=1000)
+        self.db.update([log_file])
+        self.write_log('a.log', [cycle_line('A', 100, 1),
+                                 cycle_line('A', 120, 2)], mtime=2000)
+        self.assertEqual(self.db.update([log_file]), [log_file])
+        # The rows of the first import are replaced
+        self.assertEqual(self.db.get_values('cycles', 'cycles').tolist(),
+                         [100, 120])
+        self.assertEqual(self.db.connection.execute(
+            'SELECT COUNT(*) FROM logs').fetchone()[0], 1)
+
+    def test_prune(self):
+        a = self.write_log('a.log', [cycle_line('A', 100, 1)])
+        b = self.write_log('b.log', [cycle_line('B', 200, 1)])
+        c = self.write_log('c.log', [cycle_line('C', 300, 1)])
+        self.db.update([a, b, c], self.logdir)
+        # a is deleted, b is no longer an input log of the directory
+        os.remove(a)
+        self.db.update([c], self.logdir)
+        self.assertEqual(self.db.get_labels(), ['C'])
+        self.assertEqual(self.db.connection.execute(
+            'SELECT COUNT(*) FROM logs').fetchone()[0], 1)
+        # A log outside the directory is kept
+        outside = join(self.tmpdir.name, 'd.log')
+        with open(outside, 'w') as f:
+            f.write(cycle_line('D', 400, 1))
+        self.db.update([outside])
+        self.db.update([c], self.logdir)
+        self.assertEqual(self.db.get_labels(), ['C', 'D'])
+
+    def test_like_escaping(self):
+        log_file = self.write_log('x_1.log', [
+            cycle_line('PI3_A', 1, 1),
+            cycle_line('PI3xA', 2, 1),
+            cycle_line('PI3%B', 3, 1)])
+        other = self.write_log('xy1.log', [cycle_line('PI3_C', 4, 1)])
+        self.db.update([log_file, other])
+        # _ and % in a prefix are no wildcards
+        self.assertEqual(self.db.get_labels(label_prefix='PI3_'),
+                         ['PI3_A', 'PI3_C'])
+        self.assertEqual(self.db.get_labels(label_prefix='PI3%'), ['PI3%B'])
+        self.assertEqual(self.db.get_labels(log_prefix='x_'),
+                         ['PI3%B', 'PI3_A', 'PI3xA'])
+        self.assertEqual(self.db.get_labels(log_prefix='x_',
+                                            label_prefix='PI3_'), ['PI3_A'])
+
+    def test_unknown_column(self):
+        with self.assertRaises(ValueError):
+            self.db.get_values('cycles', 'cycles', name='a')
+
+
+if __name__ == '__main__':
+    unittest.main()
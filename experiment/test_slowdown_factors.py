@@ -0,0 +1,73 @@
+import os
+from os.path import dirname, join
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import pandas as pd
+import log2csv
+import log2data_and_summaries
+from observationdb import ObservationDB
+try:
+    import slowdown_factors
+except ImportError:
+    # e.g. scikits.bootstrap is not installed
+    slowdown_factors = None
+
+experiment_dir = dirname(__file__)
+xlsx_file = join(experiment_dir, 'xlsx',
+                 'experiments_Mälardalen_bsort_xrtos_pi3.xlsx')
+log_name = 'experiments_Mälardalen_bsort_xrtos_pi3-exp1_8'
+log_prefix = 'experiments_Mälardalen_bsort'
+
+
+def get_interval(data):
+    # Instead of the bootstrap, which draws random samples
+    return min(data), max(data)
+
+
+@unittest.skipIf(slowdown_factors is None,
+                 'the slowdown_factors.py dependencies are not installed')
+class SlowdownFactorsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.csv_dir = join(self.tmpdir.name, 'output')
+        self.data_dir = join(self.tmpdir.name, 'data')
+        os.makedirs(self.csv_dir)
+        os.makedirs(self.data_dir)
+        log_file = join(self.csv_dir, log_name + '.log')
+        shutil.copy(join(experiment_dir, 'output', log_name + '.log'),
+                    log_file)
+        # The CSV path: log2csv.py and the data files of
+        # log2data_and_summaries.py, as made by the Makefile
+        log2csv.convert(log_file)
+        log2data_and_summaries.process_input(
+            join(self.csv_dir, log_name + '-cycles.csv'),
+            log2data_and_summaries.get_outputs(['data'], ['cycles']),
+            self.data_dir)
+        self.db = ObservationDB(join(self.tmpdir.name, 'observations.db'))
+        self.db.update([log_file])
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def get_results(self, db):
+        exp_labels = slowdown_factors.get_experiment_labels(xlsx_file)
+        exp_data = slowdown_factors.get_experiment_data(self.csv_dir,
+                                                        log_prefix, db)
+        with mock.patch.object(slowdown_factors, 'get_ci', get_interval):
+            return slowdown_factors.get_experiment_results(
+                exp_labels, exp_data, self.data_dir, db)
+
+    def test_database_and_csv(self):
+        csv_results = self.get_results(None)
+        db_results = self.get_results(self.db)
+        self.assertEqual(len(csv_results), 10)
+        # The core 0 cycles of each experiment are found
+        self.assertFalse(csv_results['confidence_lo'].isnull().any())
+        pd.testing.assert_frame_equal(csv_results, db_results)
+
+
+if __name__ == '__main__':
+    unittest.main()
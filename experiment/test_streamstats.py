@@ -0,0 +1,110 @@
+from os.path import join
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from logrecord import CYCLECOUNT, Record
+from streamstats import QuantileSketch, RunningStats, StreamStats, \
+    get_stats_file, stats_columns
+
+
+def cycle_record(cycles, iteration, core=0, offset=0, label=b'A'):
+    return Record(CYCLECOUNT, label, b"'1'", b"'1'", b'bench', 1, core,
+                  cycles, None, None, None, iteration, offset)
+
+
+class QuantileSketchTest(unittest.TestCase):
+    def test_accuracy(self):
+        rng = np.random.default_rng(1)
+        values = np.concatenate([rng.lognormal(13, 0.5, 20000),
+                                 rng.integers(10**5, 10**9, 1000)])
+        for accuracy in [0.01, 0.05]:
+            sketch = QuantileSketch(accuracy)
+            for value in values:
+                sketch.add(value)
+            for q in [0, 0.01, 0.25, 0.5, 0.9, 0.99, 0.999, 1]:
+                expected = np.quantile(values, q, method='lower')
+                self.assertLessEqual(
+                    abs(sketch.quantile(q) - expected) / expected,
+                    accuracy * (1 + 1e-9))
+
+    def test_merge(self):
+        rng = np.random.default_rng(2)
+        values = rng.integers(1, 10**6, 1000)
+        whole = QuantileSketch()
+        parts = [QuantileSketch(), QuantileSketch()]
+        for i, value in enumerate(values):
+            whole.add(value)
+            parts[i % 2].add(value)
+        parts[0].merge(parts[1])
+        self.assertEqual(parts[0].buckets, whole.buckets)
+        self.assertEqual(parts[0].count, whole.count)
+        with self.assertRaises(ValueError):
+            parts[0].merge(QuantileSketch(0.02))
+
+    def test_zeros(self):
+        sketch = QuantileSketch()
+        self.assertTrue(np.isnan(sketch.quantile(0.5)))
+        for value in [0, 0, 0, 100]:
+            sketch.add(value)
+        self.assertEqual(sketch.quantile(0.5), 0.0)
+        self.assertAlmostEqual(sketch.quantile(1), 100, delta=1)
+
+
+class RunningStatsTest(unittest.TestCase):
+    def test_against_numpy(self):
+        rng = np.random.default_rng(3)
+        values = rng.integers(10**6, 10**9, 3000)
+        stats = RunningStats()
+        parts = [RunningStats(), RunningStats(), RunningStats()]
+        for i, value in enumerate(values):
+            stats.add(int(value))
+            parts[i * 3 // len(values)].add(int(value))
+        parts[0].merge(parts[1])
+        parts[0].merge(parts[2])
+        parts[0].merge(RunningStats())
+        for s in [stats, parts[0]]:
+            self.assertEqual(s.count, len(values))
+            self.assertAlmostEqual(s.mean / np.mean(values), 1, places=12)
+            self.assertAlmostEqual(s.get_std() / np.std(values, ddof=1), 1,
+                                   places=9)
+            self.assertEqual((s.min, s.max), (values.min(), values.max()))
+            median = np.quantile(values, 0.5, method='lower')
+            self.assertLessEqual(abs(s.get_median() - median) / median,
+                                 0.01)
+
+
+class StreamStatsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_stats_file(self):
+        logfile = join(self.tmpdir.name, 'exp.log.gz')
+        stats_file = get_stats_file(logfile)
+        self.assertEqual(stats_file, join(self.tmpdir.name, 'exp-stats.csv'))
+        stream_stats = StreamStats(stats_file)
+        for i in range(1, 11):
+            stream_stats.handle_record(cycle_record(1000 + i, i))
+            stream_stats.handle_record(cycle_record(2000 + i, i, core=1))
+            stream_stats.handle_record(cycle_record(3000 + i, i, offset=1))
+        # The next experiment
+        stream_stats.handle_record(cycle_record(50, 1, label=b'B'))
+        stream_stats.close()
+        df = pd.read_csv(stats_file)
+        self.assertEqual(df.columns.tolist(), stats_columns)
+        self.assertEqual(df['label'].tolist(), ['A', 'A', 'A', 'B'])
+        self.assertEqual(df[['core', 'offset']].values.tolist(),
+                         [[0, 0], [0, 1], [1, 0], [0, 0]])
+        self.assertEqual(df['count'].tolist(), [10, 10, 10, 1])
+        self.assertEqual(df['mean'].tolist(), [1005.5, 3005.5, 2005.5, 50])
+        self.assertEqual(df['max'].tolist(), [1010, 3010, 2010, 50])
+        # Appended to an existing file
+        StreamStats(stats_file).close()
+        self.assertEqual(len(pd.read_csv(stats_file)), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
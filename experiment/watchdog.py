@@ -0,0 +1,128 @@
+import click_log
+import logging
+import time
+from planner import get_measurement_time, reboot_time
+
+logger = logging.getLogger(__name__)
+click_log.basic_config(logger)
+
+
+class Watchdog:
+    # Per experiment deadlines for the Resetter, instead of one fixed
+    # timeout for all experiments. Two phases are distinguished:
+    #   boot   -- from the reset to the first record: boot_timeout plus
+    #             the deadline of an iteration,
+    #   steady -- between records: the largest of min_timeout, margin
+    #             times the expected time of an iteration and gap_margin
+    #             times the largest gap between iterations seen so far.
+    # The expected time of an iteration follows from the measured WCET
+    # baseline and the clock rate of the Pi (see planner.py), times the
+    # synbench repeat. It is only a lower bound: with co-runners the gaps
+    # are much longer (8 to 22 secs on disparity circle pi4, 10 to 30 times
+    # the expectation). So until one full iteration of an experiment has
+    # been seen, it gets fixed_timeout (also at boot), and the largest gap
+    # of each experiment is kept over the resets. min_timeout and
+    # gap_margin are calibrated on the logs in output/: a gap is never
+    # more than 4 times the largest one before it, unless it is below
+    # 16 secs.
+    def __init__(self, fixed_timeout=60.0, boot_timeout=3 * reboot_time,
+                 min_timeout=20.0, margin=10.0, gap_margin=4.0):
+        self.fixed_timeout = fixed_timeout
+        self.boot_timeout = boot_timeout
+        # min_timeout never makes the adaptive timeout longer than the
+        # fixed one (e.g. with --timeout 3)
+        self.min_timeout = min(min_timeout, fixed_timeout)
+        self.margin = margin
+        self.gap_margin = gap_margin
+        # label => expected seconds per iteration
+        self.expected = {}
+        # label => largest gap between iterations seen
+        self.max_gaps = {}
+        # experiment expected after the next reset, and the one running
+        self.next_label = None
+        self.label = None
+        self.booting = True
+        self.reset_time = time.monotonic()
+        # iteration and time.monotonic() of the last new iteration
+        self.iteration = None
+        self.iteration_time = None
+        # Statistics: board time saved on timeout resets compared to
+        # fixed_timeout, and waits longer than fixed_timeout that did not
+        # lead to a reset
+        self.timeouts = 0
+        self.saved = 0.0
+        self.long_waits = 0
+
+    def set_expected(self, label, row):
+        # Without a WCET the expectation would be the reporting time only
+        if row.get('measured wcet baseline') is None:
+            return
+        seconds = get_measurement_time(row, 1)
+        repeat = row.get('synbench repeat')
+        if repeat is not None:
+            seconds *= repeat
+        self.expected[label] = seconds
+
+    def start_experiment(self, label):
+        # label is the experiment that runs after the (next) reset
+        self.next_label = label
+
+    def reset(self):
+        # Called by the Resetter on every reset, the gaps seen are kept
+        self.booting = True
+        self.reset_time = time.monotonic()
+        self.label = None
+        self.iteration = None
+        self.iteration_time = None
+
+    def handle_record(self, record):
+        now = time.monotonic()
+        label = record.label.decode('utf-8')
+        if self.booting:
+            self.booting = False
+            if now - self.reset_time > self.fixed_timeout:
+                self.long_waits += 1
+        if label != self.label:
+            # Another experiment, or the first record after a reset
+            self.label = label
+            self.iteration = None
+        if record.iteration != self.iteration:
+            if self.iteration is not None:
+                gap = now - self.iteration_time
+                self.max_gaps[label] = max(self.max_gaps.get(label, 0.0),
+                                           gap)
+                if gap > self.fixed_timeout:
+                    self.long_waits += 1
+            self.iteration = record.iteration
+            self.iteration_time = now
+
+    def get_iteration_timeout(self, label):
+        if label not in self.max_gaps:
+            return self.fixed_timeout
+        timeout = max(self.min_timeout,
+                      self.gap_margin * self.max_gaps[label])
+        if label in self.expected:
+            timeout = max(timeout, self.margin * self.expected[label])
+        return timeout
+
+    def get_timeout(self):
+        if self.booting:
+            if self.next_label not in self.max_gaps:
+                return self.fixed_timeout
+            return self.boot_timeout + self.get_iteration_timeout(
+                self.next_label)
+        return self.get_iteration_timeout(self.label)
+
+    def timed_out(self, timeout):
+        # The Resetter resets the Pi after waiting timeout seconds, with a
+        # fixed timeout it would have waited fixed_timeout seconds
+        self.timeouts += 1
+        self.saved += self.fixed_timeout - timeout
+
+    def log_statistics(self):
+        logger.info('Watchdog: {} timeout resets, '.format(self.timeouts) +
+                    'saved {:.0f} secs of board time '.format(self.saved) +
+                    'compared to a fixed timeout of ' +
+                    '{:.0f} secs, '.format(self.fixed_timeout) +
+                    '{} waits longer than that '.format(self.long_waits) +
+                    'did not lead to a reset.')